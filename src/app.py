@@ -4,8 +4,12 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 from functions_call import get_error_data
+from registry import available_methods
+from result_cache import ResultCache
+import queue
 import sys
 import tempfile
+import threading
 import os
 
 try:
@@ -22,6 +26,12 @@ except ImportError:
     print("Файл gause_noise.py не найден")
     HAS_GAUSSIAN = False
 
+# лимит на решение одного метода: зависший метод убивается и не блокирует окно
+METHOD_BUDGET = {"timeout": 300.0}
+
+# период опроса очереди событий фонового расчёта, мс
+POLL_MS = 100
+
 class SimpleApp:
     def __init__(self, root):
         self.root = root
@@ -55,14 +65,19 @@ class SimpleApp:
         self.file1_path = None
         self.file2_path = None
         
-        self.tsai_lenz_var = tk.IntVar()
-        self.park_martin_var = tk.IntVar()
-        self.daniilidis_var = tk.IntVar()
-        self.li_wang_wu_var = tk.IntVar()
-        self.shah_var = tk.IntVar()
+        self.method_vars = {name: tk.IntVar() for name in available_methods()}
 
         self.first_input = True
 
+        # повторный запуск с теми же файлами и шумом берёт результаты из кэша;
+        # кэш потокобезопасен, а run_methods не запускает второй расчёт, пока идёт первый
+        self.result_cache = ResultCache(maxsize=256)
+
+        # фоновый расчёт: поток пишет события в очередь, окно читает её через root.after
+        self.worker = None
+        self.events = None
+        self.cancel_event = None
+
         self.add_noise_var = tk.BooleanVar(value=False)
         self.noise_type_var = tk.StringVar()
         self.noise_level_var = tk.DoubleVar(value=0.5)
@@ -84,6 +99,8 @@ class SimpleApp:
     
 
     def on_closing(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
         plt.close('all')
         self.root.destroy()    
         sys.exit(0)
@@ -115,20 +132,9 @@ class SimpleApp:
         self.label_file2 = ttk.Label(btn_frame, text="Файл 2 не выбран")
         self.label_file2.pack(side=tk.RIGHT, padx=5)
 
-        tsai_lenz_check = tk.Checkbutton(self.content, text="tsai-lenz", variable=self.tsai_lenz_var)
-        tsai_lenz_check.pack()
-
-        park_martin_check = tk.Checkbutton(self.content, text="park-martin", variable=self.park_martin_var)
-        park_martin_check.pack()
-
-        daniilidis_check = tk.Checkbutton(self.content, text="daniilidis", variable=self.daniilidis_var)
-        daniilidis_check.pack()
-
-        li_wang_wu_check = tk.Checkbutton(self.content, text="li-wang-wu", variable=self.li_wang_wu_var)
-        li_wang_wu_check.pack()
-
-        shah_check = tk.Checkbutton(self.content, text="shah", variable=self.shah_var)
-        shah_check.pack()
+        for name, var in self.method_vars.items():
+            method_check = tk.Checkbutton(self.content, text=name, variable=var)
+            method_check.pack()
 
         noise_check = tk.Checkbutton(
             self.content, 
@@ -181,12 +187,29 @@ class SimpleApp:
         
         self.toggle_noise_settings()
 
+        run_frame = ttk.Frame(self.content)
+        run_frame.pack(pady=10)
+
         self.submit_btn = ttk.Button(
-            self.content,
+            run_frame,
             text="Выполнить",
             command=self.run_methods
         )
-        self.submit_btn.pack(pady=10)
+        self.submit_btn.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_btn = ttk.Button(
+            run_frame,
+            text="Отмена",
+            command=self.cancel_run,
+            state="disabled"
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+
+        self.progress_bar = ttk.Progressbar(self.content, mode="determinate", length=300)
+        self.progress_bar.pack(pady=(0, 5))
+
+        self.status_label = ttk.Label(self.content, text="")
+        self.status_label.pack(pady=(0, 10))
 
     def toggle_noise_settings(self):
         if self.add_noise_var.get() and self.available_noise_types:
@@ -331,15 +354,10 @@ class SimpleApp:
             messagebox.showinfo("Успех", f"График сохранен как {filename}")
     
     def run_methods(self):
-        methods = [
-            name for name, var in [
-                ("tsai-lenz", self.tsai_lenz_var),
-                ("park-martin", self.park_martin_var),
-                ("daniilidis", self.daniilidis_var),
-                ("li-wang-wu", self.li_wang_wu_var),
-                ("shah", self.shah_var)
-            ] if var.get()
-        ]
+        if self.worker is not None and self.worker.is_alive():
+            return
+
+        methods = [name for name, var in self.method_vars.items() if var.get()]
         
         if not self.file1_path or not self.file2_path:
             messagebox.showwarning("Предупреждение", "Пожалуйста, выберите оба файла!")
@@ -348,23 +366,63 @@ class SimpleApp:
         if not methods:
             messagebox.showwarning("Предупреждение", "Пожалуйста, выберите хотя бы один метод!")
             return
-        
-        t_data, r_data = get_error_data(methods, self.file1_path, self.file2_path)
-        
-        messagebox.showinfo("Информация", "Файлы загружены! Генерация графиков...")
-        
-        sample_plot_t = self.create_plots(t_data, 't')
-        sample_plot_r = self.create_plots(r_data, 'r')
-        if self.first_input:
-            self.create_plot_areas()
-            self.first_input = False
 
-        self.display_plots(sample_plot_t, "translation")
-        self.display_plots(sample_plot_r, "rotation")
-        file_to_compare = self.file2_path
-        temp_file_path = None
-        
+        # переменные Tk читаются здесь: из фонового потока к ним обращаться нельзя
+        noise = None
         if self.add_noise_var.get() and self.available_noise_types:
+            noise = (self.noise_type_var.get(), self.noise_level_var.get())
+
+        # шаг индикатора - один метод; при шуме ещё генерация файла и второй проход методов
+        steps = len(methods) * (2 if noise else 1) + (1 if noise else 0)
+        self.progress_bar.config(maximum=steps, value=0)
+        self.status_label.config(text="")
+        self.submit_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = threading.Thread(
+            target=self.analysis_pipeline,
+            args=(methods, self.file1_path, self.file2_path, noise,
+                  self.events, self.cancel_event),
+            daemon=True
+        )
+        self.worker.start()
+        self.root.after(POLL_MS, self.poll_events)
+
+    def cancel_run(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state="disabled")
+            self.status_label.config(text="Отмена...")
+
+    def analysis_pipeline(self, methods, file1_path, file2_path, noise, events, cancel):
+        """
+        Загрузка, шум и решатели в фоновом потоке; виджеты здесь не трогаются,
+        о ходе расчёта сообщают события в очереди events:
+        ("stage", текст), ("step", текст), ("plots", t_data, r_data), ("error", текст)
+        и последним ("done", отменён ли расчёт)
+        cancel - событие отмены: решаемый метод убивается, остальные не запускаются
+        """
+        budget = dict(METHOD_BUDGET, cancel=cancel)
+
+        def step(name, status):
+            events.put(("step", f"{name}: {status}"))
+
+        temp_file_path = None
+        try:
+            events.put(("stage", "Расчёт на исходных данных..."))
+            t_data, r_data = get_error_data(methods, file1_path, file2_path,
+                                            cache=self.result_cache, budget=budget,
+                                            progress=step)
+            if cancel.is_set():
+                return
+            events.put(("plots", t_data, r_data))
+            if noise is None:
+                return
+
+            noise_type, noise_level = noise
+            events.put(("stage", "Генерация шума..."))
             try:
                 # Файлы с шумом будут сохраняться в другой файл
                 # То есть, не получится сделать так, чтобы шум был применен
@@ -374,66 +432,100 @@ class SimpleApp:
                 temp_file_path = temp_file.name
                 temp_file.close()
                 
-                noise_level = self.noise_level_var.get()
-                noise_type = self.noise_type_var.get()
-                
                 if noise_type == "Perlin Noise" and HAS_PERLIN:
-                    print(noise_level)
                     pos_scale = 20 * noise_level
                     rot_scale = 0.5 * noise_level
                     
                     process_perlin_file(
-                        input_file=self.file2_path,
+                        input_file=file2_path,
                         output_file=temp_file_path,
                         pos_scale=pos_scale,
                         rot_scale=rot_scale
                     )
-                    messagebox.showinfo("Информация", 
-                                      f"Шум Перлина применён (уровень: {noise_level:.2f})")
+                    events.put(("step", f"Шум Перлина применён (уровень: {noise_level:.2f})"))
                     
                 elif noise_type == "Gaussian Noise" and HAS_GAUSSIAN:
                     pos_std = 20 * noise_level
                     rot_std = 0.5 * noise_level
                     
                     process_gaussian_file(
-                        input_file=self.file2_path,
+                        input_file=file2_path,
                         output_file=temp_file_path,
                         pos_std=pos_std,
                         rot_std=rot_std
                     )
-                    messagebox.showinfo("Информация", 
-                                      f"Гауссовский шум применён (уровень: {noise_level:.2f})")
+                    events.put(("step", f"Гауссовский шум применён (уровень: {noise_level:.2f})"))
                 else:
-                    messagebox.showerror("Ошибка", "Выбранный тип шума недоступен")
+                    events.put(("error", "Выбранный тип шума недоступен"))
                     return
-                
-                file_to_compare = temp_file_path
-                
             except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось применить шум: {str(e)}")
-                if temp_file_path and os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+                events.put(("error", f"Не удалось применить шум: {str(e)}"))
                 return
-        try:
-            t_data, r_data = get_error_data(methods, self.file1_path, file_to_compare)
-            
-            messagebox.showinfo("Информация", "Файлы загружены! Генерация графиков...")
-            
-            sample_plot_t = self.create_plots(t_data, 't')
-            sample_plot_r = self.create_plots(r_data, 'r')
-            if self.first_input:
-                self.create_plot_areas()
-                self.first_input = False
-
-            self.display_plots(sample_plot_t, "translation")
-            self.display_plots(sample_plot_r, "rotation")
-            
+            if cancel.is_set():
+                return
+
+            noise_info = {"type": noise_type, "level": noise_level, "seed": 42}
+            events.put(("stage", "Расчёт на данных с шумом..."))
+            t_data, r_data = get_error_data(methods, file1_path, temp_file_path,
+                                            cache=self.result_cache, noise=noise_info,
+                                            budget=budget, progress=step)
+            if not cancel.is_set():
+                events.put(("plots", t_data, r_data))
         except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка при анализе данных: {str(e)}")
+            events.put(("error", f"Ошибка при анализе данных: {str(e)}"))
         finally:
             # Удаление временного файла, если он был создан
             if temp_file_path and os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
+            events.put(("done", cancel.is_set()))
+
+    def poll_events(self):
+        """Разбирает события фонового расчёта в главном потоке"""
+        errors = []
+        finished = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "stage":
+                self.status_label.config(text=event[1])
+            elif kind == "step":
+                self.progress_bar.config(value=self.progress_bar["value"] + 1)
+                self.status_label.config(text=event[1])
+            elif kind == "plots":
+                self.status_label.config(text="Генерация графиков...")
+                self.show_results(event[1], event[2])
+            elif kind == "error":
+                errors.append(event[1])
+            elif kind == "done":
+                finished = event[1]
+
+        if finished is None:
+            self.root.after(POLL_MS, self.poll_events)
+            return
+
+        self.worker = None
+        self.submit_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        if finished:
+            self.status_label.config(text="Расчёт отменён")
+        else:
+            self.progress_bar.config(value=self.progress_bar["maximum"])
+            self.status_label.config(text="Готово")
+        for text in errors:
+            messagebox.showerror("Ошибка", text)
+
+    def show_results(self, t_data, r_data):
+        sample_plot_t = self.create_plots(t_data, 't')
+        sample_plot_r = self.create_plots(r_data, 'r')
+        if self.first_input:
+            self.create_plot_areas()
+            self.first_input = False
+
+        self.display_plots(sample_plot_t, "translation")
+        self.display_plots(sample_plot_r, "rotation")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,93 @@
+import numpy as np
+
+from registry import get_method
+from rng import block_generator
+from utils import pose_residuals, pose_residuals_batch, error_stats, error_stats_batch
+
+
+# поток случайных чисел для индексов бутстрепа
+STREAM = "bootstrap"
+
+# ограничение размера порции (B_порции * n) при подсчёте статистик
+MAX_ELEMENTS = 1 << 22
+
+
+def bootstrap_indices(n, n_boot, seed=0, stream=STREAM):
+    """Матрица индексов (n_boot, n): каждая строка - выборка с возвращением из n поз"""
+    return block_generator(seed, stream, 0).integers(0, n, size=(n_boot, n))
+
+
+def percentile_interval(values, alpha=0.05):
+    """Перцентильный интервал (lo, hi) по первой оси"""
+    lo, hi = np.quantile(values, [alpha / 2, 1 - alpha / 2], axis=0)
+    return lo, hi
+
+
+def bootstrap_stats(errs, n_boot=10_000, seed=0, idx=None):
+    """
+    Бутстреп-распределения метрик error_stats по ошибкам поз
+    Все n_boot выборок - одна целочисленная матрица индексов, статистики считаются
+    редукциями по строкам (порциями не больше MAX_ELEMENTS элементов)
+    Возвращает словарь {метрика: массив (n_boot,)}
+    """
+    errs = np.asarray(errs, dtype=np.float64)
+    if idx is None:
+        idx = bootstrap_indices(len(errs), n_boot, seed)
+    step = max(1, MAX_ELEMENTS // max(len(errs), 1))
+    parts = [error_stats_batch(errs[idx[i:i + step]]) for i in range(0, len(idx), step)]
+    return {m: np.concatenate([p[m] for p in parts]) for m in parts[0]}
+
+
+def _intervals(point, samples, alpha):
+    out = {}
+    for m, value in point.items():
+        lo, hi = percentile_interval(samples[m], alpha)
+        out[m] = {"value": value, "low": float(lo), "high": float(hi)}
+    return out
+
+
+def bootstrap_errors(As, Bs, X, Y, n_boot=10_000, alpha=0.05, seed=0):
+    """
+    Доверительные интервалы метрик summarize_errors при фиксированных X, Y
+    (пересэмплируются ошибки поз, решение не пересчитывается)
+    Возвращает два словаря {метрика: {"value", "low", "high"}} для трансляции и вращения
+    """
+    t_errs, r_errs = pose_residuals(As, Bs, X, Y)
+    idx = bootstrap_indices(len(t_errs), n_boot, seed)
+    return (_intervals(error_stats(t_errs), bootstrap_stats(t_errs, idx=idx), alpha),
+            _intervals(error_stats(r_errs), bootstrap_stats(r_errs, idx=idx), alpha))
+
+
+def bootstrap_solve(name, As, Bs, n_boot=200, alpha=0.05, seed=0):
+    """
+    Бутстреп с перерешением: метод name решается на каждой выборке поз с возвращением
+    (индексы выборки упорядочены, чтобы относительные движения шли по траектории),
+    ошибки всех n_boot решений считаются одним пакетным pose_residuals_batch
+    Метрики реплики - по её же выборке поз; неудавшиеся реплики отбрасываются
+    Возвращает (t_ci, r_ci, Xs, Ys) с решениями реплик (n_ok, 4, 4)
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    spec = get_method(name)
+    X, Y = spec.solve(As, Bs)
+    idx = np.sort(bootstrap_indices(len(As), n_boot, seed), axis=1)
+    Xs, Ys, rows = [], [], []
+    for b, sample in enumerate(idx):
+        try:
+            Xb, Yb = spec.solve(As[sample], Bs[sample])
+        except (np.linalg.LinAlgError, ValueError):
+            continue
+        if np.all(np.isfinite(Xb)) and np.all(np.isfinite(Yb)):
+            Xs.append(Xb)
+            Ys.append(Yb)
+            rows.append(b)
+    if not rows:
+        raise ValueError(f"Ни одна бутстреп-выборка не решилась методом {name}")
+    Xs, Ys, idx = np.array(Xs), np.array(Ys), idx[rows]
+
+    t_all, r_all = pose_residuals_batch(As, Bs, Xs, Ys)
+    t_samples = error_stats_batch(np.take_along_axis(t_all, idx, axis=1))
+    r_samples = error_stats_batch(np.take_along_axis(r_all, idx, axis=1))
+    t_errs, r_errs = pose_residuals(As, Bs, X, Y)
+    return (_intervals(error_stats(t_errs), t_samples, alpha),
+            _intervals(error_stats(r_errs), r_samples, alpha), Xs, Ys)
@@ -0,0 +1,343 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from functions_call import load_inputs, evaluate_methods, print_table
+from cross_validation import cross_validate
+from registry import available_methods
+from pose_noise import add_pose_noise
+from noise_pipeline import NoisePipeline
+from results import METRICS, STATUS_ERROR
+from watchdog import check_budget
+
+
+# уровень шума 0..1 -> параметры генераторов, как в ползунке GUI
+NOISE_POS_SCALE = 20.0
+NOISE_ROT_SCALE = 0.5
+NOISE_TYPES = ("none", "gaussian", "perlin", "pipeline")
+
+# метка A/B в имени файла: отделена от соседних частей "_", "-" или "."
+_SIDE_RE = re.compile(r"(?<![^_\-.])([AB])(?=[_\-.]|$)")
+
+OUTPUT_FIELDS = (["dataset", "file_a", "file_b", "method", "noise_type", "noise_level", "trial",
+                  "status", "error"]
+                 + [f"t_{m}" for m in METRICS] + [f"r_{m}" for m in METRICS]
+                 + ["solve_time", "eval_time"])
+
+
+def _pair_key(path):
+    """(каталог, имя с меткой стороны, заменённой на *, сторона) или None"""
+    directory, name = os.path.split(path)
+    matches = list(_SIDE_RE.finditer(name))
+    if not matches:
+        return None
+    m = matches[-1]
+    return directory, name[:m.start()] + "*" + name[m.end():], m.group(1)
+
+
+def find_pairs(patterns):
+    """
+    Ищет пары файлов A/B в каталогах и по glob-шаблонам
+    Файлы парные, если имена отличаются только последней меткой A/B,
+    например helix_A_0.1mm.txt и helix_B_0.1mm.txt
+    Возвращает отсортированный список (file_a, file_b)
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(os.path.join(pattern, f) for f in os.listdir(pattern))
+        else:
+            files.extend(glob.glob(pattern))
+    sides = {}
+    for path in files:
+        if not os.path.isfile(path):
+            continue
+        key = _pair_key(path)
+        if key is not None:
+            sides.setdefault(key[:2], {})[key[2]] = path
+    return sorted((s["A"], s["B"]) for s in sides.values() if "A" in s and "B" in s)
+
+
+def noise_params(noise_type, level):
+    """Параметры генератора шума для уровня 0..1 (мм и градусы)"""
+    if noise_type == "gaussian":
+        return {"pos_std": NOISE_POS_SCALE * level, "rot_std": NOISE_ROT_SCALE * level}
+    if noise_type == "perlin":
+        return {"pos_scale": NOISE_POS_SCALE * level, "rot_scale": NOISE_ROT_SCALE * level}
+    raise ValueError(f"Неизвестный тип шума: {noise_type}")
+
+
+def make_noisy_file(file_b, noise_type, level, seed):
+    """Записывает зашумлённую копию файла B во временный файл и возвращает путь"""
+    params = noise_params(noise_type, level)
+    fd, path = tempfile.mkstemp(suffix="_noisy.txt")
+    os.close(fd)
+    try:
+        if noise_type == "gaussian":
+            from gause_noise import process_gaussian_file
+            process_gaussian_file(file_b, path, seed=seed, **params)
+        else:
+            from perlin_noise import process_perlin_file
+            process_perlin_file(file_b, path, seed=seed, **params)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _error_records(common, methods, e):
+    """Записи status="error" для всех методов задания, которое не удалось выполнить"""
+    error = f"{type(e).__name__}: {e}"
+    return [dict(common, method=name, status=STATUS_ERROR, error=error) for name in methods]
+
+
+def run_job(job):
+    """
+    Одна ячейка пакетного запуска: пара файлов, уровень шума и номер испытания
+    Выполняется в рабочем процессе, поэтому возвращает обычные словари
+    При job["manifold"] шум добавляется к матрицам поз B (pose_noise), иначе к файлу B
+    noise_type "pipeline" - конвейер job["pipeline"] с амплитудами, умноженными на уровень шума;
+    выброшенные конвейером кадры удаляются из A и B
+    При job["cv"] метрики считаются по отложенным позам k-блочной перекрёстной проверки
+    При job["precheck"] методы с вырожденными движениями не запускаются (status "degenerate")
+    """
+    common = {"dataset": job["dataset"], "file_a": job["file_a"], "file_b": job["file_b"],
+              "noise_type": job["noise_type"], "noise_level": job["noise_level"],
+              "trial": job["trial"]}
+    noisy = None
+    seed = job["seed"] + job["trial"]
+    add_noise = job["noise_type"] != "none" and job["noise_level"] > 0.0
+    try:
+        file_b = job["file_b"]
+        in_file = add_noise and not job["manifold"] and job["noise_type"] != "pipeline"
+        if in_file:
+            noisy = make_noisy_file(file_b, job["noise_type"], job["noise_level"], seed)
+            file_b = noisy
+        As, Bs = load_inputs(job["file_a"], file_b)
+        if job["noise_type"] == "pipeline":
+            pipeline = NoisePipeline.from_config(job["pipeline"]).scaled(job["noise_level"])
+            As, Bs = pipeline.apply_pairs(As, Bs, trial=job["trial"])
+        elif add_noise and job["manifold"]:
+            Bs = add_pose_noise(Bs, job["noise_type"], seed=seed,
+                                **noise_params(job["noise_type"], job["noise_level"]))
+    except Exception as e:
+        return _error_records(common, job["methods"], e)
+    finally:
+        if noisy is not None:
+            os.unlink(noisy)
+
+    if job["cv"]:
+        try:
+            _, table = cross_validate(job["methods"], As, Bs, k=job["cv"],
+                                      dataset=job["dataset"], robust=job["robust"],
+                                      max_pairs=job["max_pairs"], refine=job["refine"],
+                                      workers=1, budget=job["budget"])
+        except Exception as e:
+            # например, в наборе меньше поз, чем блоков: остальные наборы считаются дальше
+            return _error_records(common, job["methods"], e)
+    else:
+        table = evaluate_methods(job["methods"], As, Bs, dataset=job["dataset"],
+                                 noise_level=job["noise_level"], trial=job["trial"],
+                                 robust=job["robust"], max_pairs=job["max_pairs"],
+                                 refine=job["refine"], budget=job["budget"],
+                                 precheck=job["precheck"])
+    records = []
+    for i in range(len(table)):
+        row = table.row(i)
+        record = dict(common)
+        record.update({k: row[k] for k in OUTPUT_FIELDS if k in row and k not in common})
+        if job["transforms"]:
+            record["X"] = row["X"].tolist()
+            record["Y"] = row["Y"].tolist()
+        records.append(record)
+    return records
+
+
+def make_jobs(pairs, methods, noise_type="none", noise_levels=(0.0,), trials=1, seed=42,
+              robust=None, max_pairs=None, refine=False, transforms=False, manifold=False,
+              pipeline=None, cv=None, budget=None, precheck=False):
+    jobs = []
+    for file_a, file_b in pairs:
+        for level in noise_levels:
+            for trial in range(trials):
+                jobs.append({"dataset": os.path.basename(file_a), "file_a": file_a,
+                             "file_b": file_b, "methods": list(methods),
+                             "noise_type": noise_type, "noise_level": float(level),
+                             "trial": trial, "seed": seed, "robust": robust,
+                             "max_pairs": max_pairs, "refine": refine,
+                             "transforms": transforms, "manifold": manifold,
+                             "pipeline": pipeline, "cv": cv, "budget": budget,
+                             "precheck": precheck})
+    return jobs
+
+
+def iter_results(jobs, workers=None):
+    """
+    Выполняет задания и выдаёт списки записей по мере завершения (порядок не гарантирован)
+    workers=1 - последовательно в текущем процессе
+    """
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+class RecordWriter:
+    """Потоковая запись результатов: csv и jsonl пишутся сразу, table - в конце"""
+
+    def __init__(self, stream, fmt, transforms=False):
+        self.stream = stream
+        self.fmt = fmt
+        self.rows = []
+        self._csv = None
+        if fmt == "csv":
+            fields = list(OUTPUT_FIELDS) + (["X", "Y"] if transforms else [])
+            self._csv = csv.DictWriter(stream, fieldnames=fields, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, records):
+        for record in records:
+            if self.fmt == "jsonl":
+                self.stream.write(json.dumps(record, allow_nan=True) + "\n")
+            elif self.fmt == "csv":
+                row = dict(record)
+                for name in ("X", "Y"):
+                    if name in row:
+                        row[name] = json.dumps(row[name])
+                self._csv.writerow(row)
+            else:
+                self.rows.append(record)
+        self.stream.flush()
+
+    def close(self):
+        if self.fmt != "table":
+            return
+        headers = ["dataset", "method", "noise", "trial", "status", "t_rmse", "r_rmse"]
+        rows = []
+        for r in sorted(self.rows, key=lambda r: (r["dataset"], r["noise_level"], r["trial"], r["method"])):
+            rows.append([r["dataset"], r["method"], f"{r['noise_level']:g}", str(r["trial"]),
+                         r["status"], f"{r.get('t_rmse', np.nan):.4f}",
+                         f"{r.get('r_rmse', np.nan):.4f}"])
+        if rows:
+            print_table(rows, headers)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Пакетный запуск методов AX=XB / AX=YB для каталогов с парами файлов A/B")
+    parser.add_argument("inputs", nargs="+",
+                        help="каталоги или glob-шаблоны; пары ищутся по метке A/B в имени файла")
+    parser.add_argument("-m", "--methods", nargs="+", default=None,
+                        help="методы (по умолчанию все зарегистрированные)")
+    parser.add_argument("--noise", choices=NOISE_TYPES, default="none",
+                        help="тип шума, добавляемого к файлу B")
+    parser.add_argument("--noise-levels", nargs="+", type=float, default=[0.0],
+                        help="уровни шума 0..1 (как ползунок GUI)")
+    parser.add_argument("--pipeline", default=None,
+                        help="JSON-файл конвейера шума {\"seed\": ..., \"stages\": [...]}; "
+                             "включает --noise pipeline, уровни масштабируют амплитуды")
+    parser.add_argument("--manifold", action="store_true",
+                        help="шум на SE(3): T exp(xi) к матрицам поз B вместо углов Эйлера в файле")
+    parser.add_argument("--trials", type=int, default=1,
+                        help="число испытаний на уровень шума (сид = seed + номер испытания)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--robust", action="store_true", help="устойчивый режим RANSAC")
+    parser.add_argument("--t-thresh", type=float, default=5.0,
+                        help="порог инлаера RANSAC по трансляции, мм")
+    parser.add_argument("--r-thresh", type=float, default=1.0,
+                        help="порог инлаера RANSAC по вращению, градусы")
+    parser.add_argument("--max-pairs", type=int, default=None,
+                        help="ограничение числа пар движений для методов AX=XB")
+    parser.add_argument("--refine", action="store_true",
+                        help="уточнение X, Y методом Левенберга-Марквардта")
+    parser.add_argument("--cv", type=int, default=None, metavar="K",
+                        help="k-блочная перекрёстная проверка: X, Y обучаются без блока поз "
+                             "и оцениваются на нём")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="лимит времени на решение одного метода, с (метод решается "
+                             "в отдельном процессе и убивается по истечении)")
+    parser.add_argument("--memory-mb", type=float, default=None,
+                        help="лимит дополнительной памяти на решение одного метода, МБ (Unix)")
+    parser.add_argument("--precheck", action="store_true",
+                        help="не запускать методы на вырожденных движениях (одна ось вращения, "
+                             "плоское движение); не действует вместе с --cv")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="число рабочих процессов (по умолчанию по числу ядер)")
+    parser.add_argument("-f", "--format", choices=("csv", "jsonl", "table"), default="csv")
+    parser.add_argument("-o", "--output", default=None, help="файл результатов (по умолчанию stdout)")
+    parser.add_argument("--transforms", action="store_true", help="добавить X и Y в вывод")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    methods = args.methods or available_methods()
+    unknown = [m for m in methods if m not in available_methods()]
+    if unknown:
+        print(f"Неизвестные методы: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    budget = None
+    if args.timeout is not None or args.memory_mb is not None:
+        budget = {"timeout": args.timeout, "memory_mb": args.memory_mb}
+        try:
+            check_budget(budget)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    if args.cv is not None and args.cv < 2:
+        print("--cv: нужно не меньше 2 блоков", file=sys.stderr)
+        return 2
+    pairs = find_pairs(args.inputs)
+    if not pairs:
+        print("Не найдено ни одной пары файлов A/B", file=sys.stderr)
+        return 1
+
+    robust = {"t_thresh": args.t_thresh, "r_thresh": args.r_thresh} if args.robust else None
+    pipeline = None
+    if args.pipeline or args.noise == "pipeline":
+        if not args.pipeline:
+            print("Для --noise pipeline нужен --pipeline FILE", file=sys.stderr)
+            return 2
+        with open(args.pipeline) as f:
+            pipeline = json.load(f)
+        pipeline.setdefault("seed", args.seed)
+        try:
+            NoisePipeline.from_config(pipeline)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        args.noise = "pipeline"
+        if args.noise_levels == [0.0]:
+            args.noise_levels = [1.0]
+    levels = args.noise_levels if args.noise != "none" else [0.0]
+    jobs = make_jobs(pairs, methods, args.noise, levels, args.trials, args.seed,
+                     robust, args.max_pairs, args.refine, args.transforms, args.manifold,
+                     pipeline, args.cv, budget, args.precheck)
+
+    stream = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = RecordWriter(stream, args.format, args.transforms)
+        for records in iter_results(jobs, args.jobs):
+            writer.write(records)
+        writer.close()
+    finally:
+        if args.output:
+            stream.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
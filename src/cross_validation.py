@@ -0,0 +1,197 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from functions_call import load_inputs, solve_method
+from refine import refine_xy
+from registry import get_method
+from results import ResultTable, STATUS_OK, STATUS_ERROR, check_dataset_name, stats_fields
+from rng import block_generator
+from utils import error_stats, summarize_errors
+from watchdog import WorkerFailure, check_budget, describe_exception, run_with_budget
+
+
+# поток случайных чисел для перемешивания поз по блокам
+STREAM = "cross_validation"
+
+# данные рабочего процесса: As, Bs, блоки и статистики методов
+_DATA = {}
+
+
+def kfold_indices(n, k=5, shuffle=False, seed=0):
+    """
+    Номера тестовых поз k блоков (каждая поза - ровно в одном блоке)
+    Без shuffle блоки - подряд идущие участки траектории: соседние позы коррелированы,
+    и перемешанные блоки занижают ошибку; для методов AX=XB обучающие позы
+    тогда остаются участками траектории с осмысленными относительными движениями
+    """
+    if not 2 <= k <= n:
+        raise ValueError(f"Число блоков должно быть от 2 до {n}: {k}")
+    order = block_generator(seed, STREAM, 0).permutation(n) if shuffle else np.arange(n)
+    return [np.sort(fold) for fold in np.array_split(order, k)]
+
+
+def holdout_indices(n, test_fraction=0.2, shuffle=True, seed=0):
+    """Один тестовый блок из доли test_fraction поз (отложенная выборка)"""
+    if not 0.0 < test_fraction < 1.0:
+        raise ValueError(f"Доля тестовых поз должна быть в (0, 1): {test_fraction}")
+    size = min(max(1, int(round(n * test_fraction))), n - 1)
+    if shuffle:
+        return [np.sort(block_generator(seed, STREAM, 0).permutation(n)[:size])]
+    return [np.arange(n - size, n)]
+
+
+def _subtract(total, part):
+    return {key: total[key] - part[key] for key in total}
+
+
+def fold_statistics(methods, As, Bs, folds):
+    """
+    Достаточные статистики методов с spec.statistics: {метод: (статистики блоков, сумма)}
+    Обучающая статистика блока - разность суммы и статистики блока, поэтому каждая
+    поза проходит через accumulate дважды, а не k - 1 раз
+    """
+    out = {}
+    for name in methods:
+        spec = get_method(name)
+        if spec.statistics is None:
+            continue
+        accumulate = spec.statistics[0]
+        out[name] = ([accumulate(As[fold], Bs[fold]) for fold in folds], accumulate(As, Bs))
+    return out
+
+
+def _init_worker(As, Bs, folds, statistics):
+    _DATA.clear()
+    _DATA.update(As=As, Bs=Bs, folds=folds, statistics=statistics)
+
+
+def _fit(name, As, Bs, stats, robust, max_pairs, refine):
+    """
+    X, Y метода на обучающих позах: по готовым статистикам stats, если они есть
+    (кроме устойчивого режима), иначе решением заново
+    """
+    if stats is not None and robust is None:
+        X, Y = get_method(name).statistics[1](stats)
+        if refine:
+            X, Y = refine_xy(As, Bs, X, Y)
+        return X, Y
+    return solve_method(name, As, Bs, robust=robust, max_pairs=max_pairs, refine=refine)
+
+
+def run_fold(task):
+    """
+    Один блок: методы обучаются на остальных позах и оцениваются на позах блока
+    task - (номер блока, методы, набор, robust, max_pairs, refine, budget)
+    budget - лимиты времени и памяти на обучение метода (см. functions_call.evaluate_methods)
+    Возвращает (номер блока, строки ResultTable, {метод: (t_errs, r_errs)})
+    """
+    k, methods, dataset, robust, max_pairs, refine, budget = task
+    As, Bs, statistics = _DATA["As"], _DATA["Bs"], _DATA["statistics"]
+    test = _DATA["folds"][k]
+    train = np.setdiff1d(np.arange(len(As)), test)
+    common = {"dataset": dataset, "trial": k}
+    table = ResultTable(capacity=len(methods))
+    residuals = {}
+    for name in methods:
+        start = time.perf_counter()
+        # методы со статистиками решаются по разности суммы и статистики блока
+        stats = None
+        if name in statistics:
+            parts, total = statistics[name]
+            stats = _subtract(total, parts[k])
+        fit = (name, As[train], Bs[train], stats, robust, max_pairs, refine)
+        try:
+            if budget is not None:
+                X, Y = run_with_budget(_fit, *fit, **budget)
+            else:
+                X, Y = _fit(*fit)
+            solved = time.perf_counter()
+            t_stats, r_stats, t_errs, r_errs = summarize_errors(As[test], Bs[test], X, Y,
+                                                                return_residuals=True)
+        except WorkerFailure as e:
+            table.append(method=name, status=e.status, error=str(e), solve_time=e.elapsed,
+                         **common)
+            continue
+        except Exception as e:
+            table.append(method=name, status=STATUS_ERROR, error=describe_exception(e),
+                         solve_time=time.perf_counter() - start, **common)
+            continue
+        residuals[name] = (t_errs, r_errs)
+        table.append(method=name, X=X, Y=Y, solve_time=solved - start,
+                     eval_time=time.perf_counter() - solved,
+                     **stats_fields(t_stats, r_stats), **common)
+    return k, table.to_array(), residuals
+
+
+def cross_validate(methods, As, Bs, k=5, folds=None, shuffle=False, seed=0, dataset="",
+                   robust=None, max_pairs=None, refine=False, use_statistics=True,
+                   workers=None, budget=None):
+    """
+    Перекрёстная проверка: X, Y обучаются без поз блока и оцениваются на нём
+    folds - готовые номера тестовых поз (например, holdout_indices), иначе kfold_indices
+    use_statistics - решать методы с достаточными статистиками вычитанием статистики блока
+    workers - число процессов для блоков (1 - в текущем процессе)
+    budget - лимиты времени и памяти на обучение метода на блоке
+    Возвращает (таблица по блокам, trial - номер блока; сводная таблица по методам
+    с метриками по всем отложенным позам вместе). Если метод не решился хотя бы на одном
+    блоке, сводная строка получает статус и текст ошибки первого такого блока
+    """
+    check_dataset_name(dataset)
+    if budget is not None:
+        check_budget(budget)
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    if folds is None:
+        folds = kfold_indices(len(As), k, shuffle, seed)
+    folds = [np.asarray(fold, dtype=np.int64) for fold in folds]
+    statistics = fold_statistics(methods, As, Bs, folds) if use_statistics else {}
+    tasks = [(i, list(methods), dataset, robust, max_pairs, refine, budget)
+             for i in range(len(folds))]
+
+    if workers is None:
+        workers = min(len(folds), os.cpu_count() or 1)
+    if workers == 1 or len(folds) == 1:
+        saved = dict(_DATA)
+        _init_worker(As, Bs, folds, statistics)
+        try:
+            results = [run_fold(task) for task in tasks]
+        finally:
+            _DATA.clear()
+            _DATA.update(saved)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(As, Bs, folds, statistics)) as pool:
+            results = list(pool.map(run_fold, tasks))
+
+    table = ResultTable(capacity=len(folds) * len(methods))
+    for _, rows, _ in results:
+        table.extend(rows)
+    pooled = ResultTable(capacity=len(methods))
+    data = table.to_array()
+    for name in methods:
+        rows = data[data["method"] == name]
+        failed = rows[rows["status"] != STATUS_OK]
+        common = {"method": name, "dataset": dataset, "solve_time": rows["solve_time"].sum()}
+        if len(failed):
+            pooled.append(status=failed["status"][0],
+                          error=f"блок {failed['trial'][0]}: {failed['error'][0]}", **common)
+            continue
+        t_errs = np.concatenate([res[name][0] for _, _, res in results])
+        r_errs = np.concatenate([res[name][1] for _, _, res in results])
+        pooled.append(eval_time=rows["eval_time"].sum(),
+                      **stats_fields(error_stats(t_errs), error_stats(r_errs)), **common)
+    return table, pooled
+
+
+def get_cv_error_data(methods, file_a, file_b, k=5, **kwargs):
+    """
+    Как functions_call.get_error_data, но метрики - по отложенным позам k-блочной
+    перекрёстной проверки (два словаря по методам; для упавших методов значения NaN)
+    """
+    As, Bs = load_inputs(file_a, file_b)
+    _, pooled = cross_validate(methods, As, Bs, k=k,
+                               dataset=os.path.basename(file_a), **kwargs)
+    return pooled.to_stats_dicts()
@@ -78,50 +78,63 @@ def qmult(p, q):
     ])
 
 
-def daniilidis(As, Bs):
-    Arel = []
-    Brel = []
-    for i in range(len(As) - 1):
-        Arel.append(invert_T(As[i]) @ As[i + 1])
-        Brel.append(invert_T(Bs[i]) @ Bs[i + 1])
-
-    pairs = []
-    thr = np.deg2rad(2.0)
-    for Ar, Br in zip(Arel, Brel):
-        if np.linalg.norm(log_SO3(Ar[:3, :3])) >= thr and np.linalg.norm(log_SO3(Br[:3, :3])) >= thr:
-            pairs.append((Ar, Br))
-    if not pairs:
-        pairs = list(zip(Arel, Brel))
-
-    n = len(pairs)
-    T = np.zeros((6 * n, 8))
-
-    for i, (A1, B1) in enumerate(pairs):
-        a = hom2quar(A1)
-        b = hom2quar(B1)
-
-        a1 = a[:, 0]; a2 = a[:, 1]
-        b1 = b[:, 0]; b2 = b[:, 1]
-
-        v_a1 = a1[1:]; v_b1 = b1[1:]
-        v_a2 = a2[1:]; v_b2 = b2[1:]
-
-        upper = np.hstack([
-            (v_a1 - v_b1).reshape(3, 1),
-            hat(v_a1 + v_b1),
-            np.zeros((3, 4))
-        ])
-        lower = np.hstack([
-            (v_a2 - v_b2).reshape(3, 1),
-            hat(v_a2 + v_b2),
-            (v_a1 - v_b1).reshape(3, 1),
-            hat(v_a1 + v_b1)
-        ])
-
-        T[6*i:6*i+3, :] = upper
-        T[6*i+3:6*i+6, :] = lower
-
-    U, s, Vt = np.linalg.svd(T)
+def qmult_batch(p, q):
+    """Векторизованный qmult для массивов (N, 4)"""
+    w1, x1, y1, z1 = p.T
+    w2, x2, y2, z2 = q.T
+    return np.stack([
+        w1*w2 - x1*x2 - y1*y2 - z1*z2,
+        w1*x2 + x1*w2 + y1*z2 - z1*y2,
+        w1*y2 - x1*z2 + y1*w2 + z1*x2,
+        w1*z2 + x1*y2 - y1*x2 + z1*w2
+    ], axis=1)
+
+
+def hom2quar_batch(Hs):
+    """Векторизованный hom2quar: (N, 4, 4) -> дуальные кватернионы (N, 4, 2)"""
+    Hs = np.asarray(Hs, dtype=np.float64)
+    a = log_SO3_batch(Hs[:, :3, :3])
+    theta = np.linalg.norm(a, axis=1)
+    small = theta < 1e-12
+    l = a / np.where(small, 1.0, theta)[:, None]
+    s = np.sin(theta / 2.0)
+    q = np.column_stack([np.cos(theta / 2.0), s * l[:, 0], s * l[:, 1], s * l[:, 2]])
+    q[small] = [1.0, 0.0, 0.0, 0.0]
+
+    t = np.column_stack([np.zeros(len(Hs)), Hs[:, :3, 3]])
+    return np.stack([q, 0.5 * qmult_batch(t, q)], axis=2)
+
+
+def dual_quaternion_pairs(pairs):
+    Ar, Br = pair_arrays(pairs)
+    return list(zip(hom2quar_batch(Ar), hom2quar_batch(Br)))
+
+
+def daniilidis(As, Bs, pairs=None, quats=None):
+    if quats is None:
+        if pairs is None:
+            pairs = motion_pairs(As, Bs)
+        quats = dual_quaternion_pairs(pairs)
+
+    n = len(quats)
+    qa = np.array([a for a, _ in quats], dtype=np.float64).reshape(n, 4, 2)
+    qb = np.array([b for _, b in quats], dtype=np.float64).reshape(n, 4, 2)
+    v_a1, v_a2 = qa[:, 1:, 0], qa[:, 1:, 1]
+    v_b1, v_b2 = qb[:, 1:, 0], qb[:, 1:, 1]
+
+    # по 6 строк на пару: [a1 - b1, [a1 + b1]x, 0, 0] и [a2 - b2, [a2 + b2]x, a1 - b1, [a1 + b1]x]
+    d1 = (v_a1 - v_b1)[:, :, None]
+    H1 = hat_batch(v_a1 + v_b1)
+    T = np.zeros((n, 6, 8))
+    T[:, :3, 0:1] = d1
+    T[:, :3, 1:4] = H1
+    T[:, 3:, 0:1] = (v_a2 - v_b2)[:, :, None]
+    T[:, 3:, 1:4] = hat_batch(v_a2 + v_b2)
+    T[:, 3:, 4:5] = d1
+    T[:, 3:, 5:8] = H1
+    T = T.reshape(6 * n, 8)
+
+    U, s, Vt = np.linalg.svd(T, full_matrices=False)
     V = Vt.T
 
     u1 = V[0:4, 6]; v1 = V[4:8, 6]
@@ -0,0 +1,100 @@
+import numpy as np
+
+from registry import AX_XB, AX_YB, get_method, prepare_steps
+from results import METHOD_NAME_LEN
+from utils import log_SO3_batch, pair_arrays
+
+
+# порог вращения пары в motion_pairs: если до него не дотянула ни одна пара,
+# motion_pairs молча берёт все пары, и методы AX=XB решаются по малым шумным движениям
+PAIR_THRESHOLD = np.deg2rad(2.0)
+
+# обусловленность ниже DEGENERATE_TOL - метод не запускается, ниже WEAK_TOL - предупреждение
+DEGENERATE_TOL = 1e-3
+WEAK_TOL = 2e-2
+
+CONDITION_OK = "ok"
+CONDITION_WEAK = "weak"
+CONDITION_DEGENERATE = "degenerate"
+
+CONDITION_DTYPE = np.dtype([
+    ("method", f"U{METHOD_NAME_LEN}"), ("problem", "U8"), ("rotation", "f8"), ("translation", "f8"),
+    ("status", "U16"), ("reason", "U128"),
+])
+
+
+def _scatter_ratios(vecs):
+    """Собственные значения разброса S = sum v v^T по убыванию, делённые на наибольшее"""
+    if len(vecs) == 0:
+        return np.zeros(3)
+    w = np.linalg.eigvalsh(vecs.T @ vecs)[::-1]
+    return np.clip(w / w[0], 0.0, 1.0) if w[0] > 0 else np.zeros(3)
+
+
+def motion_excitation(As, Bs, shared=None, max_pairs=None):
+    """
+    Возбуждение движений для обоих типов задач (без решения)
+    AX=XB - по парам относительных движений из общей предобработки:
+    разброс осей вращения S = sum a a^T (отношения собственных значений к наибольшему)
+    и наименьшее к наибольшему собственное значение sum (I - Ra)^T (I - Ra)
+    из системы для переноса; число пар с вращением не меньше PAIR_THRESHOLD
+    AX=YB - по самим позам: разброс векторов log(R^T Ra) вокруг средней ориентации R
+    и наименьшее собственное значение нормальной матрицы переноса на позу 1 - sigma_max(mean Ra)
+    shared - общая предобработка (пары берутся из неё и дописываются в неё)
+    """
+    shared = prepare_steps(("relative_motions",), As, Bs, shared, max_pairs)
+    Ar, _ = pair_arrays(shared["pairs"])
+    a_vecs = log_SO3_batch(Ar[:, :3, :3])
+    D = np.eye(3) - Ar[:, :3, :3]
+    w = np.linalg.eigvalsh(np.einsum("nji,njk->ik", D, D))
+    moving = int(np.count_nonzero(np.linalg.norm(a_vecs, axis=1) >= PAIR_THRESHOLD))
+
+    Ra = np.asarray(As, dtype=np.float64)[:, :3, :3]
+    U, s, Vt = np.linalg.svd(Ra.mean(axis=0))
+    R = U @ Vt
+    pose_vecs = log_SO3_batch(np.einsum("ji,njk->nik", R, Ra))
+    return {
+        AX_XB: {"pairs": len(Ar), "moving": moving, "axes": _scatter_ratios(a_vecs),
+                "translation": w[0] / w[-1] if w[-1] > 0 else 0.0},
+        AX_YB: {"poses": len(Ra), "axes": _scatter_ratios(pose_vecs),
+                "translation": max(1.0 - s[0], 0.0)},
+    }
+
+
+def _classify(value, what):
+    if value < DEGENERATE_TOL:
+        return CONDITION_DEGENERATE, f"вырождено: {what} {value:.1e}"
+    if value < WEAK_TOL:
+        return CONDITION_WEAK, f"слабо: {what} {value:.1e}"
+    return CONDITION_OK, ""
+
+
+def assess_methods(methods, As, Bs, shared=None, max_pairs=None, excitation=None):
+    """
+    Обусловленность задачи для каждого метода до запуска решателей
+    rotation - отношение rotation_rank-го собственного значения разброса осей
+    к наибольшему (MethodSpec.rotation_rank: сколько независимых осей нужно методу),
+    translation - обусловленность системы для переноса (см. motion_excitation)
+    status - "degenerate" (ниже DEGENERATE_TOL: метод не стоит запускать), "weak"
+    (ниже WEAK_TOL или у метода AX=XB нет ни одной пары с вращением от PAIR_THRESHOLD)
+    или "ok"; reason - худшая из проверок
+    excitation - готовый результат motion_excitation
+    Возвращает структурированный массив CONDITION_DTYPE в порядке methods
+    """
+    if excitation is None:
+        excitation = motion_excitation(As, Bs, shared, max_pairs)
+    out = np.zeros(len(methods), dtype=CONDITION_DTYPE)
+    for i, name in enumerate(methods):
+        spec = get_method(name)
+        ex = excitation[spec.problem]
+        rotation = ex["axes"][spec.rotation_rank - 1]
+        checks = [_classify(rotation, "разброс осей вращения"),
+                  _classify(ex["translation"], "возбуждение переноса")]
+        if spec.problem == AX_XB and ex["moving"] == 0:
+            threshold = np.rad2deg(PAIR_THRESHOLD)
+            checks.append((CONDITION_WEAK, f"слабо: все пары с вращением меньше {threshold:g}°"))
+        # худшая из проверок; при равенстве - первая
+        order = (CONDITION_DEGENERATE, CONDITION_WEAK, CONDITION_OK)
+        status, reason = min(checks, key=lambda c: order.index(c[0]))
+        out[i] = (name, spec.problem, rotation, ex["translation"], status, reason)
+    return out
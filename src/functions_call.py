@@ -1,30 +1,50 @@
+import os
+import time
+
 import numpy as np
 
 from utils import load_poses_csv, df_to_Ts, summarize_errors
-from tsai_lenz import tsai_lenz
-from park_martin import park_martin
-from daniilidis import daniilidis
-from li_wang_wu import li_wang_wu
-from shah import shah
+from registry import available_methods, get_method, prepare, schedule
+from result_cache import file_hash, make_key
+from robust import ransac
+from refine import refine_xy
+from results import (
+    ResultTable, STATUS_OK, STATUS_ERROR, STATUS_DEGENERATE, STATUS_CANCELLED, METHOD_NAME_LEN,
+    check_dataset_name, clip_text, method_name_error, stats_fields
+)
+from degeneracy import CONDITION_DEGENERATE, assess_methods
+from watchdog import (
+    WorkerFailure, cancelled, check_budget, describe_exception, run_with_budget
+)
 
 
 DEFAULT_A = "data/calibF/MeasuredPositionsLeica.txt"
 DEFAULT_B = "data/calibF/MeasuredPositionsTS_ModelLines.txt"
 
-def run_method(name, As, Bs):
-    if name == "tsai-lenz":
-        X, Y = tsai_lenz(As, Bs)
-    elif name == "park-martin":
-        X, Y = park_martin(As, Bs)
-    elif name == "daniilidis":
-        X, Y = daniilidis(As, Bs)
-    elif name == "li-wang-wu":
-        X, Y = li_wang_wu(As, Bs)
-    elif name == "shah":
-        X, Y = shah(As, Bs)
-    else:
-        raise ValueError(f"Неизвестный метод: {name}")
-
+def solve_method(name, As, Bs, shared=None, robust=None, max_pairs=None, refine=False):
+    """
+    robust - None для обычного решения или словарь параметров robust.ransac
+    max_pairs - ограничение числа пар движений для методов AX=XB (передаётся и в ransac)
+    refine - уточнить решение refine.refine_xy (в устойчивом режиме - по инлаерам)
+    """
+    if robust is not None:
+        X, Y, inliers = ransac(name, As, Bs, max_pairs=max_pairs, **robust)
+        if refine:
+            X, Y = refine_xy(np.asarray(As)[inliers], np.asarray(Bs)[inliers], X, Y)
+        return X, Y
+    X, Y = get_method(name).solve(As, Bs, shared, max_pairs)
+    if refine:
+        X, Y = refine_xy(As, Bs, X, Y)
+    return X, Y
+
+
+def run_method(name, As, Bs, shared=None, return_residuals=False, robust=None,
+               max_pairs=None, refine=False):
+    X, Y = solve_method(name, As, Bs, shared, robust, max_pairs, refine)
+
+    if return_residuals:
+        t_stats, r_stats, t_errs, r_errs = summarize_errors(As, Bs, X, Y, return_residuals=True)
+        return X, Y, t_stats, r_stats, t_errs, r_errs
     t_stats, r_stats = summarize_errors(As, Bs, X, Y)
     return X, Y, t_stats, r_stats
 
@@ -38,6 +58,14 @@ def load_inputs(file_A, file_B):
     return As, Bs
 
 
+def iter_pose_chunks(file_A, file_B, chunk_size=100_000):
+    """Читает оба файла синхронными порциями (As, Bs) для обработки логов больше памяти"""
+    reader_A = load_poses_csv(file_A, chunksize=chunk_size)
+    reader_B = load_poses_csv(file_B, chunksize=chunk_size)
+    for dfA, dfB in zip(reader_A, reader_B):
+        yield df_to_Ts(dfA), df_to_Ts(dfB)
+
+
 def print_table(rows, headers):
     widths = [len(h) for h in headers]
     for r in rows:
@@ -58,33 +86,156 @@ def print_table(rows, headers):
     print(line_sep)
 
 
-def get_error_data(methods, file_a, file_b):
-    As, Bs = load_inputs(file_a, file_b)
-    t_rows = {}
-    r_rows = {}
+def evaluate_methods(methods, As, Bs, dataset="", noise_level=0.0, trial=0,
+                     shared=None, table=None, residuals=None, robust=None, max_pairs=None,
+                     refine=False, budget=None, precheck=False, progress=None):
+    """
+    Запускает методы на готовых массивах поз и дописывает по строке на метод в ResultTable
+    Ошибка метода не прерывает остальные: строка получает status="error" и текст исключения
+    (имя длиннее METHOD_NAME_LEN - тоже ошибка метода, имя в строке обрезается);
+    имя набора длиннее DATASET_NAME_LEN - ValueError
+    residuals - словарь, куда складываются ошибки по позам {метод: (t_errs, r_errs)};
+    если None, массивы не сохраняются
+    robust - параметры robust.ransac для устойчивого режима (ошибки считаются по всем позам)
+    max_pairs - ограничение числа пар движений для методов AX=XB
+    refine - уточнять X, Y методом Левенберга-Марквардта на SE(3)
+    budget - {"timeout": секунды, "memory_mb": мегабайты}: каждый метод решается в отдельном
+    процессе и при превышении лимита убивается, строка получает status="timeout"
+    или "memory" и затраченное время; после установки budget["cancel"] решаемый метод
+    убивается, а оставшиеся не запускаются (status="cancelled"); общая предобработка
+    при этом считается до запуска процессов и под лимиты не попадает
+    precheck - до решения оценить обусловленность движений (degeneracy.assess_methods)
+    и не запускать безнадёжные методы: их строки получают status="degenerate" и причину
+    progress - функция progress(метод, статус), вызывается после каждого метода
+    (например, чтобы окно программы двигало индикатор выполнения)
+    """
+    if table is None:
+        table = ResultTable()
+    if shared is None:
+        shared = {}
+    check_dataset_name(dataset)
+    if budget is not None:
+        check_budget(budget)
+    common = {"dataset": dataset, "noise_level": noise_level, "trial": trial}
+    skipped = {}
+    if precheck:
+        known = [name for name in methods if name in available_methods()]
+        for row in assess_methods(known, As, Bs, shared, max_pairs):
+            if row["status"] == CONDITION_DEGENERATE:
+                skipped[str(row["method"])] = str(row["reason"])
+    failed = {}
+    if budget is not None and robust is None:
+        # дочерний процесс получает копию shared и его дополнения теряются при выходе,
+        # поэтому общая предобработка считается заранее в этом процессе; если она упала,
+        # методы, которым она нужна, получают её ошибку, а не пересчитывают её каждый
+        specs = [get_method(name) for name in methods if name in available_methods()]
+        try:
+            prepare(specs, As, Bs, shared, max_pairs)
+        except Exception as e:
+            error = f"Общая предобработка: {describe_exception(e)}"
+            failed = {spec.name: error for spec in specs if spec.preprocessing}
+    # общая предобработка считается один раз, методы идут по возрастанию стоимости
+    for name in schedule(methods, len(As)):
+        if method_name_error(name):
+            # имя не помещается в поле method: строка с обрезанным именем вместо исключения
+            table.append(method=clip_text(name, METHOD_NAME_LEN), status=STATUS_ERROR,
+                         error=method_name_error(name), **common)
+        elif cancelled(budget):
+            table.append(method=name, status=STATUS_CANCELLED, error="Расчёт отменён",
+                         **common)
+        elif name in skipped:
+            table.append(method=name, status=STATUS_DEGENERATE, error=skipped[name], **common)
+        elif name in failed:
+            table.append(method=name, status=STATUS_ERROR, error=failed[name], **common)
+        else:
+            _solve_row(name, As, Bs, common, table, shared, residuals, robust, max_pairs,
+                       refine, budget)
+        if progress is not None:
+            progress(name, table.column("status")[-1])
+    return table
+
+
+def _solve_row(name, As, Bs, common, table, shared, residuals, robust, max_pairs, refine,
+               budget):
+    """Решает один метод и дописывает его строку (с ошибкой вместо исключения)"""
+    start = time.perf_counter()
+    try:
+        if budget is not None:
+            X, Y = run_with_budget(solve_method, name, As, Bs, shared, robust, max_pairs,
+                                   refine, **budget)
+        else:
+            X, Y = solve_method(name, As, Bs, shared, robust, max_pairs, refine)
+        solved = time.perf_counter()
+        if residuals is not None:
+            t_stats, r_stats, t_errs, r_errs = summarize_errors(As, Bs, X, Y,
+                                                                return_residuals=True)
+            residuals[name] = (t_errs, r_errs)
+        else:
+            t_stats, r_stats = summarize_errors(As, Bs, X, Y)
+    except WorkerFailure as e:
+        table.append(method=name, status=e.status, error=str(e), solve_time=e.elapsed,
+                     **common)
+        return
+    except Exception as e:
+        table.append(method=name, status=STATUS_ERROR, error=describe_exception(e),
+                     solve_time=time.perf_counter() - start, **common)
+        return
+    table.append(method=name, X=X, Y=Y, solve_time=solved - start,
+                 eval_time=time.perf_counter() - solved,
+                 **stats_fields(t_stats, r_stats), **common)
+
+
+def get_error_table(methods, file_a, file_b, cache=None, noise=None, dataset=None,
+                    budget=None, progress=None):
+    """
+    Результаты методов в виде ResultTable (строки в порядке methods)
+    cache - ResultCache; пересчитываются только методы, которых нет в кэше
+    noise - описание шума файла B (тип/параметры/сид), входит в ключ кэша
+    budget - лимиты времени и памяти на метод и событие отмены (см. evaluate_methods)
+    progress - функция progress(метод, статус) после каждого метода, в том числе взятого из кэша
+    """
+    if dataset is None:
+        dataset = os.path.basename(file_a)
+    check_dataset_name(dataset)
+    noise_level = noise.get("level", 0.0) if noise else 0.0
+    rows = {}
+    keys = {}
+    if cache is not None:
+        hash_a, hash_b = file_hash(file_a), file_hash(file_b)
+        for name in methods:
+            keys[name] = make_key(hash_a, hash_b, name, noise)
+            cached = cache.get(keys[name])
+            if cached is not None:
+                rows[name] = dict(cached, dataset=dataset)
+                if progress is not None:
+                    progress(name, rows[name]["status"])
+    pending = [name for name in methods if name not in rows]
+    if pending:
+        As, Bs = load_inputs(file_a, file_b)
+        fresh = evaluate_methods(pending, As, Bs, dataset=dataset, noise_level=noise_level,
+                                 budget=budget, progress=progress)
+        # строки ищутся по имени в таблице: у слишком длинных имён оно обрезано
+        names = {clip_text(name, METHOD_NAME_LEN): name for name in pending}
+        for i in range(len(fresh)):
+            row = fresh.row(i)
+            name = names[row["method"]]
+            rows[name] = row
+            if cache is not None and row["status"] == STATUS_OK:
+                cache.put(keys[name], row)
+
+    table = ResultTable(capacity=len(methods))
     for name in methods:
-            try:
-                _, _, t_stats, r_stats = run_method(name, As, Bs)
-                t_rows[name] = t_stats
-                r_rows[name] = r_stats
-            except Exception:
-                t_rows[name] = {
-                    "mean": "ERR",
-                    "median": "ERR",
-                    "rmse": "ERR",
-                    "p95": "ERR",
-                    "max": "ERR"
-                    }
-                r_rows[name] = {
-                    "mean": "ERR",
-                    "median": "ERR",
-                    "rmse": "ERR",
-                    "p95": "ERR",
-                    "max": "ERR"
-                    }
-    return t_rows, r_rows
+        table.append(**rows[name])
+    return table
+
+
+def get_error_data(methods, file_a, file_b, cache=None, noise=None, budget=None,
+                   progress=None):
+    """Метрики по методам в виде двух словарей; для упавших методов значения NaN"""
+    return get_error_table(methods, file_a, file_b, cache=cache, noise=noise,
+                           budget=budget, progress=progress).to_stats_dicts()
 
 if __name__ == "__main__":
-    one, two = get_error_data(["shah"], "1.txt", "2.txt")
-    print(one)
-    print(two)
\ No newline at end of file
+    import sys
+    from cli import main
+    sys.exit(main())
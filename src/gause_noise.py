@@ -1,66 +1,92 @@
 import numpy as np
 from pathlib import Path
-from scipy.stats import multivariate_normal
 
-def gaussian_noise_generator(input_file, pos_std=0.5, rot_std=0.05, 
-                           correlation=0.1, seed=42):
+from utils import read_pose_lines, format_pose_lines
+from rng import standard_normal_range
+
+
+# имя потока случайных чисел гауссовского шума (см. rng.block_generator)
+STREAM = "gaussian"
+
+
+def correlation_factor(correlation=0.1):
+    """
+    Нижний треугольный множитель L (3x3) матрицы корреляции осей, C = L L^T
+    Допустимы correlation из [-0.5, 1]: вне отрезка матрица не положительно
+    полуопределена - ValueError. При correlation=1 (или -0.5) матрица вырождена,
+    тогда берётся симметричный корень через eigh
+    """
+    C = np.full((3, 3), float(correlation))
+    np.fill_diagonal(C, 1.0)
+    try:
+        return np.linalg.cholesky(C)
+    except np.linalg.LinAlgError:
+        w, V = np.linalg.eigh(C)
+        if w.min() < -1e-12:
+            raise ValueError(f"Матрица корреляции не положительно полуопределена "
+                             f"(correlation должна быть в [-0.5, 1]): {correlation}") from None
+        return V * np.sqrt(np.clip(w, 0.0, None))
+
+
+def noise_factor(pos_std=0.5, rot_std=0.05, correlation=0.1):
+    """
+    Множитель 6x6 ковариации шума (x, y, z, три угла): блочно-диагональный,
+    строки масштабированы на СКО, поэтому нулевое СКО не делает разложение вырожденным
+    """
+    L = correlation_factor(correlation)
+    F = np.zeros((6, 6))
+    F[:3, :3] = pos_std * L
+    F[3:, 3:] = rot_std * L
+    return F
+
+
+def gaussian_noise(n, pos_std=0.5, rot_std=0.05, correlation=0.1, rng=None):
+    """Выборка (n, 6) коррелированного гауссовского шума за один вызов генератора"""
+    if rng is None:
+        rng = np.random.default_rng()
+    F = noise_factor(pos_std, rot_std, correlation)
+    return rng.standard_normal((n, 6)) @ F.T
+
+
+def add_gaussian_noise(values, pos_std=0.5, rot_std=0.05, correlation=0.1, seed=42, rng=None,
+                       start=0):
+    """
+    Зашумляет массив (N, 6) в формате файла (X, Y, Z и три угла) целиком
+    По умолчанию шум берётся из счётчикового генератора по номерам поз [start, start + N),
+    так что любой диапазон поз воспроизводится независимо от остальных
+    rng - явный генератор вместо счётчикового (seed и start тогда не используются)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if rng is not None:
+        return values + gaussian_noise(len(values), pos_std, rot_std, correlation, rng)
+    F = noise_factor(pos_std, rot_std, correlation)
+    return values + standard_normal_range(seed, STREAM, start, start + len(values)) @ F.T
+
+
+def gaussian_noise_generator(input_file, pos_std=0.5, rot_std=0.05,
+                           correlation=0.1, seed=42, chunk_size=100_000):
     """
     Гауссовский шум
+    Файл читается порциями по chunk_size строк; шум позы определяется её порядковым
+    номером и seed, поэтому результат не зависит от chunk_size
     """
-    np.random.seed(seed)
-    
-    with open(input_file, 'r') as f:
-        for line_num, line in enumerate(f):
-            parts = line.strip().split()
-            if len(parts) < 7:
-                print(f"Пропуск некорректной строки {line_num+1}")
-                continue
-                
-            try:
-                frame_id = parts[0]
-                x, y, z, rx, ry, rz = map(float, parts[1:7])
-                
-                # Ковариационные матрицы SciPy
-                pos_cov = pos_std**2 * np.array([
-                    [1.0, correlation, correlation],
-                    [correlation, 1.0, correlation],
-                    [correlation, correlation, 1.0]
-                ])
-                rot_cov = rot_std**2 * np.array([
-                    [1.0, correlation, correlation],
-                    [correlation, 1.0, correlation],
-                    [correlation, correlation, 1.0]
-                ])
-                
-                # SciPy multivariate_normal — ЧИСТЫЙ ГАУСС
-                pos_noise = multivariate_normal(mean=[0,0,0], cov=pos_cov).rvs()
-                rot_noise = multivariate_normal(mean=[0,0,0], cov=rot_cov).rvs()
-                
-                noisy_x = x + pos_noise[0]
-                noisy_y = y + pos_noise[1]
-                noisy_z = z + pos_noise[2]
-                noisy_rx = rx + rot_noise[0]
-                noisy_ry = ry + rot_noise[1]
-                noisy_rz = rot_noise[2]
-                
-                yield f"{frame_id} {noisy_x:.6f} {noisy_y:.6f} {noisy_z:.6f} " \
-                      f"{noisy_rx:.6f} {noisy_ry:.6f} {noisy_rz:.6f}"
-                      
-            except (ValueError, IndexError) as e:
-                print(f"Ошибка в строке {line_num+1}: {e}")
-                continue
-
-
-def process_gaussian_file(input_file, output_file, pos_std=0.0, rot_std=0.0, 
-                         correlation=0.1, seed=42):
-    """Обрабатывает файл построчно и сохраняет результат"""
+    start = 0
+    for _, ids, values in read_pose_lines(input_file, chunk_size):
+        noisy = add_gaussian_noise(values, pos_std, rot_std, correlation, seed, start=start)
+        start += len(values)
+        yield from format_pose_lines(ids, noisy)
+
+
+def process_gaussian_file(input_file, output_file, pos_std=0.0, rot_std=0.0,
+                         correlation=0.1, seed=42, chunk_size=100_000):
+    """Обрабатывает файл порциями и сохраняет результат"""
     with open(output_file, 'w') as out_f:
-        for noisy_line in gaussian_noise_generator(input_file, pos_std, rot_std, 
-                                                 correlation, seed):
+        for noisy_line in gaussian_noise_generator(input_file, pos_std, rot_std,
+                                                 correlation, seed, chunk_size):
             out_f.write(noisy_line + '\n')
 
 """
-Как использовать 
+Как использовать
 Вызываешь команду process_gaussian_file
 каждое поле отвечает за:
 input_file - входной фаил
@@ -68,5 +94,8 @@ output_file - выходной фаил
 pos_std - задает стандарное отклонение положения (при нуле не влияет на исходные данные) [0.0 - 20]
 rot_std - задает станлартное отклонение углов (при нуле не влияет на исходные данные) [0.0 - 0.5]
 corrlation -  корреляция между осями (0=независимые, 1=идентичный шум) [0.0 - 1.0]
-seed - сид как в майне для регерации псевдослучайных чисел 
-"""
\ No newline at end of file
+seed - сид как в майне для регерации псевдослучайных чисел
+chunk_size - сколько строк обрабатывается за раз (ограничивает память на больших файлах)
+
+Для массивов в памяти - add_gaussian_noise(values, ...), values формы (N, 6)
+"""
@@ -0,0 +1,190 @@
+import numpy as np
+
+from cross_validation import holdout_indices
+from functions_call import solve_method
+from registry import get_method
+from results import DATASET_NAME_LEN, METHOD_NAME_LEN, check_dataset_name
+from rng import block_generator
+from utils import error_stats_batch, pose_residuals_batch
+
+
+# поток случайных чисел для подвыборок и порядков поз
+STREAM = "learning_curve"
+
+# random - независимые случайные подвыборки для каждого n;
+# prefix - префиксы repeats случайных порядков поз (вложенные подвыборки);
+# ordered - префиксы в порядке записи (одна кривая: как ошибка убывает по ходу съёмки)
+LEARNING_MODES = ("random", "prefix", "ordered")
+
+CURVE_DTYPE = np.dtype([("dataset", f"U{DATASET_NAME_LEN}"), ("method", f"U{METHOD_NAME_LEN}"),
+                        ("n", "i8"), ("column", "U16"), ("count", "i8"), ("failed", "i8"),
+                        ("mean", "f8"), ("std", "f8"), ("ci_low", "f8"), ("ci_high", "f8"),
+                        ("low", "f8"), ("high", "f8")])
+
+
+def curve_sizes(n_max, n_min=3, num=30):
+    """Размеры подвыборок: все n от n_min до n_max или num геометрически распределённых"""
+    if n_max < n_min:
+        raise ValueError(f"Для кривой нужно не меньше {n_min} обучающих поз: {n_max}")
+    if num is None or n_max - n_min + 1 <= num:
+        return np.arange(n_min, n_max + 1)
+    return np.unique(np.round(np.geomspace(n_min, n_max, num)).astype(np.int64))
+
+
+def _subsets(mode, n_pool, sizes, repeats, seed):
+    """
+    Номера обучающих поз (в пуле): для random - по матрице (repeats, n) на размер,
+    для prefix/ordered - матрица порядков (R, n_pool), подвыборка размера n - её первые n столбцов
+    """
+    if mode == "ordered":
+        return np.arange(n_pool)[None]
+    if mode == "prefix":
+        return np.argsort(block_generator(seed, STREAM, 0).random((repeats, n_pool)), axis=1)
+    return {int(n): np.argsort(block_generator(seed, STREAM, int(n)).random((repeats, n_pool)),
+                               axis=1)[:, :n] for n in sizes}
+
+
+def pose_statistics(accumulate, As, Bs):
+    """Достаточные статистики каждой позы отдельно: {ключ: массив (n, ...)}"""
+    parts = [accumulate(As[i:i + 1], Bs[i:i + 1]) for i in range(len(As))]
+    return {key: np.array([p[key] for p in parts], dtype=np.float64) for key in parts[0]}
+
+
+def _random_sums(per_pose, idx):
+    """Статистики всех подвыборок одного размера одним умножением на матрицу индикаторов"""
+    n_pool = len(next(iter(per_pose.values())))
+    mask = np.zeros((len(idx), n_pool))
+    np.put_along_axis(mask, idx, 1.0, axis=1)
+    sums = {key: (mask @ v.reshape(n_pool, -1)).reshape((len(idx),) + v.shape[1:])
+            for key, v in per_pose.items()}
+    return [{key: s[r] for key, s in sums.items()} for r in range(len(idx))]
+
+
+def _prefix_sums(per_pose, orders, sizes):
+    """Статистики префиксов: накопленные суммы вдоль каждого порядка -> [размер][повтор]"""
+    out = [[None] * len(orders) for _ in sizes]
+    for r, order in enumerate(orders):
+        cums = {key: np.cumsum(v[order], axis=0)[sizes - 1] for key, v in per_pose.items()}
+        for s in range(len(sizes)):
+            out[s][r] = {key: c[s] for key, c in cums.items()}
+    return out
+
+
+def _solve_all(name, As, Bs, subsets, sizes, mode, max_pairs, use_statistics):
+    """
+    Решения X, Y формы (размер, повтор, 4, 4); неудавшиеся решения - NaN
+    Подвыборки меньше spec.min_poses не решаются; из ошибок решателя пропускается только
+    LinAlgError (вырожденные движения подвыборки), остальные исключения пробрасываются
+    Подвыборки решаются по одной: пакетных решателей (MethodSpec.batch) среди методов нет,
+    а для методов со статистиками пакетно собираются сами суммы подвыборок
+    """
+    spec = get_method(name)
+    if mode == "random":
+        index = [subsets[int(n)] for n in sizes]
+    else:
+        index = [subsets[:, :n] for n in sizes]
+    shape = (len(sizes), len(index[0]), 4, 4)
+    Xs, Ys = np.full(shape, np.nan), np.full(shape, np.nan)
+
+    stats = None
+    if use_statistics and spec.statistics is not None:
+        accumulate, solve = spec.statistics
+        per_pose = pose_statistics(accumulate, As, Bs)
+        if mode == "random":
+            stats = [_random_sums(per_pose, idx) for idx in index]
+        else:
+            stats = _prefix_sums(per_pose, subsets, sizes)
+
+    for s, idx in enumerate(index):
+        if sizes[s] < spec.min_poses:
+            continue
+        for r, sample in enumerate(idx):
+            try:
+                if stats is not None:
+                    X, Y = solve(stats[s][r])
+                else:
+                    # относительные движения AX=XB берутся по траектории
+                    sample = np.sort(sample)
+                    X, Y = solve_method(name, As[sample], Bs[sample], max_pairs=max_pairs)
+            except np.linalg.LinAlgError:
+                # подвыборка, на которой метод не решается (вырожденные движения)
+                continue
+            Xs[s, r], Ys[s, r] = X, Y
+    return Xs, Ys
+
+
+def learning_curve(methods, As, Bs, sizes=None, mode="random", repeats=20, test_fraction=0.2,
+                   columns=("t_rmse", "r_rmse"), seed=0, max_pairs=None, alpha=0.05, z=1.96,
+                   dataset="", use_statistics=True):
+    """
+    Кривые обучения: ошибка методов в зависимости от числа поз n
+    Доля test_fraction поз откладывается один раз (None - оценка на всех позах), обучающие
+    подвыборки размеров sizes берутся из остальных (см. LEARNING_MODES), все решения
+    одного размера оцениваются на отложенных позах одним pose_residuals_batch
+    Методы с достаточными статистиками не проходят по позам заново: статистики
+    случайных подвыборок - произведение матрицы индикаторов на статистики поз,
+    префиксов - накопленные суммы
+    Возвращает массив CURVE_DTYPE: строка на (метод, n, колонка) с числом решённых (count)
+    и неудавшихся (failed: меньше min_poses поз, LinAlgError или нечисловое решение)
+    подвыборок, средним и std по повторам, доверительным интервалом среднего
+    mean +- z * std / sqrt(count)
+    и перцентильным разбросом [low, high] уровня alpha для одной съёмки из n поз
+    """
+    if mode not in LEARNING_MODES:
+        raise ValueError(f"Неизвестный режим кривой обучения: {mode}")
+    check_dataset_name(dataset)
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    if test_fraction is None:
+        pool = test = np.arange(len(As))
+    else:
+        test = holdout_indices(len(As), test_fraction, seed=seed)[0]
+        pool = np.setdiff1d(np.arange(len(As)), test)
+    sizes = curve_sizes(len(pool)) if sizes is None else np.asarray(sizes, dtype=np.int64)
+    if len(sizes) == 0 or sizes.min() < 1 or sizes.max() > len(pool):
+        raise ValueError(f"Размеры подвыборок должны быть от 1 до {len(pool)}")
+    subsets = _subsets(mode, len(pool), sizes, repeats, seed)
+    A_pool, B_pool = As[pool], Bs[pool]
+
+    out = []
+    for name in methods:
+        Xs, Ys = _solve_all(name, A_pool, B_pool, subsets, sizes, mode, max_pairs,
+                            use_statistics)
+        for s, n in enumerate(sizes):
+            ok = np.all(np.isfinite(Xs[s]), axis=(1, 2)) & np.all(np.isfinite(Ys[s]), axis=(1, 2))
+            metrics = {}
+            if ok.any():
+                t_errs, r_errs = pose_residuals_batch(As[test], Bs[test], Xs[s][ok], Ys[s][ok])
+                metrics.update({f"t_{m}": v for m, v in error_stats_batch(t_errs).items()})
+                metrics.update({f"r_{m}": v for m, v in error_stats_batch(r_errs).items()})
+            for column in columns:
+                values = metrics.get(column, np.empty(0))
+                count = len(values)
+                mean = values.mean() if count else np.nan
+                std = values.std(ddof=1) if count > 1 else np.nan
+                half = z * std / np.sqrt(count) if count > 1 else np.nan
+                lo, hi = (np.quantile(values, [alpha / 2, 1 - alpha / 2]) if count
+                          else (np.nan, np.nan))
+                out.append((dataset, name, n, column, count, len(ok) - ok.sum(), mean, std,
+                            mean - half, mean + half, lo, hi))
+    return np.array(out, dtype=CURVE_DTYPE)
+
+
+def poses_needed(curves, column="t_rmse", target=1.0, bound="ci_high"):
+    """
+    Наименьшее n, начиная с которого кривая column каждого метода не выше target
+    bound - "mean", "ci_high" (верхняя граница интервала среднего) или "high"
+    (верхний перцентиль разброса); None, если цель не достигнута
+    """
+    out = {}
+    curves = curves[curves["column"] == column]
+    for name in np.unique(curves["method"]):
+        rows = np.sort(curves[curves["method"] == name], order="n")
+        above = np.flatnonzero(~(rows[bound] <= target))
+        if len(above) == 0:
+            out[str(name)] = int(rows["n"][0])
+        elif above[-1] + 1 < len(rows):
+            out[str(name)] = int(rows["n"][above[-1] + 1])
+        else:
+            out[str(name)] = None
+    return out
@@ -1,34 +1,48 @@
 from utils import *
 
-def li_wang_wu(As, Bs):
+def li_wang_wu_system(As, Bs):
+    """Линейная система A x = b для x = (vec RX, vec RY, tX, tY), по 12 строк на позу"""
     n = len(As)
 
-    A = np.zeros((12 * n, 24))
-    b = np.zeros((12 * n, 1))
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    Ra = As[:, :3, :3]
+    RbT = Bs[:, :3, :3].transpose(0, 2, 1)
+    ta = As[:, :3, 3]
+    tb = Bs[:, :3, 3]
     I3 = np.eye(3)
 
-    for i, (A1, B1) in enumerate(zip(As, Bs)):
-        Ra = A1[:3, :3]
-        Rb = B1[:3, :3]
-        ta = A1[:3, 3]
-        tb = B1[:3, 3]
+    # блоки kron для всех поз сразу: kron(P, Q)[3p+q, 3r+s] = P[p, r] Q[q, s]
+    A = np.zeros((n, 12, 24))
+    A[:, 0:9, 0:9] = np.einsum('npr,qs->npqrs', Ra, I3).reshape(n, 9, 9)
+    A[:, 0:9, 9:18] = np.einsum('pr,nqs->npqrs', -I3, RbT).reshape(n, 9, 9)
+    A[:, 9:12, 9:18] = np.einsum('pr,ns->nprs', I3, tb).reshape(n, 3, 9)
+    A[:, 9:12, 18:21] = -Ra
+    A[:, 9:12, 21:24] = I3
+    A = A.reshape(12 * n, 24)
 
-        A[12*i:12*i+9, 0:18] = np.hstack([
-            np.kron(Ra, I3),
-            np.kron(-I3, Rb.T)
-        ])
+    b = np.zeros((n, 12))
+    b[:, 9:12] = ta
+    b = b.reshape(12 * n, 1)
+    return A, b
 
-        A[12*i+9:12*i+12, 9:24] = np.hstack([
-            np.kron(I3, tb.reshape(1, 3)),
-            -Ra,
-            I3
-        ])
 
-        b[12*i+9:12*i+12, 0] = ta
+def li_wang_wu_statistics(As, Bs):
+    """
+    Достаточные статистики: A^T A и A^T b системы li_wang_wu_system
+    Это суммы по позам, поэтому статистики частей данных складываются и вычитаются
+    """
+    A, b = li_wang_wu_system(As, Bs)
+    return {"n": len(As), "AtA": A.T @ A, "Atb": A.T @ b}
+
+
+def li_wang_wu_from_statistics(stats):
+    """Решение по li_wang_wu_statistics (нормальные уравнения вместо МНК по всей системе)"""
+    x, _, _, _ = np.linalg.lstsq(stats["AtA"], stats["Atb"], rcond=None)
+    return _poses_from_solution(x.ravel())
 
-    x, _, _, _ = np.linalg.lstsq(A, b, rcond=None)
-    x = x.ravel()
 
+def _poses_from_solution(x):
     Xr = np.reshape(x[0:9], (3, 3), order='F').T
     U, S, Vt = np.linalg.svd(Xr)
     Xr = U @ Vt
@@ -46,3 +60,9 @@ def li_wang_wu(As, Bs):
     Y = compose(Yr, x[21:24])
 
     return X, Y
+
+
+def li_wang_wu(As, Bs):
+    A, b = li_wang_wu_system(As, Bs)
+    x, _, _, _ = np.linalg.lstsq(A, b, rcond=None)
+    return _poses_from_solution(x.ravel())
@@ -0,0 +1,266 @@
+import inspect
+import numbers
+
+import numpy as np
+
+from utils import euler_ZYX_to_R_batch, R_to_euler_ZYX_batch
+from gause_noise import noise_factor
+from perlin_noise import OFFSET_BASES, PerlinNoise, perlin_trajectory_noise
+from pose_noise import perturb_poses
+from rng import BLOCK_SIZE, standard_normal_range, uniform_range, derive_int
+
+
+# Этапы работают над порцией поз [start, start + len(Ts)) и маской сохранённых кадров.
+# Сигнатура: (Ts, keep, seed, stream, start, state, **params) -> (Ts, keep)
+# state - словарь этапа, переживающий порции (нужен для накопления дрейфа)
+# Случайная часть этапа - стандартизованная реализация, не зависящая от амплитуд; она
+# кэшируется в state, поэтому при общем state уровни шума одного испытания получают одну и
+# ту же реализацию, отличающуюся только масштабом (общие случайные числа)
+
+
+def _draw(state, key, make):
+    """Стандартизованная реализация этапа для порции key, повторно не генерируется"""
+    if state.get("draw_key") != key:
+        state["draw"] = make()
+        state["draw_key"] = key
+    return state["draw"]
+
+
+def _twist_scales(pos, rot):
+    return np.array([pos] * 3 + [np.deg2rad(rot)] * 3, dtype=np.float64)
+
+
+def _gaussian(Ts, keep, seed, stream, start, state, pos_std=0.5, rot_std=0.05, correlation=0.1,
+              side="right"):
+    stop = start + len(Ts)
+    z = _draw(state, (start, stop), lambda: standard_normal_range(seed, stream, start, stop))
+    xi = z @ noise_factor(pos_std, np.deg2rad(rot_std), correlation).T
+    return perturb_poses(Ts, xi, side), keep
+
+
+def _perlin(Ts, keep, seed, stream, start, state, pos_scale=5.0, rot_scale=0.05, octaves=4,
+            persistence=0.5, side="right"):
+    stop = start + len(Ts)
+
+    def make():
+        # base от OFFSET_BASES: у каждого (seed, stream) своя таблица перестановок
+        base = OFFSET_BASES + derive_int(seed, stream, 2 ** 32)
+        return perlin_trajectory_noise(np.arange(start, stop), 1.0, 1.0, octaves, persistence,
+                                       noise=PerlinNoise(seed=base))
+
+    unit = _draw(state, (start, stop, octaves, persistence), make)
+    return perturb_poses(Ts, unit * _twist_scales(pos_scale, rot_scale), side), keep
+
+
+def _drift_prefix(seed, stream, block, state):
+    """Сумма приращений всех блоков до block; кэш в state позволяет идти порциями без повторов"""
+    if state.get("block", np.inf) <= block:
+        b, prefix = state["block"], state["prefix"]
+    else:
+        b, prefix = 0, np.zeros(6)
+    while b < block:
+        prefix = prefix + np.cumsum(standard_normal_range(seed, stream, b * BLOCK_SIZE,
+                                                          (b + 1) * BLOCK_SIZE), axis=0)[-1]
+        b += 1
+    state["block"], state["prefix"] = b, prefix
+    return prefix
+
+
+def _drift(Ts, keep, seed, stream, start, state, pos_step=0.05, rot_step=0.005, side="right"):
+    """
+    Случайное блуждание: xi_i = сумма гауссовских шагов 0..i (шаг pos_step мм, rot_step градусов)
+    Суммы считаются поблочно по блокам rng, поэтому результат не зависит от разбиения на порции
+    """
+    stop = start + len(Ts)
+    if stop == start:
+        return Ts, keep
+
+    def make():
+        first, last = start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE
+        prefix = _drift_prefix(seed, stream, first, state)
+        walks = []
+        for b in range(first, last + 1):
+            walk = prefix + np.cumsum(standard_normal_range(seed, stream, b * BLOCK_SIZE,
+                                                            (b + 1) * BLOCK_SIZE), axis=0)
+            walks.append(walk)
+            prefix = walk[-1]
+        state["block"], state["prefix"] = last + 1, prefix
+        offset = first * BLOCK_SIZE
+        return np.concatenate(walks)[start - offset:stop - offset]
+
+    z = _draw(state, (start, stop), make)
+    F = noise_factor(pos_step, np.deg2rad(rot_step), 0.0)
+    return perturb_poses(Ts, z @ F.T, side), keep
+
+
+def _outliers(Ts, keep, seed, stream, start, state, rate=0.01, pos_std=50.0, rot_std=5.0,
+              side="right"):
+    """Редкие грубые выбросы: с вероятностью rate поза получает большой гауссовский скачок"""
+    stop = start + len(Ts)
+    u, z = _draw(state, (start, stop),
+                 lambda: (uniform_range(seed, stream + ":hit", start, stop)[:, 0],
+                          standard_normal_range(seed, stream + ":xi", start, stop)))
+    xi = z @ noise_factor(pos_std, np.deg2rad(rot_std), 0.0).T
+    xi[~(u < rate)] = 0.0
+    return perturb_poses(Ts, xi, side), keep
+
+
+def _dropout(Ts, keep, seed, stream, start, state, rate=0.01, burst=1):
+    """
+    Пропуски кадров: событие с вероятностью rate выбрасывает burst кадров подряд
+    События для кадров до start берутся из того же потока, так что серии не рвутся на границе порций
+    """
+    stop = start + len(Ts)
+    lo = max(start - burst + 1, 0)
+    u = _draw(state, (lo, stop), lambda: uniform_range(seed, stream, lo, stop)[:, 0])
+    events = (u < rate).astype(np.int64)
+    counts = np.concatenate([[0], np.cumsum(events)])
+    idx = np.arange(start, stop) - lo + 1
+    dropped = counts[idx] - counts[np.maximum(idx - burst, 0)] > 0
+    return Ts, keep & ~dropped
+
+
+def _quantize(Ts, keep, seed, stream, start, state, pos_resolution=0.0, rot_resolution=0.0):
+    """Квантование энкодеров: координаты (мм) и углы ZYX (градусы) округляются до шага"""
+    Ts = np.array(Ts, dtype=np.float64)
+    if pos_resolution > 0:
+        Ts[:, :3, 3] = np.round(Ts[:, :3, 3] / pos_resolution) * pos_resolution
+    if rot_resolution > 0:
+        angles = np.rad2deg(R_to_euler_ZYX_batch(Ts[:, :3, :3]))
+        angles = np.round(angles / rot_resolution) * rot_resolution
+        Ts[:, :3, :3] = euler_ZYX_to_R_batch(np.deg2rad(angles))
+    return Ts, keep
+
+
+STAGES = {
+    "gaussian": _gaussian,
+    "perlin": _perlin,
+    "drift": _drift,
+    "outliers": _outliers,
+    "dropout": _dropout,
+    "quantize": _quantize,
+}
+
+# параметры амплитуды, которые масштабируются уровнем шума в NoisePipeline.scaled
+AMPLITUDE_PARAMS = ("pos_std", "rot_std", "pos_scale", "rot_scale", "pos_step", "rot_step")
+
+# допустимые значения числовых параметров этапов: имя -> (проверка, описание)
+_NONNEGATIVE = (lambda v: v >= 0, "неотрицательным")
+_COUNT = (lambda v: v >= 1 and int(v) == v, "целым не меньше 1")
+PARAM_LIMITS = dict(
+    {name: _NONNEGATIVE for name in AMPLITUDE_PARAMS + ("pos_resolution", "rot_resolution")},
+    rate=(lambda v: 0 <= v <= 1, "в [0, 1]"),
+    correlation=(lambda v: -0.5 <= v <= 1, "в [-0.5, 1]"),
+    persistence=(lambda v: v > 0, "положительным"),
+    octaves=_COUNT,
+    burst=_COUNT,
+)
+SIDES = ("right", "left")
+
+
+def check_stage(stage):
+    """
+    Проверяет описание этапа {"type": имя из STAGES, параметры...} при разборе конфига,
+    чтобы ошибка не всплывала глубоко внутри генерации шума
+    """
+    kind = stage.get("type")
+    if kind not in STAGES:
+        raise ValueError(f"Неизвестный этап шума: {kind}")
+    # параметры этапа - аргументы функции после (Ts, keep, seed, stream, start, state)
+    allowed = list(inspect.signature(STAGES[kind]).parameters)[6:]
+    unknown = set(stage) - set(allowed) - {"type"}
+    if unknown:
+        raise ValueError(f"Неизвестные параметры этапа {kind}: {sorted(unknown)}")
+    for key, value in stage.items():
+        if key == "type":
+            continue
+        if key == "side":
+            if value not in SIDES:
+                raise ValueError(f"Параметр side этапа {kind} должен быть из {SIDES}: {value}")
+            continue
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise ValueError(f"Параметр {key} этапа {kind} должен быть числом: {value!r}")
+        check, text = PARAM_LIMITS[key]
+        if not check(value):
+            raise ValueError(f"Параметр {key} этапа {kind} должен быть {text}: {value}")
+    return stage
+
+
+class NoisePipeline:
+    """
+    Декларативный конвейер шума над массивами поз (N, 4, 4)
+    stages - список словарей {"type": имя из STAGES, параметры этапа...}, применяются по порядку;
+    параметры проверяются сразу (check_stage)
+    seed - единственный сид; у каждого этапа свой поток "trial:номер:тип", поэтому
+    шум любого диапазона поз любого испытания воспроизводится независимо
+    """
+
+    def __init__(self, stages, seed=42):
+        self.stages = []
+        for stage in stages:
+            self.stages.append(check_stage(dict(stage)))
+        self.seed = int(seed)
+
+    @classmethod
+    def from_config(cls, config):
+        """Конвейер из словаря {"seed": ..., "stages": [...]} (например, из JSON)"""
+        return cls(config.get("stages", []), config.get("seed", 42))
+
+    def to_config(self):
+        return {"seed": self.seed, "stages": [dict(s) for s in self.stages]}
+
+    def scaled(self, level):
+        """Копия конвейера с амплитудами, умноженными на level (частоты выбросов и пропусков не меняются)"""
+        stages = [{k: v * level if k in AMPLITUDE_PARAMS else v for k, v in s.items()}
+                  for s in self.stages]
+        return NoisePipeline(stages, self.seed)
+
+    def _streams(self, trial):
+        return [f"{trial}:{i}:{s['type']}" for i, s in enumerate(self.stages)]
+
+    def apply(self, Ts, start=0, trial=0, states=None):
+        """
+        Зашумляет порцию поз с номерами [start, start + N)
+        Возвращает (позы, маска сохранённых кадров); выброшенные кадры остаются в массиве
+        states - список словарей состояния этапов (для последовательных порций); общий states
+        для той же порции на разных уровнях (scaled) переиспользует уже сгенерированную реализацию
+        """
+        Ts = np.asarray(Ts, dtype=np.float64)
+        keep = np.ones(len(Ts), dtype=bool)
+        if states is None:
+            states = [{} for _ in self.stages]
+        for stage, stream, state in zip(self.stages, self._streams(trial), states):
+            params = {k: v for k, v in stage.items() if k != "type"}
+            Ts, keep = STAGES[stage["type"]](Ts, keep, self.seed, stream, start, state, **params)
+        return Ts, keep
+
+    def apply_levels(self, Ts, levels, trial=0):
+        """
+        Одно испытание на нескольких уровнях шума с общими случайными числами:
+        реализация генерируется один раз и масштабируется уровнем
+        Выдаёт (уровень, позы, маска)
+        """
+        states = [{} for _ in self.stages]
+        for level in levels:
+            noisy, keep = self.scaled(level).apply(Ts, trial=trial, states=states)
+            yield level, noisy, keep
+
+    def iter_chunks(self, chunks, trial=0, chunk_size=100_000):
+        """
+        Ленивое применение к последовательности порций
+        chunks - массив поз (режется по chunk_size) или итератор массивов
+        Выдаёт (позы, маска) для каждой порции
+        """
+        if isinstance(chunks, np.ndarray):
+            Ts = chunks
+            chunks = (Ts[i:i + chunk_size] for i in range(0, len(Ts), chunk_size))
+        states = [{} for _ in self.stages]
+        start = 0
+        for chunk in chunks:
+            yield self.apply(chunk, start, trial, states)
+            start += len(chunk)
+
+    def apply_pairs(self, As, Bs, trial=0):
+        """Шум к позам B; пропущенные кадры удаляются из обеих последовательностей"""
+        noisy, keep = self.apply(Bs, trial=trial)
+        return np.asarray(As)[keep], noisy[keep]
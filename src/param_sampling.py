@@ -0,0 +1,110 @@
+import warnings
+
+import numpy as np
+from scipy.stats import qmc
+
+from noise_pipeline import NoisePipeline, STAGES
+
+
+SAMPLING_METHODS = ("sobol", "lhs", "random")
+
+# пространство параметров по умолчанию: "тип_этапа.параметр" -> (нижняя, верхняя граница)
+# целые границы задают целочисленный параметр (например, число октав)
+DEFAULT_SPACE = {
+    "gaussian.pos_std": (0.0, 20.0),
+    "gaussian.rot_std": (0.0, 0.5),
+    "gaussian.correlation": (0.0, 0.5),
+    "perlin.octaves": (1, 6),
+    "perlin.persistence": (0.3, 0.7),
+}
+
+# конвейер, к которому применяются параметры DEFAULT_SPACE
+DEFAULT_BASE = {"stages": [{"type": "gaussian"}, {"type": "perlin", "pos_scale": 5.0,
+                                                  "rot_scale": 0.05}]}
+
+
+def parse_space(space):
+    """Проверяет пространство параметров, возвращает [(тип, параметр, lo, hi, целый)]"""
+    dims = []
+    for key, (lo, hi) in space.items():
+        kind, _, param = key.partition(".")
+        if kind not in STAGES or not param:
+            raise ValueError(f"Неизвестный параметр шума: {key}")
+        if hi < lo:
+            raise ValueError(f"Пустой диапазон параметра {key}: [{lo}, {hi}]")
+        integer = isinstance(lo, (int, np.integer)) and isinstance(hi, (int, np.integer))
+        dims.append((kind, param, lo, hi, integer))
+    return dims
+
+
+class ParameterSampler:
+    """
+    Последовательность точек в пространстве параметров шума
+    method - "sobol" (скремблированная последовательность Соболя), "lhs" (латинский гиперкуб)
+    или "random" (псевдослучайные точки, для сравнения)
+    Повторные вызовы draw продолжают последовательность, поэтому её можно потреблять порциями;
+    для Соболя порции длиной степени двойки сохраняют равномерность префикса
+    """
+
+    def __init__(self, space=None, method="sobol", seed=0):
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"Неизвестный способ выборки: {method}")
+        self.dims = parse_space(DEFAULT_SPACE if space is None else space)
+        self.method = method
+        d = len(self.dims)
+        if method == "sobol":
+            self._engine = qmc.Sobol(d, scramble=True, seed=seed)
+        elif method == "lhs":
+            self._engine = qmc.LatinHypercube(d, seed=seed)
+        else:
+            self._rng = np.random.default_rng(seed)
+        self.count = 0
+
+    @property
+    def names(self):
+        return [f"{kind}.{param}" for kind, param, *_ in self.dims]
+
+    def unit(self, n):
+        """Следующие n точек единичного куба (n, d)"""
+        if self.method == "random":
+            u = self._rng.random((n, len(self.dims)))
+        else:
+            with warnings.catch_warnings():
+                # предупреждение Соболя о длине не степени двойки: порции - решение вызывающего
+                warnings.simplefilter("ignore", UserWarning)
+                u = self._engine.random(n)
+        self.count += n
+        return u
+
+    def scale(self, u):
+        """Точки куба -> значения параметров (n, d); целые параметры равномерны на [lo, hi]"""
+        u = np.asarray(u, dtype=np.float64)
+        values = np.empty_like(u)
+        for j, (_, _, lo, hi, integer) in enumerate(self.dims):
+            if integer:
+                values[:, j] = np.minimum(lo + np.floor(u[:, j] * (hi - lo + 1)), hi)
+            else:
+                values[:, j] = lo + u[:, j] * (hi - lo)
+        return values
+
+    def draw(self, n):
+        return self.scale(self.unit(n))
+
+    def configs(self, values, base=None):
+        """
+        Конфиги NoisePipeline для строк values: параметр "тип.имя" ставится во все этапы
+        этого типа конвейера base (этап добавляется, если его нет)
+        """
+        base = NoisePipeline.from_config(DEFAULT_BASE if base is None else base).to_config()
+        out = []
+        for row in np.atleast_2d(values):
+            config = {"seed": base["seed"], "stages": [dict(s) for s in base["stages"]]}
+            for (kind, param, _, _, integer), value in zip(self.dims, row):
+                stages = [s for s in config["stages"] if s["type"] == kind]
+                if not stages:
+                    stages = [{"type": kind}]
+                    config["stages"].extend(stages)
+                for stage in stages:
+                    stage[param] = int(value) if integer else float(value)
+            out.append(config)
+        return out
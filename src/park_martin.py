@@ -1,25 +1,14 @@
 from utils import *
 
-def park_martin(As, Bs):
-    Arel = []
-    Brel = []
-    for i in range(len(As) - 1):
-        Arel.append(invert_T(As[i]) @ As[i + 1])
-        Brel.append(invert_T(Bs[i]) @ Bs[i + 1])
-
-    pairs = []
-    thr = np.deg2rad(2.0)
-    for Ar, Br in zip(Arel, Brel):
-        if np.linalg.norm(log_SO3(Ar[:3, :3])) >= thr and np.linalg.norm(log_SO3(Br[:3, :3])) >= thr:
-            pairs.append((Ar, Br))
-    if not pairs:
-        pairs = list(zip(Arel, Brel))
-
-    M = np.zeros((3, 3))
-    for Ar, Br in pairs:
-        a = log_SO3(Ar[:3, :3])
-        b = log_SO3(Br[:3, :3])
-        M = M + np.outer(b, a)
+def park_martin(As, Bs, pairs=None):
+    if pairs is None:
+        pairs = motion_pairs(As, Bs)
+
+    Ar, Br = pair_arrays(pairs)
+    # сумма внешних произведений b a^T; накопление последовательное, как в цикле:
+    # на вырожденных данных M почти сингулярна и результат чувствителен к порядку сложения
+    outer = np.einsum('ni,nj->nij', log_SO3_batch(Br[:, :3, :3]), log_SO3_batch(Ar[:, :3, :3]))
+    M = np.cumsum(outer, axis=0)[-1] if len(outer) else np.zeros((3, 3))
 
     E = M.T @ M
     w, U = np.linalg.eigh(E)
@@ -34,17 +23,8 @@ def park_martin(As, Bs):
         R = U @ Vt
 
     n = len(pairs)
-    C = np.zeros((3 * n, 3))
-    d = np.zeros(3 * n)
-    I = np.eye(3)
-
-    for i, (Ar, Br) in enumerate(pairs):
-        Ra = Ar[:3, :3]
-        ta = Ar[:3, 3]
-        tb = Br[:3, 3]
-
-        C[3*i:3*i+3, :] = I - Ra
-        d[3*i:3*i+3] = ta - R @ tb
+    C = (np.eye(3) - Ar[:, :3, :3]).reshape(3 * n, 3)
+    d = (Ar[:, :3, 3] - Br[:, :3, 3] @ R.T).reshape(3 * n)
 
     t, _, _, _ = np.linalg.lstsq(C, d, rcond=None)
 
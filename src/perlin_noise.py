@@ -1,85 +1,196 @@
-import numpy as np
+import functools
 import math
+
+import numpy as np
 from pathlib import Path
-from noise import pnoise3
+
+from rng import block_generator
+from utils import read_pose_lines, format_pose_lines
+
+
+# Таблица перестановок Перлина, как в библиотеке noise
+_PERM_BASE = [
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225,
+    140, 36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148,
+    247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32,
+    57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+    74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122,
+    60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54,
+    65, 25, 63, 161, 1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169,
+    200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64,
+    52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212,
+    207, 206, 59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213,
+    119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9,
+    129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104,
+    218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241,
+    81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157,
+    184, 84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93,
+    222, 114, 67, 29, 24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180,
+]
+
+# base из [0, OFFSET_BASES) сдвигает индексы таблицы, как в C-версии pnoise3. C-версия
+# при этом читает за концом своей 512-элементной таблицы (неопределённое поведение,
+# результат зависит от сборки); здесь таблица периодически продолжается, поэтому
+# такие base дают поле base = 0, сдвинутое на (base, base, base) по решётке, и
+# совпадают с pnoise3 везде, где C не выходит за таблицу (при base <= 1 - всюду)
+OFFSET_BASES = 256
+_PERM = np.array(_PERM_BASE * 3, dtype=np.intp)
+
+_GRAD3 = np.array([
+    [1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+    [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+    [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1],
+    [1, 0, -1], [-1, 0, -1], [0, -1, 1], [0, 1, 1],
+], dtype=np.float32)
+
+
+def _lattice(v, repeat):
+    """
+    Индексы узлов решётки i, i+1 (mod 256)
+    repeat=0 (repeatx=False) в C даёт fmodf(x, 0) = NaN и нулевой индекс по оси,
+    это поведение сохранено
+    """
+    if not repeat:
+        zero = np.zeros(v.shape, dtype=np.intp)
+        return zero, zero
+    i = np.floor(np.fmod(v, np.float32(repeat))).astype(np.intp)
+    return i & 255, np.fmod(i + 1, repeat).astype(np.intp) & 255
+
+
+@functools.lru_cache(maxsize=64)
+def _permutation(base):
+    """
+    Таблица и сдвиг индексов для base
+    base >= OFFSET_BASES получает собственную перестановку из 256 элементов
+    от генератора rng (ключ - сам base), поэтому разные base не повторяют друг друга
+    """
+    if base < OFFSET_BASES:
+        return _PERM, base
+    perm = block_generator(base, "perlin", 0).permutation(256)
+    return np.tile(perm, 3).astype(np.intp), 0
+
+
+def _grad(h, x, y, z):
+    g = _GRAD3[h & 15]
+    return x * g[..., 0] + y * g[..., 1] + z * g[..., 2]
+
+
+def pnoise3_array(x, y, z, repeatx=1024, repeaty=1024, repeatz=1024, base=0):
+    """
+    Градиентный шум Перлина (одна октава) для массивов точек
+    Повторяет noise.pnoise3(..., octaves=1): вычисления во float32, те же таблицы
+    x, y, z транслируются по правилам NumPy
+    base - целое >= 0: при base < OFFSET_BASES сдвиг таблицы, как в C (совпадает
+    с pnoise3 с точностью float32 там, где C не читает за концом таблицы),
+    при больших base - собственная перестановка для каждого значения
+    """
+    if int(base) != base or base < 0:
+        raise ValueError(f"base должен быть неотрицательным целым: {base}")
+    P, base = _permutation(int(base))
+    x, y, z = np.broadcast_arrays(*(np.asarray(v, dtype=np.float32) for v in (x, y, z)))
+    i, ii = _lattice(x, repeatx)
+    j, jj = _lattice(y, repeaty)
+    k, kk = _lattice(z, repeatz)
+    i, ii, j, jj, k, kk = (v + base for v in (i, ii, j, jj, k, kk))
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    z = z - np.floor(z)
+    fx = x * x * x * (x * (x * 6 - 15) + 10)
+    fy = y * y * y * (y * (y * 6 - 15) + 10)
+    fz = z * z * z * (z * (z * 6 - 15) + 10)
+
+    A = P[i]
+    AA, AB = P[A + j], P[A + jj]
+    B = P[ii]
+    BA, BB = P[B + j], P[B + jj]
+    x1, y1, z1 = x - 1, y - 1, z - 1
+
+    def lerp(t, a, b):
+        return a + t * (b - a)
+
+    return lerp(fz,
+                lerp(fy, lerp(fx, _grad(P[AA + k], x, y, z), _grad(P[BA + k], x1, y, z)),
+                     lerp(fx, _grad(P[AB + k], x, y1, z), _grad(P[BB + k], x1, y1, z))),
+                lerp(fy, lerp(fx, _grad(P[AA + kk], x, y, z1), _grad(P[BA + kk], x1, y, z1)),
+                     lerp(fx, _grad(P[AB + kk], x, y1, z1), _grad(P[BB + kk], x1, y1, z1))))
 
 
 class PerlinNoise:
     def __init__(self, seed=42):
-        np.random.seed(seed)
+        # шум детерминирован через base=seed, глобальный генератор NumPy не нужен
         self.seed = seed
 
-    def fbm(self, x, y=0, z=0, octaves=4, persistence=0.5, frequency=1.0, scale=0.1):
+    def fbm_array(self, x, y=0, z=0, octaves=4, persistence=0.5, frequency=1.0, scale=0.1):
+        """fbm для массивов: все точки и каналы за один проход на октаву"""
+        x, y, z = (np.asarray(v, dtype=np.float64) for v in (x, y, z))
         total, amplitude, max_amp, freq = 0.0, 1.0, 0.0, frequency
         for _ in range(octaves):
-            total += pnoise3(x * freq, y * freq, z * freq, 
-                           octaves=1, repeatx=False, base=self.seed) * amplitude
+            octave = pnoise3_array(x * freq, y * freq, z * freq, repeatx=False, base=self.seed)
+            total = total + octave.astype(np.float64) * amplitude
             max_amp += amplitude
             amplitude *= persistence
             freq *= 2
         return (total / max_amp - 0.5) * 2 * scale
 
+    def fbm(self, x, y=0, z=0, octaves=4, persistence=0.5, frequency=1.0, scale=0.1):
+        return float(self.fbm_array(x, y, z, octaves, persistence, frequency, scale))
+
 
-def noisy_robot_generator(input_file, pos_scale=5.0, rot_scale=0.05, octaves=4, persistence=0.5, seed=42):
+# смещения по y для каналов X, Y, Z, RX, RY, RZ
+CHANNEL_OFFSETS = np.array([0.0, 100.0, 200.0, 300.0, 400.0, 500.0])
+
+
+def perlin_trajectory_noise(line_nums, pos_scale=5.0, rot_scale=0.05, octaves=4,
+                            persistence=0.5, seed=42, noise=None):
+    """
+    Шум (N, 6) для строк с номерами line_nums (время t = номер строки * 0.1)
+    Все N отсчётов и шесть каналов считаются одним векторизованным проходом
+    """
+    if noise is None:
+        noise = PerlinNoise(seed=seed)
+    t = np.asarray(line_nums, dtype=np.float64)[:, None] * 0.1
+    scales = np.array([pos_scale] * 3 + [rot_scale] * 3, dtype=np.float64)
+    unit = noise.fbm_array(t, CHANNEL_OFFSETS[None, :], 0.0, octaves, persistence, scale=1.0)
+    return unit * scales
+
+
+def noisy_robot_generator(input_file, pos_scale=5.0, rot_scale=0.05, octaves=4, persistence=0.5,
+                          seed=42, chunk_size=100_000):
     """
     шум Перлина
+    Файл читается порциями по chunk_size строк, шум порции считается векторизованно
     """
     noise = PerlinNoise(seed=seed)
-    
-    with open(input_file, 'r') as f:
-        for line_num, line in enumerate(f):
-            parts = line.strip().split()
-            if len(parts) < 7:
-                print(f"Пропуск некорректной строки {line_num+1}")
-                continue
-                
-            try:
-                # Парсим: номер X Y Z RX RY RZ
-                frame_id = parts[0]
-                x, y, z, rx, ry, rz = map(float, parts[1:7])
-                
-                # вычисляем шум для этой строки
-                t = line_num * 0.1  # время = номер строки * коэффициент
-                noise_x = noise.fbm(t, 0, 0, octaves, persistence, scale=pos_scale)
-                noise_y = noise.fbm(t, 100, 0, octaves, persistence, scale=pos_scale)
-                noise_z = noise.fbm(t, 200, 0, octaves, persistence, scale=pos_scale)
-                noise_rx = noise.fbm(t, 300, 0, octaves, persistence, scale=rot_scale)
-                noise_ry = noise.fbm(t, 400, 0, octaves, persistence, scale=rot_scale)
-                noise_rz = noise.fbm(t, 500, 0, octaves, persistence, scale=rot_scale)
-                
-                # зашумленные значения
-                noisy_x = x + noise_x
-                noisy_y = y + noise_y
-                noisy_z = z + noise_z
-                noisy_rx = rx + noise_rx
-                noisy_ry = ry + noise_ry
-                noisy_rz = rz + noise_rz
-                
-                # возвращаем готовую строку
-                yield f"{frame_id} {noisy_x:.6f} {noisy_y:.6f} {noisy_z:.6f} " \
-                      f"{noisy_rx:.6f} {noisy_ry:.6f} {noisy_rz:.6f}"
-                            
-            except (ValueError, IndexError) as e:
-                print(f"Ошибка в строке {line_num+1}: {e}")
-                continue
-
-
-def process_perlin_file(input_file, output_file, pos_scale=0, rot_scale=0, octaves=4, persistence=0.5, seed=42):
-    """Обрабатывает файл построчно и сохраняет результат"""
+    for line_nums, ids, values in read_pose_lines(input_file, chunk_size):
+        noisy = values + perlin_trajectory_noise(line_nums, pos_scale, rot_scale, octaves,
+                                                 persistence, noise=noise)
+        yield from format_pose_lines(ids, noisy)
+
+
+def process_perlin_file(input_file, output_file, pos_scale=0, rot_scale=0, octaves=4, persistence=0.5,
+                        seed=42, chunk_size=100_000):
+    """Обрабатывает файл порциями и сохраняет результат"""
     with open(output_file, 'w') as out_f:
-        for noisy_line in noisy_robot_generator(input_file, pos_scale, rot_scale, octaves, persistence, seed):
+        for noisy_line in noisy_robot_generator(input_file, pos_scale, rot_scale, octaves, persistence,
+                                                seed, chunk_size):
             out_f.write(noisy_line + '\n')
 
 
 """
-Как использовать 
+Как использовать
 Вызываешь команду process_perlin_file
 каждое поле отвечает за:
 input_file - входной фаил
 output_file - выходной фаил
 pos_scale - задает отклонение положении (при нуле не влияет на исходные данные) [0.0 - 20]
 rot_scale - задает отклонение в углах (при нуле не влияет на исходные данные) [0.0 - 0.5]
-octaves - детализация [2 - 8] 
+octaves - детализация [2 - 8]
 persistence - затухание  [0.2 - 0.8], где 0.4-0.5 — натуральное движение
-seed - сид как в майне для регерации псевдослучайных чисел 
+seed - сид как в майне для регерации псевдослучайных чисел
+chunk_size - сколько строк обрабатывается за раз
+
+Шум считается на NumPy (pnoise3_array) и совпадает с noise.pnoise3 при seed 0 и 1;
+при seed от 256 у каждого сида своя таблица перестановок (см. OFFSET_BASES);
+сама библиотека noise больше не обязательна
 """
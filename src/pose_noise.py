@@ -0,0 +1,65 @@
+import numpy as np
+
+from utils import exp_SE3
+from gause_noise import noise_factor
+from perlin_noise import PerlinNoise, perlin_trajectory_noise
+from rng import standard_normal_range
+
+
+# имя потока случайных чисел шума на многообразии (отдельно от шума файлов)
+STREAM = "pose-gaussian"
+
+
+def gaussian_twists(n, pos_std=0.5, rot_std=0.05, correlation=0.1, seed=42, start=0,
+                    stream=STREAM):
+    """
+    Гауссовские приращения xi = (rho, theta) формы (n, 6) для поз [start, start + n)
+    pos_std в мм, rot_std в градусах (как в генераторе файлов), theta возвращается в радианах
+    stream - имя потока случайных чисел (разные потоки дают независимый шум)
+    """
+    F = noise_factor(pos_std, np.deg2rad(rot_std), correlation)
+    return standard_normal_range(seed, stream, start, start + n) @ F.T
+
+
+def perlin_twists(n, pos_scale=5.0, rot_scale=0.05, octaves=4, persistence=0.5, seed=42, start=0):
+    """
+    Гладкие приращения xi формы (n, 6) из fBm Перлина, время - номер позы * 0.1
+    pos_scale в мм, rot_scale в градусах
+    """
+    return perlin_trajectory_noise(np.arange(start, start + n), pos_scale, np.deg2rad(rot_scale),
+                                   octaves, persistence, noise=PerlinNoise(seed=seed))
+
+
+# модели шума: имя -> функция (n, ..., seed, start) -> xi (n, 6)
+NOISE_MODELS = {
+    "gaussian": gaussian_twists,
+    "perlin": perlin_twists,
+}
+
+
+def perturb_poses(Ts, xi, side="right"):
+    """
+    Возмущение поз на многообразии: T exp(xi) (side="right", в системе позы)
+    или exp(xi) T (side="left", в мировой системе)
+    """
+    Ts = np.asarray(Ts, dtype=np.float64)
+    E = exp_SE3(xi)
+    if side == "right":
+        return Ts @ E
+    if side == "left":
+        return E @ Ts
+    raise ValueError(f"Неизвестная сторона возмущения: {side}")
+
+
+def add_pose_noise(Ts, model="gaussian", seed=42, start=0, side="right", **params):
+    """
+    Зашумляет массив поз (N, 4, 4) без перехода к углам Эйлера и тексту
+    params - параметры модели (pos_std/rot_std для gaussian, pos_scale/rot_scale/... для perlin)
+    start - номер первой позы, шум любого диапазона воспроизводится независимо
+    """
+    try:
+        twists = NOISE_MODELS[model]
+    except KeyError:
+        raise ValueError(f"Неизвестная модель шума: {model}") from None
+    xi = twists(len(Ts), seed=seed, start=start, **params)
+    return perturb_poses(Ts, xi, side)
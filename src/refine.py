@@ -0,0 +1,101 @@
+import numpy as np
+
+from utils import (
+    exp_SE3, hat_batch, invert_T_batch, left_jacobian_inv_SO3, log_SO3_batch
+)
+
+
+def _residuals(As_inv, Bs, X, Y, rot_weight):
+    """
+    Невязки r_i = (t_Delta, w * log(R_Delta)) для Delta = X^-1 A^-1 Y B
+    Их нормы - это ошибки summarize_errors (трансляция и угол)
+    """
+    X_inv = invert_T_batch(X[None])[0]
+    G = X_inv @ As_inv
+    Delta = G @ (Y @ Bs)
+    phi = log_SO3_batch(Delta[:, :3, :3])
+    r = np.concatenate([Delta[:, :3, 3], rot_weight * phi], axis=1)
+    return r, G, Delta, phi
+
+
+def _jacobians(G, Delta, phi, rot_weight):
+    """
+    Аналитические якобианы (N, 6, 12) по возмущениям X <- X exp(xi_x), Y <- exp(xi_y) Y
+    Delta' ~ exp(-xi_x + Ad_G xi_y) Delta, а левое возмущение exp(eta) Delta меняет
+    t на rho - [t]x theta и log R на J_l^-1(phi) theta
+    """
+    n = len(G)
+    R_G = G[:, :3, :3]
+    Ad = np.zeros((n, 6, 6))
+    Ad[:, :3, :3] = R_G
+    Ad[:, :3, 3:] = hat_batch(G[:, :3, 3]) @ R_G
+    Ad[:, 3:, 3:] = R_G
+
+    D = np.zeros((n, 6, 6))
+    D[:, :3, :3] = np.eye(3)
+    D[:, :3, 3:] = -hat_batch(Delta[:, :3, 3])
+    D[:, 3:, 3:] = rot_weight * left_jacobian_inv_SO3(phi)
+
+    J = np.empty((n, 6, 12))
+    J[:, :, :6] = -D
+    J[:, :, 6:] = D @ Ad
+    return J
+
+
+def refine_xy(As, Bs, X, Y, rot_weight=180.0 / np.pi, max_iters=20, tol=1e-12,
+              damping=1e-3, return_info=False):
+    """
+    Нелинейное уточнение X, Y на SE(3) методом Левенберга-Марквардта
+    Минимизирует sum |t_Delta|^2 + rot_weight^2 |log R_Delta|^2 - ту же ошибку,
+    что в summarize_errors; по умолчанию 1 градус весит как 1 мм
+    Нормальные уравнения 12x12 накапливаются одной свёрткой по всем позам,
+    поэтому одна итерация стоит O(N)
+    Начальное приближение - X, Y любого метода
+    return_info - дополнительно вернуть словарь с числом итераций и историей стоимости
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    X = np.array(X, dtype=np.float64)
+    Y = np.array(Y, dtype=np.float64)
+    As_inv = invert_T_batch(As)
+
+    r, G, Delta, phi = _residuals(As_inv, Bs, X, Y, rot_weight)
+    cost = float(np.einsum('ni,ni->', r, r))
+    history = [cost]
+    lam = damping
+    iterations = 0
+    for _ in range(max_iters):
+        iterations += 1
+        J = _jacobians(G, Delta, phi, rot_weight)
+        H = np.einsum('nki,nkj->ij', J, J)
+        g = np.einsum('nki,nk->i', J, r)
+        improved = False
+        while lam < 1e12:
+            A = H + lam * np.diag(np.diag(H))
+            try:
+                step = -np.linalg.solve(A, g)
+            except np.linalg.LinAlgError:
+                lam *= 10.0
+                continue
+            X_new = X @ exp_SE3(step[:6])
+            Y_new = exp_SE3(step[6:]) @ Y
+            r_new, G_new, Delta_new, phi_new = _residuals(As_inv, Bs, X_new, Y_new, rot_weight)
+            cost_new = float(np.einsum('ni,ni->', r_new, r_new))
+            if cost_new <= cost:
+                improved = True
+                break
+            lam *= 10.0
+        if not improved:
+            break
+        converged = cost - cost_new <= tol * max(cost, 1.0) or np.linalg.norm(step) < tol
+        X, Y = X_new, Y_new
+        r, G, Delta, phi = r_new, G_new, Delta_new, phi_new
+        cost = cost_new
+        history.append(cost)
+        lam = max(lam / 10.0, 1e-12)
+        if converged:
+            break
+
+    if return_info:
+        return X, Y, {"iterations": iterations, "cost": history}
+    return X, Y
@@ -0,0 +1,174 @@
+from results import method_name_error
+from utils import motion_pairs
+from tsai_lenz import tsai_lenz
+from park_martin import park_martin
+from daniilidis import daniilidis, dual_quaternion_pairs
+from li_wang_wu import li_wang_wu, li_wang_wu_statistics, li_wang_wu_from_statistics
+from shah import shah, shah_statistics, shah_from_statistics
+from uncertainty import covariance_ax_xb, covariance_li_wang_wu, covariance_shah
+
+
+AX_XB = "AX=XB"
+AX_YB = "AX=YB"
+
+# Общая предобработка: имя -> (ключ аргумента решателя, функция)
+# Функция получает As, Bs, уже посчитанные общие данные и max_pairs, поэтому
+# зависимые шаги (кватернионы от относительных движений) идут после своих зависимостей
+PREPROCESSORS = {
+    "relative_motions": ("pairs", lambda As, Bs, shared, max_pairs:
+                         motion_pairs(As, Bs, max_pairs=max_pairs)),
+    "dual_quaternions": ("quats", lambda As, Bs, shared, max_pairs:
+                         dual_quaternion_pairs(shared["pairs"])),
+}
+
+
+class MethodSpec:
+    """
+    Описание метода калибровки и его возможностей
+    problem - тип задачи (AX_XB или AX_YB)
+    preprocessing - имена шагов из PREPROCESSORS в порядке вычисления
+    streaming - решение зависит от данных только через аддитивные суммы по позам
+    batch - решатель умеет обрабатывать пачку наборов данных за один вызов
+    cost_per_pose - оценка стоимости на одну позу (условные единицы)
+    min_poses - минимальное число поз для решения (размер минимальной выборки RANSAC)
+    covariance - функция (As, Bs, X, Y, max_pairs) -> ковариация 12x12 решения
+    в первом приближении (см. uncertainty), None - метод её не оценивает
+    statistics - пара функций (accumulate(As, Bs) -> словарь аддитивных сумм по позам,
+    solve(stats) -> (X, Y)) или None; суммы частей данных складываются и вычитаются,
+    поэтому решение на подмножестве поз не требует прохода по нему
+    rotation_rank - сколько независимых осей вращения нужно методу (см. degeneracy):
+    2 для решателей через пары осей, 3 - если решатель обращает разброс осей целиком
+    """
+
+    def __init__(self, name, func, problem, preprocessing=(), streaming=False,
+                 batch=False, cost_per_pose=1.0, min_poses=3, covariance=None,
+                 statistics=None, rotation_rank=2):
+        if rotation_rank not in (1, 2, 3):
+            raise ValueError(f"Число осей вращения должно быть от 1 до 3: {rotation_rank}")
+        for step in preprocessing:
+            if step not in PREPROCESSORS:
+                raise ValueError(f"Неизвестный шаг предобработки: {step}")
+        self.name = name
+        self.func = func
+        self.problem = problem
+        self.preprocessing = tuple(preprocessing)
+        self.streaming = streaming
+        self.batch = batch
+        self.cost_per_pose = cost_per_pose
+        self.min_poses = min_poses
+        self.covariance = covariance
+        self.statistics = statistics
+        self.rotation_rank = rotation_rank
+
+    def estimate_cost(self, n):
+        return self.cost_per_pose * n
+
+    def solve(self, As, Bs, shared=None, max_pairs=None, covariance=False):
+        """Решение (X, Y); с covariance=True - (X, Y, ковариация 12x12)"""
+        if covariance and self.covariance is None:
+            raise ValueError(f"Метод {self.name} не оценивает ковариацию решения")
+        if shared is None:
+            shared = {}
+        prepare([self], As, Bs, shared, max_pairs)
+        kwargs = {}
+        for step in self.preprocessing:
+            key = PREPROCESSORS[step][0]
+            kwargs[key] = shared[key]
+        X, Y = self.func(As, Bs, **kwargs)
+        if not covariance:
+            return X, Y
+        return X, Y, self.covariance(As, Bs, X, Y, max_pairs=max_pairs)
+
+    def __repr__(self):
+        return f"MethodSpec({self.name!r}, problem={self.problem!r})"
+
+
+_REGISTRY = {}
+
+
+def register_method(name, func, problem, preprocessing=(), streaming=False,
+                    batch=False, cost_per_pose=1.0, min_poses=3, covariance=None,
+                    statistics=None, rotation_rank=2):
+    """Регистрирует метод; повторная регистрация заменяет старую запись"""
+    if problem not in (AX_XB, AX_YB):
+        raise ValueError(f"Неизвестный тип задачи: {problem}")
+    if method_name_error(name):
+        # иначе имя обрежется в таблице результатов и строки не найдутся по имени
+        raise ValueError(method_name_error(name))
+    spec = MethodSpec(name, func, problem, preprocessing, streaming, batch,
+                      cost_per_pose, min_poses, covariance, statistics, rotation_rank)
+    _REGISTRY[name] = spec
+    return spec
+
+
+def unregister_method(name):
+    _REGISTRY.pop(name, None)
+
+
+def get_method(name):
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный метод: {name}") from None
+
+
+def available_methods():
+    return list(_REGISTRY)
+
+
+def schedule(names, n):
+    """Порядок запуска: сначала дешёвые методы, неизвестные имена в конце"""
+    def key(name):
+        spec = _REGISTRY.get(name)
+        return (spec is None, spec.estimate_cost(n) if spec else 0.0)
+    return sorted(names, key=key)
+
+
+# ключ shared, под которым хранится max_pairs, с которым посчитана предобработка
+SHARED_LIMIT = "max_pairs"
+
+
+def prepare_steps(steps, As, Bs, shared=None, max_pairs=None):
+    """
+    Считает шаги PREPROCESSORS, которых ещё нет в shared
+    Вместе с результатами в shared запоминается max_pairs: пары, отобранные под
+    другой лимит (и зависящие от них шаги), не переиспользуются молча - ValueError
+    """
+    if shared is None:
+        shared = {}
+    limit = shared.setdefault(SHARED_LIMIT, max_pairs)
+    if limit != max_pairs:
+        raise ValueError(f"Общая предобработка посчитана для max_pairs={limit}, "
+                         f"а запрошена для max_pairs={max_pairs}")
+    for step in steps:
+        key, func = PREPROCESSORS[step]
+        if key not in shared:
+            shared[key] = func(As, Bs, shared, max_pairs)
+    return shared
+
+
+def prepare(specs, As, Bs, shared=None, max_pairs=None):
+    """
+    Считает общую предобработку для набора методов один раз
+    shared - словарь, который дополняется на месте и переиспользуется между методами
+    (только с тем же max_pairs, см. prepare_steps)
+    max_pairs - ограничение числа пар движений для методов AX=XB (None - все пары)
+    """
+    steps = [step for spec in specs for step in spec.preprocessing]
+    return prepare_steps(steps, As, Bs, shared, max_pairs)
+
+
+register_method("tsai-lenz", tsai_lenz, AX_XB,
+                preprocessing=("relative_motions",), cost_per_pose=60.0,
+                covariance=covariance_ax_xb)
+register_method("park-martin", park_martin, AX_XB,
+                preprocessing=("relative_motions",), streaming=True, cost_per_pose=50.0,
+                covariance=covariance_ax_xb, rotation_rank=3)
+register_method("daniilidis", daniilidis, AX_XB,
+                preprocessing=("relative_motions", "dual_quaternions"), cost_per_pose=400.0)
+register_method("li-wang-wu", li_wang_wu, AX_YB,
+                streaming=True, cost_per_pose=7000.0, covariance=covariance_li_wang_wu,
+                statistics=(li_wang_wu_statistics, li_wang_wu_from_statistics))
+register_method("shah", shah, AX_YB,
+                streaming=True, cost_per_pose=300.0, covariance=covariance_shah,
+                statistics=(shah_statistics, shah_from_statistics))
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+# версия формата записей: увеличивается при любом изменении того, что кладётся в кэш
+# (1 - пары (t_stats, r_stats), 2 - строки ResultTable), старые записи на диске
+# тогда просто не находятся
+CACHE_VERSION = 2
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 содержимого файла (а не пути), чтобы кэш не зависел от имени файла"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(hash_a, hash_b, method, noise=None):
+    """
+    Ключ кэша: (версия формата, хэш A, хэш B, метод, параметры шума)
+    noise - словарь с типом/параметрами/сидом шума или None для чистых данных
+    """
+    if noise is not None:
+        noise = tuple(sorted(noise.items()))
+    return (CACHE_VERSION, hash_a, hash_b, method, noise)
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов методов в памяти с необязательным уровнем на диске
+    maxsize - максимальное число записей в памяти
+    path - каталог для постоянного хранения (None - только память)
+    Все обращения идут под одной блокировкой, поэтому кэш можно делить между окном
+    программы и фоновым расчётом; файлы на диске заменяются атомарно (os.replace),
+    так что несколько процессов с одним path не видят недописанных записей
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        if maxsize < 1:
+            raise ValueError("maxsize должен быть положительным")
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._data:
+                return True
+            return self.path is not None and os.path.exists(self._disk_path(key))
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + '.pkl')
+
+    def _remember(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            if self.path is not None:
+                disk_path = self._disk_path(key)
+                try:
+                    with open(disk_path, 'rb') as f:
+                        stored_key, value = pickle.load(f)
+                except Exception:
+                    # нет файла, битая или несовместимая запись (классы, которых больше
+                    # нет, другой формат) - это промах, а не ошибка расчёта
+                    stored_key = None
+                if stored_key == key:
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self.path is not None:
+                # запись через временный файл, чтобы не оставить битую запись
+                fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump((key, value), f)
+                os.replace(tmp_path, self._disk_path(key))
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._data.clear()
+            if disk and self.path is not None:
+                for name in os.listdir(self.path):
+                    if name.endswith('.pkl'):
+                        os.unlink(os.path.join(self.path, name))
@@ -0,0 +1,192 @@
+import numpy as np
+
+
+METRICS = ("mean", "median", "rmse", "p95", "max")
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+# метод остановлен сторожем (watchdog.run_with_budget): лимит времени или памяти
+STATUS_TIMEOUT = "timeout"
+STATUS_MEMORY = "memory"
+# метод остановлен или не запускался, потому что пользователь отменил расчёт
+STATUS_CANCELLED = "cancelled"
+# метод не запускался: предварительная проверка нашла вырожденные движения (degeneracy)
+STATUS_DEGENERATE = "degenerate"
+
+# ширина текстовых полей: имена методов и наборов проверяются на входе (register_method,
+# check_dataset_name), метод со слишком длинным именем получает строку status="error"
+# с обрезанным именем; длинный текст ошибки обрезается с пометкой TRUNCATED в конце
+METHOD_NAME_LEN = 32
+# набор в пакетном запуске называется по имени файла, а оно длиной до 255 символов
+DATASET_NAME_LEN = 255
+ERROR_LEN = 256
+TRUNCATED = "... [обрезано]"
+
+RESULT_DTYPE = np.dtype(
+    [("method", f"U{METHOD_NAME_LEN}"), ("dataset", f"U{DATASET_NAME_LEN}"),
+     ("noise_level", "f8"), ("trial", "i8")]
+    + [(f"t_{m}", "f8") for m in METRICS]
+    + [(f"r_{m}", "f8") for m in METRICS]
+    + [("X", "f8", (4, 4)), ("Y", "f8", (4, 4)),
+       ("status", "U16"), ("error", f"U{ERROR_LEN}"),
+       ("solve_time", "f8"), ("eval_time", "f8")]
+)
+
+# значения по умолчанию для полей, не переданных в append
+_DEFAULTS = {name: np.nan for name in RESULT_DTYPE.names if RESULT_DTYPE[name] == np.float64}
+_DEFAULTS.update({"method": "", "dataset": "", "noise_level": 0.0, "trial": 0,
+                  "status": STATUS_OK, "error": ""})
+
+
+def clip_text(text, width):
+    """Текст под ширину поля: обрезка помечается TRUNCATED"""
+    if len(text) <= width:
+        return text
+    return text[:width - len(TRUNCATED)] + TRUNCATED
+
+
+def clip_error(text):
+    """Текст ошибки под ширину поля error"""
+    return clip_text(text, ERROR_LEN)
+
+
+def method_name_error(name):
+    """Текст ошибки, если имя метода не помещается в поле method (иначе пустая строка)"""
+    if len(name) > METHOD_NAME_LEN:
+        return f"Имя метода длиннее {METHOD_NAME_LEN} символов: {name}"
+    return ""
+
+
+def check_dataset_name(name):
+    """Имя набора должно помещаться в поле dataset без обрезки"""
+    if len(name) > DATASET_NAME_LEN:
+        raise ValueError(f"Имя набора длиннее {DATASET_NAME_LEN} символов: {name}")
+    return name
+
+
+def stats_fields(t_stats, r_stats):
+    """Словари метрик из summarize_errors -> поля строки таблицы"""
+    fields = {f"t_{m}": t_stats[m] for m in METRICS}
+    fields.update({f"r_{m}": r_stats[m] for m in METRICS})
+    return fields
+
+
+class ResultTable:
+    """
+    Колоночная таблица результатов на структурированном массиве NumPy
+    Строки добавляются в предвыделенный буфер с удвоением ёмкости,
+    поэтому append стоит O(1) в среднем, а агрегации идут по колонкам
+    """
+
+    def __init__(self, capacity=64):
+        self._data = np.zeros(max(capacity, 1), dtype=RESULT_DTYPE)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self.to_array())
+
+    def _reserve(self, n):
+        if self._size + n > len(self._data):
+            new_capacity = max(2 * len(self._data), self._size + n)
+            data = np.zeros(new_capacity, dtype=RESULT_DTYPE)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+
+    def append(self, **fields):
+        unknown = set(fields) - set(RESULT_DTYPE.names)
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {sorted(unknown)}")
+        # имена проверяются на входе; здесь - страховка от молчаливой обрезки
+        error = method_name_error(fields.get("method", ""))
+        if error:
+            raise ValueError(error)
+        check_dataset_name(fields.get("dataset", ""))
+        if "error" in fields:
+            fields["error"] = clip_error(fields["error"])
+        self._reserve(1)
+        row = self._data[self._size]
+        for name in RESULT_DTYPE.names:
+            value = fields.get(name, _DEFAULTS.get(name))
+            if value is None:
+                value = np.full((4, 4), np.nan)
+            row[name] = value
+        self._size += 1
+
+    def extend(self, rows):
+        """Добавляет другую таблицу или структурированный массив с тем же dtype"""
+        if isinstance(rows, ResultTable):
+            rows = rows.to_array()
+        rows = np.asarray(rows, dtype=RESULT_DTYPE)
+        self._reserve(len(rows))
+        self._data[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def to_array(self):
+        return self._data[:self._size]
+
+    def column(self, name):
+        return self._data[name][:self._size]
+
+    def row(self, i):
+        """Строка в виде словаря (удобно для кэша и JSON)"""
+        rec = self.to_array()[i]
+        return {name: rec[name].copy() if rec[name].ndim else rec[name].item()
+                for name in RESULT_DTYPE.names}
+
+    def to_dataframe(self, include_transforms=False):
+        import pandas as pd
+        data = self.to_array()
+        columns = {name: data[name] for name in RESULT_DTYPE.names if name not in ("X", "Y")}
+        if include_transforms:
+            for name in ("X", "Y"):
+                flat = data[name].reshape(len(data), 16)
+                for k in range(16):
+                    columns[f"{name}{k // 4}{k % 4}"] = flat[:, k]
+        return pd.DataFrame(columns)
+
+    def aggregate(self, column, by=("method",), func="mean", ok_only=True):
+        """
+        Группирует строки по колонкам by и сворачивает колонку column
+        func - "mean", "std", "min", "max" или "count"
+        Возвращает (уникальные ключи групп, значения)
+        """
+        data = self.to_array()
+        if ok_only:
+            data = data[data["status"] == STATUS_OK]
+        keys = np.rec.fromarrays([data[b] for b in by], names=list(by)) if len(by) > 1 else data[by[0]]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        values = data[column]
+        count = np.bincount(inverse, minlength=len(groups))
+        if func == "count":
+            return groups, count
+        if func in ("mean", "std"):
+            total = np.bincount(inverse, weights=values, minlength=len(groups))
+            mean = total / np.maximum(count, 1)
+            if func == "mean":
+                return groups, mean
+            sq = np.bincount(inverse, weights=(values - mean[inverse]) ** 2, minlength=len(groups))
+            return groups, np.sqrt(sq / np.maximum(count - 1, 1))
+        if func in ("min", "max"):
+            out = np.full(len(groups), np.inf if func == "min" else -np.inf)
+            ufunc = np.minimum if func == "min" else np.maximum
+            ufunc.at(out, inverse, values)
+            return groups, out
+        raise ValueError(f"Неизвестная агрегирующая функция: {func}")
+
+    def to_stats_dicts(self):
+        """
+        Представление в старом формате get_error_data: два словаря метрик по методам
+        Для неуспешных строк метрики равны NaN
+        """
+        t_rows = {}
+        r_rows = {}
+        data = self.to_array()
+        for rec in data:
+            name = str(rec["method"])
+            t_rows[name] = {m: float(rec[f"t_{m}"]) for m in METRICS}
+            r_rows[name] = {m: float(rec[f"r_{m}"]) for m in METRICS}
+        return t_rows, r_rows
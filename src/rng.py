@@ -0,0 +1,55 @@
+import zlib
+
+import numpy as np
+
+
+# число поз в одном блоке случайных чисел; у каждого блока свой ключ Philox
+BLOCK_SIZE = 4096
+
+
+def stream_id(stream):
+    """Номер потока: целое как есть, строка - через crc32 (стабильно между запусками)"""
+    if isinstance(stream, str):
+        return zlib.crc32(stream.encode("utf-8"))
+    return int(stream)
+
+
+def block_generator(seed, stream, block):
+    """
+    Независимый генератор Philox для ключа (seed, stream, block)
+    Ключ строится через SeedSequence, поэтому соседние блоки и потоки не коррелируют,
+    а любой блок воспроизводится без генерации предыдущих
+    """
+    seq = np.random.SeedSequence(int(seed), spawn_key=(stream_id(stream), int(block)))
+    return np.random.Generator(np.random.Philox(seq))
+
+
+def _draw_range(seed, stream, start, stop, dim, draw):
+    if stop <= start:
+        return np.empty((0, dim))
+    first, last = start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE
+    blocks = [draw(block_generator(seed, stream, b), (BLOCK_SIZE, dim))
+              for b in range(first, last + 1)]
+    out = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+    offset = first * BLOCK_SIZE
+    return out[start - offset:stop - offset]
+
+
+def standard_normal_range(seed, stream, start, stop, dim=6):
+    """
+    Стандартный нормальный шум (stop - start, dim) для поз с номерами [start, stop)
+    Значения для позы зависят только от (seed, stream, номер позы), а не от того,
+    какими порциями и в каком порядке их запрашивают
+    """
+    return _draw_range(seed, stream, start, stop, dim, lambda g, shape: g.standard_normal(shape))
+
+
+def uniform_range(seed, stream, start, stop, dim=1):
+    """Равномерные числа [0, 1) формы (stop - start, dim) по тем же правилам, что standard_normal_range"""
+    return _draw_range(seed, stream, start, stop, dim, lambda g, shape: g.random(shape))
+
+
+def derive_int(seed, stream, high):
+    """Детерминированное целое в [0, high) для (seed, stream), например base шума Перлина"""
+    seq = np.random.SeedSequence(int(seed), spawn_key=(stream_id(stream),))
+    return int(seq.generate_state(1, np.uint64)[0] % np.uint64(high))
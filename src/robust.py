@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+
+from registry import get_method
+from utils import pose_residuals_batch
+
+
+# ограничение на H * N элементов в одном пакетном подсчёте ошибок (~12 float64 на элемент)
+_SCORE_BLOCK = 1_000_000
+
+
+def score_hypotheses(As, Bs, Xs, Ys, t_thresh, r_thresh):
+    """
+    Маски инлаеров (H, N) для всех гипотез сразу
+    Гипотезы обрабатываются блоками, чтобы промежуточные массивы не росли как H * N
+    """
+    n = len(As)
+    block = max(1, _SCORE_BLOCK // max(n, 1))
+    masks = np.empty((len(Xs), n), dtype=bool)
+    for i in range(0, len(Xs), block):
+        t_errs, r_errs = pose_residuals_batch(As, Bs, Xs[i:i + block], Ys[i:i + block])
+        masks[i:i + block] = (t_errs <= t_thresh) & (r_errs <= r_thresh)
+    return masks
+
+
+def required_iterations(inlier_ratio, sample_size, confidence):
+    """Число итераций, после которого хотя бы одна выборка без выбросов найдена с вероятностью confidence"""
+    if inlier_ratio <= 0.0:
+        return math.inf
+    p_clean = inlier_ratio ** sample_size
+    if p_clean >= 1.0:
+        return 0
+    return math.ceil(math.log(1.0 - confidence) / math.log(1.0 - p_clean))
+
+
+def _try_solve(spec, As, Bs, max_pairs=None):
+    try:
+        X, Y = spec.solve(As, Bs, max_pairs=max_pairs)
+    except (np.linalg.LinAlgError, ValueError, FloatingPointError):
+        return None
+    if not (np.all(np.isfinite(X)) and np.all(np.isfinite(Y))):
+        return None
+    return X, Y
+
+
+def ransac(name, As, Bs, t_thresh=5.0, r_thresh=1.0, sample_size=None, max_iters=1000,
+           confidence=0.99, batch_size=8, local_optimization=True, lo_iters=5,
+           lo_max_poses=1000, seed=0, max_pairs=None):
+    """
+    RANSAC / LO-RANSAC вокруг любого метода из реестра
+    t_thresh, r_thresh - пороги инлаера по трансляции (мм) и вращению (градусы),
+    ошибка та же, что в summarize_errors
+    sample_size - размер минимальной выборки (по умолчанию min_poses метода)
+    batch_size - сколько гипотез строится перед одним пакетным подсчётом ошибок
+    Итерации останавливаются, как только достигнуто required_iterations для текущей доли инлаеров
+    local_optimization - LO-шаг: перерешивание по инлаерам (не более lo_max_poses
+    случайных инлаеров за шаг, чтобы стоимость не росла с длиной лога)
+    max_pairs - ограничение числа пар движений для методов AX=XB (в выборках и LO-шаге)
+    Возвращает X, Y и маску инлаеров
+    """
+    spec = get_method(name)
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    n = len(As)
+    s = sample_size or spec.min_poses
+    if n < s:
+        raise ValueError(f"Недостаточно поз для RANSAC: {n} < {s}")
+
+    rng = np.random.default_rng(seed)
+    best = None
+    best_mask = np.zeros(n, dtype=bool)
+    needed = max_iters
+    done = 0
+    while done < min(needed, max_iters):
+        count = min(batch_size, max_iters - done)
+        Xs, Ys = [], []
+        for _ in range(count):
+            # порядок поз сохраняется: методы AX=XB строят относительные движения соседей
+            idx = np.sort(rng.choice(n, size=s, replace=False))
+            solution = _try_solve(spec, As[idx], Bs[idx], max_pairs)
+            if solution is not None:
+                Xs.append(solution[0])
+                Ys.append(solution[1])
+        done += count
+        if not Xs:
+            continue
+        masks = score_hypotheses(As, Bs, np.array(Xs), np.array(Ys), t_thresh, r_thresh)
+        counts = masks.sum(axis=1)
+        k = int(np.argmax(counts))
+        if counts[k] > best_mask.sum():
+            best = (Xs[k], Ys[k])
+            best_mask = masks[k]
+            needed = required_iterations(counts[k] / n, s, confidence)
+
+    if best is None:
+        raise ValueError("RANSAC не нашёл ни одной допустимой гипотезы")
+
+    if local_optimization:
+        for _ in range(lo_iters):
+            if best_mask.sum() < s:
+                break
+            idx = np.flatnonzero(best_mask)
+            if len(idx) > lo_max_poses:
+                idx = np.sort(rng.choice(idx, size=lo_max_poses, replace=False))
+            solution = _try_solve(spec, As[idx], Bs[idx], max_pairs)
+            if solution is None:
+                break
+            mask = score_hypotheses(As, Bs, solution[0][None], solution[1][None],
+                                    t_thresh, r_thresh)[0]
+            if mask.sum() < best_mask.sum():
+                break
+            converged = np.array_equal(mask, best_mask)
+            best, best_mask = solution, mask
+            if converged:
+                break
+
+    return best[0], best[1], best_mask
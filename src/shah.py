@@ -1,14 +1,53 @@
 from utils import *
 
-def shah(As, Bs):
+
+def shah_translation_system(As, Bs, Yr):
+    """Система A_lin (tX, tY) = ta - Yr tb для трансляций при найденном вращении Y"""
     n = len(As)
+    A_lin = np.zeros((n, 3, 6))
+    A_lin[:, :, 0:3] = -As[:, :3, :3]
+    A_lin[:, :, 3:6] = np.eye(3)
+    A_lin = A_lin.reshape(3 * n, 6)
+
+    # kron(tb^T, I3) vec(Y) = Y tb
+    b_lin = (As[:, :3, 3] - Bs[:, :3, 3] @ Yr.T).reshape(3 * n, 1)
+    return A_lin, b_lin
+
+
+def shah_statistics(As, Bs):
+    """
+    Достаточные статистики метода: сумма kron(Rb, Ra) для вращений и суммы
+    по позам, из которых собираются нормальные уравнения трансляций при любом Yr
+    Статистики частей данных складываются и вычитаются
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    Ra, ta, tb = As[:, :3, :3], As[:, :3, 3], Bs[:, :3, 3]
+    return {
+        "n": len(As),
+        "T9": np.einsum('nij,nkl->ikjl', Bs[:, :3, :3], Ra).reshape(9, 9),
+        "Ra": Ra.sum(axis=0),
+        "ta": ta.sum(axis=0),
+        "tb": tb.sum(axis=0),
+        # sum Ra^T ta и тензор sum Ra[k, i] tb[j] для sum Ra^T Yr tb
+        "Ra_ta": np.einsum('nki,nk->i', Ra, ta),
+        "Ra_tb": np.einsum('nki,nj->kij', Ra, tb),
+    }
 
-    T9 = np.zeros((9, 9))
-    for i in range(n):
-        Ra = As[i][:3, :3]
-        Rb = Bs[i][:3, :3]
-        T9 = T9 + np.kron(Rb, Ra)
 
+def shah_from_statistics(stats):
+    """Решение по shah_statistics: вращения как в shah, трансляции - нормальные уравнения"""
+    Xr, Yr = _rotations(stats["T9"])
+    n, Ra = stats["n"], stats["Ra"]
+    I3 = np.eye(3)
+    N = np.block([[n * I3, -Ra.T], [-Ra, n * I3]])
+    rhs = np.concatenate([np.einsum('kij,kj->i', stats["Ra_tb"], Yr) - stats["Ra_ta"],
+                          stats["ta"] - Yr @ stats["tb"]])
+    t_sol, _, _, _ = np.linalg.lstsq(N, rhs, rcond=None)
+    return compose(Xr, t_sol[0:3]), compose(Yr, t_sol[3:6])
+
+
+def _rotations(T9):
     U, S, Vt = np.linalg.svd(T9)
     x = Vt.T[:, 0]
     y = U[:, 0]
@@ -24,27 +63,22 @@ def shah(As, Bs):
     Yr = (np.sign(detY) / (np.abs(detY) ** (1/3))) * Yr
     Uy, Sy, Vty = np.linalg.svd(Yr)
     Yr = Uy @ Vty
+    return Xr, Yr
 
-    A_lin = np.zeros((3 * n, 6))
-    b_lin = np.zeros((3 * n, 1))
-
-    vecY = np.reshape(Yr, (9, 1), order='F')
 
-    for i in range(n):
-        Ra = As[i][:3, :3]
-        ta = As[i][:3, 3].reshape(3, 1)
-        tb = Bs[i][:3, 3].reshape(3, 1)
-
-        A_lin[3*i:3*i+3, 0:3] = -Ra
-        A_lin[3*i:3*i+3, 3:6] = np.eye(3)
+def shah(As, Bs):
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
 
-        K = np.kron(tb.T, np.eye(3))
-        b_lin[3*i:3*i+3, 0:1] = ta - K @ vecY
+    # сумма kron(Rb, Ra) по всем позам одной свёрткой
+    T9 = np.einsum('nij,nkl->ikjl', Bs[:, :3, :3], As[:, :3, :3]).reshape(9, 9)
+    Xr, Yr = _rotations(T9)
 
+    A_lin, b_lin = shah_translation_system(As, Bs, Yr)
     t_sol, _, _, _ = np.linalg.lstsq(A_lin, b_lin, rcond=None)
     tX = t_sol[0:3].reshape(3)
     tY = t_sol[3:6].reshape(3)
 
     X = compose(Xr, tX)
     Y = compose(Yr, tY)
-    return X, Y
\ No newline at end of file
+    return X, Y
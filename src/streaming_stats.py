@@ -0,0 +1,174 @@
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Сливаемый скетч квантилей с логарифмическими корзинами (как DDSketch)
+    для неотрицательных значений
+
+    Гарантия точности: для любого q оценка quantile(q) отличается от порядковой
+    статистики x_(k), k = floor(q * (n - 1)), не более чем на relative_accuracy * x_(k).
+    Значения не больше min_value считаются нулём (абсолютная ошибка <= min_value)
+    Память: O(log(max / min_value) / relative_accuracy) корзин, независимо от n;
+    слияние двух скетчей даёт тот же результат, что и один скетч по всем данным
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-12):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy должна быть в интервале (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero_count = 0
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._offset = 0
+
+    @property
+    def count(self):
+        return self.zero_count + int(self._counts.sum())
+
+    def _grow(self, lo, hi):
+        """Расширяет плотный массив корзин, чтобы он покрывал индексы [lo, hi]"""
+        if len(self._counts) == 0:
+            self._offset = lo
+            self._counts = np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        cur_lo, cur_hi = self._offset, self._offset + len(self._counts) - 1
+        new_lo, new_hi = min(lo, cur_lo), max(hi, cur_hi)
+        if (new_lo, new_hi) != (cur_lo, cur_hi):
+            counts = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+            counts[cur_lo - new_lo:cur_lo - new_lo + len(self._counts)] = self._counts
+            self._counts = counts
+            self._offset = new_lo
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64).ravel()
+        if x.size == 0:
+            return self
+        if np.any(x < 0) or np.any(np.isnan(x)):
+            raise ValueError("QuantileSketch принимает только неотрицательные значения")
+        small = x <= self.min_value
+        self.zero_count += int(small.sum())
+        x = x[~small]
+        if x.size:
+            idx = np.ceil(np.log(x) / self._log_gamma).astype(np.int64)
+            lo, hi = int(idx.min()), int(idx.max())
+            self._grow(lo, hi)
+            self._counts += np.bincount(idx - self._offset, minlength=len(self._counts))
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy or other.min_value != self.min_value:
+            raise ValueError("Можно сливать только скетчи с одинаковыми параметрами")
+        self.zero_count += other.zero_count
+        if len(other._counts):
+            lo = other._offset
+            self._grow(lo, lo + len(other._counts) - 1)
+            start = lo - self._offset
+            self._counts[start:start + len(other._counts)] += other._counts
+        return self
+
+    def quantile(self, q):
+        n = self.count
+        if n == 0:
+            return math.nan
+        rank = math.floor(q * (n - 1))
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = self.zero_count + np.cumsum(self._counts)
+        i = int(np.searchsorted(cumulative, rank, side='right'))
+        return 2.0 * self.gamma ** (i + self._offset) / (self.gamma + 1.0)
+
+
+class StreamingStats:
+    """
+    Накопитель метрик ошибок за один проход с постоянной памятью
+    mean, rmse, max считаются точно; median и p95 - по QuantileSketch
+    Порциями данных можно кормить update, а результаты параллельных
+    воркеров объединять через merge
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.max = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64).ravel()
+        if x.size == 0:
+            return self
+        self.sketch.update(x)
+        self.count += x.size
+        self.total += float(np.sum(x))
+        self.total_sq += float(np.dot(x, x))
+        self.max = max(self.max, float(np.max(x)))
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.max = max(self.max, other.max)
+        return self
+
+    def result(self):
+        if self.count == 0:
+            raise ValueError("Нет данных для подсчёта статистики")
+        return {
+            "mean": self.total / self.count,
+            "median": self.sketch.quantile(0.5),
+            "rmse": math.sqrt(self.total_sq / self.count),
+            "p95": self.sketch.quantile(0.95),
+            "max": self.max
+        }
+
+
+class RunningMoments:
+    """
+    Среднее и дисперсия по алгоритму Уэлфорда (порции и слияние - по формулам Чана)
+    Устойчиво к большим смещениям значений, память O(1)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64).ravel()
+        x = x[~np.isnan(x)]
+        if x.size == 0:
+            return self
+        other = RunningMoments()
+        other.count = x.size
+        other.mean = float(np.mean(x))
+        other.m2 = float(np.sum((x - other.mean) ** 2))
+        return self.merge(other)
+
+    def merge(self, other):
+        n = self.count + other.count
+        if other.count == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+    def half_width(self, z=1.96):
+        """Полуширина нормального доверительного интервала среднего z * s / sqrt(n)"""
+        return z * self.std / math.sqrt(self.count) if self.count > 1 else math.inf
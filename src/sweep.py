@@ -0,0 +1,441 @@
+import math
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+import numpy as np
+
+from functions_call import evaluate_methods
+from registry import SHARED_LIMIT, available_methods
+from noise_pipeline import NoisePipeline
+from param_sampling import ParameterSampler
+from results import (
+    ResultTable, STATUS_OK, DATASET_NAME_LEN, METHOD_NAME_LEN, check_dataset_name,
+)
+from streaming_stats import RunningMoments
+from utils import motion_side, motion_pairs
+
+
+# шум по умолчанию: гауссовский на SE(3), уровень 1.0 - как максимум ползунка GUI
+DEFAULT_NOISE = {"stages": [{"type": "gaussian", "pos_std": 20.0, "rot_std": 0.5}]}
+
+# данные рабочего процесса: имя набора -> (As, Bs, предобработка As)
+_DATASETS = {}
+
+
+def prepare_dataset(As, Bs, max_pairs=None):
+    """
+    Предобработка набора, не зависящая от шума: шум добавляется только к Bs,
+    поэтому относительные движения As и их векторы вращения считаются один раз
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    return As, Bs, motion_side(As, max_pairs)
+
+
+def _init_worker(datasets, max_pairs):
+    _DATASETS.clear()
+    for name, (As, Bs) in datasets.items():
+        _DATASETS[name] = prepare_dataset(As, Bs, max_pairs)
+
+
+class _SerialPool:
+    """Заменитель пула для workers=1: задача выполняется сразу в текущем процессе"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@contextmanager
+def _pool(datasets, workers, max_pairs):
+    """Пул задач run_trials с загруженными наборами (в рабочих процессах или в текущем)"""
+    if workers == 1:
+        saved = dict(_DATASETS)
+        _init_worker(datasets, max_pairs)
+        try:
+            yield _SerialPool()
+        finally:
+            _DATASETS.clear()
+            _DATASETS.update(saved)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(datasets, max_pairs)) as pool:
+        yield pool
+
+
+def _noise_config(noise):
+    if noise is None:
+        noise = DEFAULT_NOISE
+    config = noise.to_config() if isinstance(noise, NoisePipeline) else dict(noise)
+    NoisePipeline.from_config(config)
+    return config
+
+
+def run_trials(task):
+    """
+    Испытания [lo, hi) одного набора на всех уровнях шума
+    task - (набор, уровни, lo, hi, методы, конфиг шума, robust, max_pairs, refine, budget)
+    Общие случайные числа: реализация шума испытания генерируется один раз, масштабируется
+    уровнями (NoisePipeline.apply_levels) и одни и те же позы получают все методы
+    Возвращает структурированный массив строк ResultTable
+    """
+    dataset, levels, lo, hi, methods, config, robust, max_pairs, refine, budget = task
+    _, Bs, _ = _DATASETS[dataset]
+    pipeline = NoisePipeline.from_config(config)
+    table = ResultTable(capacity=(hi - lo) * len(levels) * len(methods))
+    for trial in range(lo, hi):
+        for level, noisy, keep in pipeline.apply_levels(Bs, levels, trial):
+            _evaluate_trial(dataset, noisy, keep, level, trial, methods, table,
+                            robust, max_pairs, refine, budget)
+    return table.to_array()
+
+
+def run_samples(task):
+    """
+    Точки выборки параметров шума для одного набора
+    task - (набор, [(номер точки, конфиг конвейера), ...], методы, robust, max_pairs, refine,
+    budget)
+    Номер точки служит номером испытания (trial) и задаёт потоки случайных чисел
+    """
+    dataset, samples, methods, robust, max_pairs, refine, budget = task
+    _, Bs, _ = _DATASETS[dataset]
+    table = ResultTable(capacity=len(samples) * len(methods))
+    for index, config in samples:
+        noisy, keep = NoisePipeline.from_config(config).apply(Bs, trial=index)
+        _evaluate_trial(dataset, noisy, keep, 1.0, index, methods, table,
+                        robust, max_pairs, refine, budget)
+    return table.to_array()
+
+
+def _evaluate_trial(dataset, noisy, keep, level, trial, methods, table, robust, max_pairs,
+                    refine, budget):
+    As, _, a_side = _DATASETS[dataset]
+    shared = {SHARED_LIMIT: max_pairs}
+    if keep.all():
+        # без пропусков кадров сторона A совпадает с подготовленной
+        shared["pairs"] = motion_pairs(As, noisy, max_pairs=max_pairs, a_side=a_side)
+    else:
+        As, noisy = As[keep], noisy[keep]
+    evaluate_methods(methods, As, noisy, dataset=dataset, noise_level=level, trial=trial,
+                     shared=shared, table=table, robust=robust, max_pairs=max_pairs,
+                     refine=refine, budget=budget)
+
+
+def make_tasks(datasets, methods, levels, trials, config, chunk_trials, robust=None,
+               max_pairs=None, refine=False, budget=None):
+    levels = [float(level) for level in levels]
+    tasks = []
+    for dataset in datasets:
+        for lo in range(0, trials, chunk_trials):
+            tasks.append((dataset, levels, lo, min(lo + chunk_trials, trials),
+                          list(methods), config, robust, max_pairs, refine, budget))
+    return tasks
+
+
+def iter_sweep(datasets, methods=None, levels=(0.0, 0.5, 1.0), trials=10, noise=None,
+               workers=None, chunk_trials=None, robust=None, max_pairs=None, refine=False,
+               budget=None):
+    """
+    Монте-Карло по методам x уровням шума x испытаниям без записи файлов
+    datasets - словарь {имя: (As, Bs)} с массивами поз (N, 4, 4)
+    noise - NoisePipeline или его конфиг; уровень масштабирует амплитуды (NoisePipeline.scaled),
+    испытание trial берёт потоки "trial:..." конвейера, так что результат не зависит от
+    числа процессов и разбиения на порции, а методы и уровни одного испытания видят
+    одну реализацию шума (сравнения методов - парные, см. paired_differences)
+    chunk_trials - испытаний в одной задаче пула (по умолчанию ~4 задачи на процесс)
+    budget - лимиты времени и памяти на решение метода (см. evaluate_methods): зависший
+    метод получает status="timeout" и не останавливает серию
+    Выдаёт структурированные массивы строк ResultTable по мере готовности задач
+    """
+    for name in datasets:
+        check_dataset_name(name)
+    if methods is None:
+        methods = available_methods()
+    config = _noise_config(noise)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_trials is None:
+        per_task = math.ceil(len(datasets) * trials / (4 * workers))
+        chunk_trials = min(max(trials, 1), max(1, per_task))
+    tasks = make_tasks(datasets, methods, levels, trials, config, chunk_trials,
+                       robust, max_pairs, refine, budget)
+
+    if len(tasks) <= 1:
+        workers = 1
+    with _pool(datasets, workers, max_pairs) as pool:
+        if workers == 1:
+            # задачи по одной: результаты выдаются до запуска следующей
+            for task in tasks:
+                yield pool.submit(run_trials, task).result()
+            return
+        futures = [pool.submit(run_trials, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_sweep(datasets, methods=None, levels=(0.0, 0.5, 1.0), trials=10, noise=None,
+              workers=None, chunk_trials=None, robust=None, max_pairs=None, refine=False,
+              budget=None, table=None, progress=None):
+    """
+    Собирает результаты iter_sweep в ResultTable (порядок строк - порядок завершения задач)
+    progress - необязательный вызов progress(готово испытаний, всего испытаний)
+    """
+    if methods is None:
+        methods = available_methods()
+    total = len(datasets) * len(levels) * trials
+    if table is None:
+        table = ResultTable(capacity=total * len(methods))
+    done = 0
+    for rows in iter_sweep(datasets, methods, levels, trials, noise, workers, chunk_trials,
+                           robust, max_pairs, refine, budget):
+        table.extend(rows)
+        done += len(rows) // max(len(methods), 1)
+        if progress is not None:
+            progress(done, total)
+    return table
+
+
+
+CELL_DTYPE = np.dtype([("dataset", f"U{DATASET_NAME_LEN}"), ("noise_level", "f8"),
+                       ("method", f"U{METHOD_NAME_LEN}"), ("n", "i8"), ("mean", "f8"),
+                       ("std", "f8"), ("half_width", "f8"), ("converged", "?")])
+
+
+class AdaptiveState:
+    """
+    Ход адаптивной серии: моменты Уэлфорда column по ячейкам (набор, уровень, метод)
+    и число выданных испытаний по группам (набор, уровень)
+    Ячейка сошлась, когда после min_trials полуширина доверительного интервала среднего
+    не больше max(tol, rel_tol * |mean|); испытания ячейки прекращаются при сходимости
+    или после max_trials
+    """
+
+    def __init__(self, datasets, methods, levels, column, tol, rel_tol=0.0, z=1.96,
+                 min_trials=10, max_trials=1000):
+        if tol <= 0 and rel_tol <= 0:
+            raise ValueError("Нужен положительный tol или rel_tol")
+        for name in datasets:
+            check_dataset_name(name)
+        self.column = column
+        self.tol = tol
+        self.rel_tol = rel_tol
+        self.z = z
+        self.min_trials = min_trials
+        self.max_trials = max_trials
+        self.methods = list(methods)
+        self.groups = [(d, float(level)) for d in datasets for level in levels]
+        self.moments = {g + (m,): RunningMoments() for g in self.groups for m in self.methods}
+        self.trials = {g: 0 for g in self.groups}
+        self.issued = {g: 0 for g in self.groups}
+
+    def update(self, group, rows):
+        """
+        Учитывает строки задачи группы group = (набор, уровень)
+        Ключ берётся из group, а не из строк: набор - под именем, заданным вызывающим
+        """
+        for rec in rows[rows["status"] == STATUS_OK]:
+            self.moments[group + (str(rec["method"]),)].update(rec[self.column])
+        self.trials[group] += len(np.unique(rows["trial"]))
+
+    def _target(self, key):
+        return max(self.tol, self.rel_tol * abs(self.moments[key].mean))
+
+    def converged(self, key):
+        if self.trials[key[:2]] < self.min_trials:
+            return False
+        return self.moments[key].half_width(self.z) <= self._target(key)
+
+    def stopped(self, key):
+        return self.converged(key) or self.trials[key[:2]] >= self.max_trials
+
+    def pending_methods(self, group):
+        return [m for m in self.methods if not self.stopped(group + (m,))]
+
+    def priority(self, group):
+        """Отношение полуширины к допуску у худшей несошедшейся ячейки группы"""
+        ratios = []
+        for m in self.pending_methods(group):
+            target = self._target(group + (m,))
+            width = self.moments[group + (m,)].half_width(self.z)
+            ratios.append(width / target if target > 0 else math.inf)
+        return max(ratios, default=0.0)
+
+    def next_group(self):
+        """Группа с несошедшимися методами, запасом испытаний и наихудшим интервалом"""
+        open_groups = [g for g in self.groups
+                       if self.issued[g] < self.max_trials and self.pending_methods(g)]
+        if not open_groups:
+            return None
+        return max(open_groups, key=lambda g: (self.issued[g] < self.min_trials,
+                                               self.priority(g), -self.issued[g]))
+
+    def summary(self):
+        out = []
+        for key, stats in self.moments.items():
+            out.append(key + (stats.count, stats.mean if stats.count else np.nan, stats.std,
+                              stats.half_width(self.z), self.converged(key)))
+        return np.array(out, dtype=CELL_DTYPE)
+
+
+def iter_adaptive_sweep(datasets, methods=None, levels=(0.0, 0.5, 1.0), column="t_rmse",
+                        tol=0.1, rel_tol=0.0, z=1.96, min_trials=10, max_trials=1000,
+                        batch_trials=None, noise=None, workers=None, robust=None,
+                        max_pairs=None, refine=False, budget=None, state=None):
+    """
+    Адаптивная серия: испытания выдаются порциями batch_trials только для групп
+    (набор, уровень) с несошедшимися методами (см. AdaptiveState), остановленные методы
+    из задач исключаются, освободившиеся процессы берут самые неточные группы
+    Номера испытаний в группе идут подряд, так что общие случайные числа сохраняются;
+    при workers > 1 набор испытаний зависит от порядка завершения задач
+    state - AdaptiveState для чтения хода серии снаружи (по умолчанию создаётся)
+    Выдаёт структурированные массивы строк ResultTable по мере готовности задач
+    """
+    for name in datasets:
+        check_dataset_name(name)
+    if methods is None:
+        methods = available_methods()
+    config = _noise_config(noise)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if batch_trials is None:
+        batch_trials = max(1, min_trials // 2)
+    if state is None:
+        state = AdaptiveState(datasets, methods, levels, column, tol, rel_tol, z,
+                              min_trials, max_trials)
+
+    with _pool(datasets, workers, max_pairs) as pool:
+        running = {}
+        while True:
+            while len(running) < max(workers, 1) * 2:
+                group = state.next_group()
+                if group is None:
+                    break
+                lo = state.issued[group]
+                hi = min(lo + batch_trials, max_trials)
+                state.issued[group] = hi
+                task = (group[0], [group[1]], lo, hi, state.pending_methods(group), config,
+                        robust, max_pairs, refine, budget)
+                running[pool.submit(run_trials, task)] = group
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows = future.result()
+                state.update(running.pop(future), rows)
+                yield rows
+
+
+def run_adaptive_sweep(datasets, methods=None, levels=(0.0, 0.5, 1.0), column="t_rmse",
+                       tol=0.1, rel_tol=0.0, z=1.96, min_trials=10, max_trials=1000,
+                       batch_trials=None, noise=None, workers=None, robust=None,
+                       max_pairs=None, refine=False, budget=None, table=None):
+    """
+    Собирает iter_adaptive_sweep в ResultTable
+    Возвращает (таблица, сводка по ячейкам CELL_DTYPE: n, mean, std, half_width, converged)
+    """
+    if methods is None:
+        methods = available_methods()
+    if table is None:
+        table = ResultTable()
+    state = AdaptiveState(datasets, methods, levels, column, tol, rel_tol, z,
+                          min_trials, max_trials)
+    for rows in iter_adaptive_sweep(datasets, methods, levels, column, tol, rel_tol, z,
+                                    min_trials, max_trials, batch_trials, noise, workers,
+                                    robust, max_pairs, refine, budget, state):
+        table.extend(rows)
+    return table, state.summary()
+
+
+def iter_param_sweep(datasets, n_samples, space=None, method="sobol", base=None, seed=0,
+                     batch_size=64, methods=None, workers=None, robust=None, max_pairs=None,
+                     refine=False, budget=None):
+    """
+    Серия по параметрам шума (pos_std, rot_std, correlation, октавы Перлина, ...),
+    взятым из скремблированной последовательности Соболя или латинского гиперкуба
+    (param_sampling.ParameterSampler) вместо сетки уровней
+    Точки потребляются порциями batch_size: порция целиком уходит в пул, и после её
+    завершения выдаётся (номер первой точки, значения параметров (n, d), строки ResultTable)
+    Итерацию можно прервать, когда поверхность отклика сошлась
+    """
+    for name in datasets:
+        check_dataset_name(name)
+    if methods is None:
+        methods = available_methods()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    sampler = ParameterSampler(space, method, seed)
+    with _pool(datasets, workers, max_pairs) as pool:
+        start = 0
+        while start < n_samples:
+            n = min(batch_size, n_samples - start)
+            values = sampler.draw(n)
+            samples = list(zip(range(start, start + n), sampler.configs(values, base)))
+            per_task = max(1, math.ceil(n * len(datasets) / (4 * workers)))
+            futures = [pool.submit(run_samples, (dataset, samples[i:i + per_task], list(methods),
+                                                 robust, max_pairs, refine, budget))
+                       for dataset in datasets for i in range(0, n, per_task)]
+            rows = np.concatenate([f.result() for f in futures])
+            yield start, values, rows
+            start += n
+
+
+def run_param_sweep(datasets, n_samples, space=None, method="sobol", base=None, seed=0,
+                    batch_size=64, methods=None, workers=None, robust=None, max_pairs=None,
+                    refine=False, budget=None, table=None):
+    """
+    Собирает iter_param_sweep в ResultTable
+    Возвращает (таблица, значения параметров (n_samples, d)); строка i значений
+    соответствует испытаниям trial == i в таблице
+    """
+    if table is None:
+        table = ResultTable()
+    values = []
+    for _, batch, rows in iter_param_sweep(datasets, n_samples, space, method, base, seed,
+                                           batch_size, methods, workers, robust, max_pairs,
+                                           refine, budget):
+        values.append(batch)
+        table.extend(rows)
+    return table, np.concatenate(values) if values else np.empty((0, 0))
+
+PAIRED_DTYPE = np.dtype([("dataset", f"U{DATASET_NAME_LEN}"), ("noise_level", "f8"),
+                         ("method_a", f"U{METHOD_NAME_LEN}"), ("method_b", f"U{METHOD_NAME_LEN}"),
+                         ("n", "i8"), ("mean_diff", "f8"), ("std_diff", "f8"), ("ci_low", "f8"),
+                         ("ci_high", "f8"), ("win_rate", "f8")])
+
+
+def paired_differences(table, column="t_rmse", z=1.96):
+    """
+    Парные разности column(method_a) - column(method_b) по испытаниям одной ячейки
+    (набор, уровень шума); при общих случайных числах шум в разности сокращается,
+    и доверительный интервал mean_diff +- z * std / sqrt(n) заметно уже непарного
+    win_rate - доля испытаний, где method_a дал меньшую ошибку
+    Учитываются испытания, в которых оба метода завершились успешно
+    """
+    data = table.to_array() if isinstance(table, ResultTable) else np.asarray(table)
+    data = data[data["status"] == STATUS_OK]
+    out = []
+    cells = np.unique(np.rec.fromarrays([data["dataset"], data["noise_level"]],
+                                        names=["dataset", "noise_level"]))
+    for cell in cells:
+        rows = data[(data["dataset"] == cell["dataset"])
+                    & (data["noise_level"] == cell["noise_level"])]
+        by_method = {str(m): dict(zip(rows["trial"][rows["method"] == m].tolist(),
+                                      rows[column][rows["method"] == m]))
+                     for m in np.unique(rows["method"])}
+        names = sorted(by_method)
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                trials = sorted(set(by_method[a]) & set(by_method[b]))
+                d = np.array([by_method[a][t] - by_method[b][t] for t in trials])
+                n = len(d)
+                mean = d.mean() if n else np.nan
+                std = d.std(ddof=1) if n > 1 else np.nan
+                half = z * std / np.sqrt(n) if n > 1 else np.nan
+                out.append((cell["dataset"], cell["noise_level"], a, b, n, mean, std,
+                            mean - half, mean + half, np.mean(d < 0) if n else np.nan))
+    return np.array(out, dtype=PAIRED_DTYPE)
@@ -1,42 +1,20 @@
 from utils import *
 
-def tsai_lenz(As, Bs):
+def tsai_lenz(As, Bs, pairs=None):
     def _safe_unit(w, eps=1e-12):
-        n = np.linalg.norm(w)
-        if n < eps:
-            return np.zeros_like(w)
-        return w / n
+        n = np.linalg.norm(w, axis=1, keepdims=True)
+        return np.where(n < eps, 0.0, w / np.where(n < eps, 1.0, n))
 
-    Arel = []
-    Brel = []
-    for i in range(len(As) - 1):
-        Arel.append(invert_T(As[i]) @ As[i + 1])
-        Brel.append(invert_T(Bs[i]) @ Bs[i + 1])
-
-    angle_min = np.deg2rad(2.0)
-    pairs = []
-    for Ar, Br in zip(Arel, Brel):
-        av = log_SO3(Ar[:3, :3])
-        bv = log_SO3(Br[:3, :3])
-        if np.linalg.norm(av) >= angle_min and np.linalg.norm(bv) >= angle_min:
-            pairs.append((Ar, Br))
-    if not pairs:
-        pairs = list(zip(Arel, Brel))
+    if pairs is None:
+        pairs = motion_pairs(As, Bs)
 
     n = len(pairs)
+    Ar, Br = pair_arrays(pairs)
 
-    S_rows = []
-    v_rows = []
-    for Ar, Br in pairs:
-        a_vec = log_SO3(Ar[:3, :3])
-        b_vec = log_SO3(Br[:3, :3])
-        a = _safe_unit(a_vec)
-        b = _safe_unit(b_vec)
-        S_rows.append(hat(a + b))
-        v_rows.append(a - b)
-
-    S = np.vstack(S_rows)
-    v = np.concatenate(v_rows)
+    a = _safe_unit(log_SO3_batch(Ar[:, :3, :3]))
+    b = _safe_unit(log_SO3_batch(Br[:, :3, :3]))
+    S = hat_batch(a + b).reshape(3 * n, 3)
+    v = (a - b).reshape(3 * n)
 
     x, _, _, _ = np.linalg.lstsq(S, v, rcond=None)
 
@@ -52,17 +30,8 @@ def tsai_lenz(As, Bs):
         R = R.T
 
 
-    C = np.zeros((3 * n, 3))
-    d = np.zeros(3 * n)
-    I = np.eye(3)
-
-    for i, (Ar, Br) in enumerate(pairs):
-        Ra = Ar[:3, :3]
-        ta = Ar[:3, 3]
-        tb = Br[:3, 3]
-
-        C[3*i:3*i+3, :] = I - Ra
-        d[3*i:3*i+3] = ta - R @ tb
+    C = (np.eye(3) - Ar[:, :3, :3]).reshape(3 * n, 3)
+    d = (Ar[:, :3, 3] - Br[:, :3, 3] @ R.T).reshape(3 * n)
 
     t, _, _, _ = np.linalg.lstsq(C, d, rcond=None)
 
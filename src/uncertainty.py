@@ -0,0 +1,208 @@
+import numpy as np
+
+from utils import (
+    hat_batch, log_SO3_batch, left_jacobian_inv_SO3, motion_pairs, pair_arrays, invert_T_batch
+)
+from li_wang_wu import li_wang_wu_system
+from shah import shah_translation_system
+
+
+# Ковариации решений в первом приближении - матрица 12x12 по вектору (tX, thetaX, tY, thetaY):
+# t - аддитивная поправка трансляции (мм), theta - правое возмущение вращения R exp([theta]x)
+# (радианы). Шум измерений приводится к эквивалентному шуму поз B: B_i exp(xi_i),
+# xi_i = (rho_i, omega_i) с общей ковариацией 6x6, которая оценивается по невязкам
+# Delta_i = (A_i X)^-1 Y B_i. Поправки решения линейны по xi_i: для линейной системы
+# решателя N dx = -sum_i A_i^T (d r_i / d xi_i) xi_i, поэтому
+# cov = sum_i K_i Sigma K_i^T, где K_i (12x6) - вклад позы i
+
+
+def noise_covariance(As, Bs, X, Y):
+    """Ковариация 6x6 эквивалентного шума поз B по твистам невязок Delta_i"""
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    X_inv = invert_T_batch(np.asarray(X, dtype=np.float64)[None])[0]
+    Delta = X_inv @ invert_T_batch(As) @ (np.asarray(Y) @ Bs)
+    xi = np.concatenate([Delta[:, :3, 3], log_SO3_batch(Delta[:, :3, :3])], axis=1)
+    # 12 параметров решения на 6 измерений позы: 2 степени свободы на позу
+    return xi.T @ xi / max(len(xi) - 2, 1)
+
+
+def polar_tangent_map(R):
+    """
+    Матрица 3x9: поправка dM матрицы (построчная развёртка) -> theta вращения
+    после проекции на SO(3) в первом приближении: theta = vee(skew(R^T dM))
+    """
+    L = np.zeros((3, 9))
+    for k in range(9):
+        W = R.T @ np.eye(9)[k].reshape(3, 3)
+        L[:, k] = 0.5 * np.array([W[2, 1] - W[1, 2], W[0, 2] - W[2, 0], W[1, 0] - W[0, 1]])
+    return L
+
+
+def _vec_hat():
+    """Матрица 9x3: omega -> построчная развёртка [omega]x"""
+    return hat_batch(np.eye(3)).reshape(3, 9).T
+
+
+def _pinv_psd(N, drop=0):
+    """Обратная симметричная матрица; drop - число отбрасываемых наименьших направлений"""
+    w, V = np.linalg.eigh(N)
+    w_inv = np.zeros_like(w)
+    w_inv[drop:] = 1.0 / np.maximum(w[drop:], 1e-300)
+    return (V * w_inv) @ V.T
+
+
+def _rotated_hat(M):
+    """d vec(M [omega]x) / d omega = (M x I) H для массива M (n, 3, 3) -> (n, 9, 3)"""
+    n = len(M)
+    kron = np.einsum('npr,qs->npqrs', M, np.eye(3)).reshape(n, 9, 9)
+    return kron @ _vec_hat()
+
+
+def _assemble(K, sigma):
+    return np.einsum('nij,jk,nlk->il', K, sigma, K)
+
+
+def covariance_li_wang_wu(As, Bs, X, Y, max_pairs=None):
+    """
+    Через систему A x = b метода li_wang_wu (x = (vec RX, vec RY, tX, tY)):
+    шум позы B_i меняет её 12 строк, dx = -(A^T A)^-1 A_i^T J_i xi_i,
+    затем блоки вращений проецируются на касательные пространства SO(3)
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    n = len(As)
+    A, _ = li_wang_wu_system(As, Bs)
+    A = A.reshape(n, 12, 24)
+    N_inv = _pinv_psd(np.einsum('nki,nkj->ij', A, A))
+
+    # строки вращения vec(Ra RX) - vec(RY Rb), строки трансляции RY tb - Ra tX + tY
+    M = Y[:3, :3] @ Bs[:, :3, :3]
+    J = np.zeros((n, 12, 6))
+    J[:, 0:9, 3:6] = -_rotated_hat(M)
+    J[:, 9:12, 0:3] = M
+    K = -np.einsum('ij,nkj,nkl->nil', N_inv, A, J)
+
+    P = np.zeros((12, 24))
+    P[0:3, 18:21] = np.eye(3)
+    P[3:6, 0:9] = polar_tangent_map(X[:3, :3])
+    P[6:9, 21:24] = np.eye(3)
+    P[9:12, 9:18] = polar_tangent_map(Y[:3, :3])
+    return _assemble(P @ K, noise_covariance(As, Bs, X, Y))
+
+
+def covariance_shah(As, Bs, X, Y, max_pairs=None):
+    """
+    Через системы метода shah: однородная система вращений
+    vec(Ra RX) - vec(RY Rb) = 0 (возмущение собственного вектора - псевдообратной
+    без направления решения) и система трансляций A_lin (tX, tY) = ta - RY tb
+    с учётом погрешности RY
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    n = len(As)
+    Ra = As[:, :3, :3]
+    RX, RY = X[:3, :3], Y[:3, :3]
+    M = RY @ Bs[:, :3, :3]
+
+    A_rot = np.zeros((n, 9, 18))
+    A_rot[:, :, 0:9] = np.einsum('npr,qs->npqrs', Ra, np.eye(3)).reshape(n, 9, 9)
+    A_rot[:, :, 9:18] = -np.einsum('pr,nsq->npqrs', np.eye(3), Bs[:, :3, :3]).reshape(n, 9, 9)
+    N_rot = _pinv_psd(np.einsum('nki,nkj->ij', A_rot, A_rot), drop=1)
+    L = np.zeros((6, 18))
+    L[0:3, 0:9] = polar_tangent_map(RX)
+    L[3:6, 9:18] = polar_tangent_map(RY)
+    # d(A_rot z)_i / d omega_i = -(M_i x I) H
+    K_theta = L @ np.einsum('ij,nkj,nkl->nil', N_rot, A_rot, _rotated_hat(M))
+
+    A_lin, _ = shah_translation_system(As, Bs, RY)
+    A_lin = A_lin.reshape(n, 3, 6)
+    N_lin = _pinv_psd(np.einsum('nki,nkj->ij', A_lin, A_lin))
+    # b_lin = ta - RY tb: шум tb даёт -M rho, поправка RY даёт RY [tb]x thetaY
+    D = (RY @ hat_batch(Bs[:, :3, 3])).reshape(3 * n, 3)
+    G = N_lin @ A_lin.reshape(3 * n, 6).T @ D
+    K_t = np.einsum('ij,nkj,nkl->nil', N_lin, A_lin, -M)
+
+    K = np.zeros((n, 12, 6))
+    K[:, 0:3, 0:3] = K_t[:, 0:3]
+    K[:, 6:9, 0:3] = K_t[:, 3:6]
+    K[:, 3:6, 3:6] = K_theta[:, 0:3]
+    K[:, 9:12, 3:6] = K_theta[:, 3:6]
+    K[:, 0:3, 3:6] += G[0:3] @ K_theta[:, 3:6]
+    K[:, 6:9, 3:6] += G[3:6] @ K_theta[:, 3:6]
+    return _assemble(K, noise_covariance(As, Bs, X, Y))
+
+
+def covariance_ax_xb(As, Bs, X, Y, max_pairs=None):
+    """
+    Для методов AX=XB (X по парам движений, Y - calculate_Z)
+    Вращение X: система RX b_j = a_j по векторам вращения пар (её сумма - матрица M
+    park_martin), трансляция X: система (I - RA_j) tX = ta_j - RX tb_j с учётом
+    погрешности RX; пара (i, k) получает шум обеих поз B_i, B_k
+    Y - через усреднения calculate_Z с погрешностью X
+    Для tsai-lenz это ковариация той же задачи на тех же парах (взвешивание
+    метода не учитывается)
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    n = len(As)
+    pairs, (first, second) = motion_pairs(As, Bs, max_pairs=max_pairs, return_indices=True)
+    Ar, Br = pair_arrays(pairs)
+    m = len(Ar)
+    RX = X[:3, :3]
+    RY = Y[:3, :3]
+    Rb_rel, tb_rel = Br[:, :3, :3], Br[:, :3, 3]
+    I3 = np.eye(3)
+
+    # шум пары: B_rel exp(zeta), zeta = xi_k - Ad(B_rel^-1) xi_i
+    RbT = Rb_rel.transpose(0, 2, 1)
+    Z_first = np.zeros((m, 6, 6))
+    Z_first[:, 0:3, 0:3] = -RbT
+    Z_first[:, 0:3, 3:6] = RbT @ hat_batch(tb_rel)
+    Z_first[:, 3:6, 3:6] = -RbT
+
+    # вращение: r_j = RX b_j - a_j, dr/dtheta = -RX [b_j]x, db = J_r^-1(b) zeta_omega
+    b = log_SO3_batch(Rb_rel)
+    J_theta = -RX @ hat_batch(b)
+    N_theta = _pinv_psd(np.einsum('nki,nkj->ij', J_theta, J_theta))
+    dr = RX @ left_jacobian_inv_SO3(-b)
+    K_pair_theta = -np.einsum('ij,nkj,nkl->nil', N_theta, J_theta, dr)
+
+    # трансляция: d_j = ta_j - RX tb_j, шум tb_rel даёт -RX Rb_rel zeta_rho
+    C = I3 - Ar[:, :3, :3]
+    N_C = _pinv_psd(np.einsum('nki,nkj->ij', C, C))
+    G = N_C @ np.einsum('nki,nkj->ij', C, RX @ hat_batch(tb_rel))
+    K_pair_t = np.einsum('ij,nkj,nkl->nil', N_C, C, -RX @ Rb_rel)
+
+    # вклад пары по zeta (6x6) для (tX, thetaX)
+    K_pair = np.zeros((m, 6, 6))
+    K_pair[:, 0:3, 0:3] = K_pair_t
+    K_pair[:, 3:6, 3:6] = K_pair_theta
+    K_pair[:, 0:3, 3:6] = G @ K_pair_theta
+    K = np.zeros((n, 12, 6))
+    np.add.at(K[:, 0:6], second, K_pair)
+    np.add.at(K[:, 0:6], first, K_pair @ Z_first)
+
+    # Y: thetaY = mean(Rb (thetaX - omega)), tY = mean(Ra) tX + mean(RY [tb]x) thetaY - mean(M rho)
+    Ra, Rb = As[:, :3, :3], Bs[:, :3, :3]
+    S = Rb.mean(axis=0)
+    K[:, 9:12] = S @ K[:, 3:6]
+    K[:, 9:12, 3:6] -= Rb / n
+    Q = (RY @ hat_batch(Bs[:, :3, 3])).mean(axis=0)
+    K[:, 6:9] = Ra.mean(axis=0) @ K[:, 0:3] + Q @ K[:, 9:12]
+    K[:, 6:9, 0:3] -= RY @ Rb / n
+    return _assemble(K, noise_covariance(As, Bs, X, Y))
+
+
+def pose_std(cov):
+    """
+    Стандартные отклонения из ковариации 12x12: трансляция X, Y (мм) по осям
+    и полный угол вращения X, Y (градусы, корень из следа блока)
+    """
+    var = np.diag(cov)
+    return {
+        "X_t": np.sqrt(var[0:3]),
+        "X_r": float(np.degrees(np.sqrt(var[3:6].sum()))),
+        "Y_t": np.sqrt(var[6:9]),
+        "Y_r": float(np.degrees(np.sqrt(var[9:12].sum()))),
+    }
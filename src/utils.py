@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from streaming_stats import StreamingStats
+
 def invert_T(T):
     R = T[:3, :3]
     t = T[:3, 3]
@@ -34,6 +36,33 @@ def euler_ZYX_to_R(z, y, x):
 
     return Rz @ Ry @ Rx
 
+def euler_ZYX_to_R_batch(angles):
+    """Векторизованный euler_ZYX_to_R: углы (N, 3) в порядке z, y, x (радианы) -> (N, 3, 3)"""
+    angles = np.asarray(angles, dtype=np.float64)
+    cz, cy, cx = np.cos(angles).T
+    sz, sy, sx = np.sin(angles).T
+    R = np.empty(angles.shape[:-1] + (3, 3))
+    R[..., 0, 0] = cz * cy
+    R[..., 0, 1] = cz * sy * sx - sz * cx
+    R[..., 0, 2] = cz * sy * cx + sz * sx
+    R[..., 1, 0] = sz * cy
+    R[..., 1, 1] = sz * sy * sx + cz * cx
+    R[..., 1, 2] = sz * sy * cx - cz * sx
+    R[..., 2, 0] = -sy
+    R[..., 2, 1] = cy * sx
+    R[..., 2, 2] = cy * cx
+    return R
+
+
+def R_to_euler_ZYX_batch(Rs):
+    """Обратное к euler_ZYX_to_R_batch: (N, 3, 3) -> углы (N, 3) z, y, x в радианах"""
+    Rs = np.asarray(Rs, dtype=np.float64)
+    z = np.arctan2(Rs[..., 1, 0], Rs[..., 0, 0])
+    y = np.arctan2(-Rs[..., 2, 0], np.hypot(Rs[..., 2, 1], Rs[..., 2, 2]))
+    x = np.arctan2(Rs[..., 2, 1], Rs[..., 2, 2])
+    return np.stack([z, y, x], axis=-1)
+
+
 def log_SO3(R):
     trc = np.clip((np.trace(R) - 1) / 2.0, -1.0, 1.0)
     theta = np.arccos(trc)
@@ -52,18 +81,227 @@ def hat(w):
                      [-wy,  wx,   0]])
 
 
-def load_poses_csv(path):
+def log_SO3_batch(Rs):
+    """Векторизованный log_SO3 для массива (N, 3, 3) -> (N, 3)"""
+    Rs = np.asarray(Rs, dtype=np.float64)
+    trc = np.clip((np.trace(Rs, axis1=1, axis2=2) - 1) / 2.0, -1.0, 1.0)
+    theta = np.arccos(trc)
+    w = np.stack([Rs[:, 2, 1] - Rs[:, 1, 2],
+                  Rs[:, 0, 2] - Rs[:, 2, 0],
+                  Rs[:, 1, 0] - Rs[:, 0, 1]], axis=1)
+    small = theta < 1e-12
+    # тот же порядок операций, что в log_SO3: (w / 2 sin) * theta
+    w = w / (2 * np.sin(np.where(small, 1.0, theta)))[:, None] * theta[:, None]
+    w[small] = 0.0
+    return w
+
+
+def hat_batch(w):
+    """Векторизованный hat для массива (N, 3) -> (N, 3, 3)"""
+    w = np.asarray(w, dtype=np.float64)
+    W = np.zeros(w.shape[:-1] + (3, 3))
+    W[..., 0, 1] = -w[..., 2]
+    W[..., 0, 2] = w[..., 1]
+    W[..., 1, 0] = w[..., 2]
+    W[..., 1, 2] = -w[..., 0]
+    W[..., 2, 0] = -w[..., 1]
+    W[..., 2, 1] = w[..., 0]
+    return W
+
+
+def exp_SO3(w):
+    """Формула Родрига для массива векторов вращения (N, 3) -> (N, 3, 3) или (3,) -> (3, 3)"""
+    w = np.asarray(w, dtype=np.float64)
+    theta = np.linalg.norm(w, axis=-1)[..., None, None]
+    W = hat_batch(w)
+    small = theta < 1e-8
+    safe = np.where(small, 1.0, theta)
+    a = np.where(small, 1.0 - theta**2 / 6.0, np.sin(safe) / safe)
+    b = np.where(small, 0.5 - theta**2 / 24.0, (1.0 - np.cos(safe)) / safe**2)
+    return np.eye(3) + a * W + b * (W @ W)
+
+
+def exp_SE3(xi):
+    """Экспонента SE(3) для xi = (rho, theta) формы (N, 6) -> (N, 4, 4) или (6,) -> (4, 4)"""
+    xi = np.asarray(xi, dtype=np.float64)
+    rho, w = xi[..., :3], xi[..., 3:]
+    theta = np.linalg.norm(w, axis=-1)[..., None, None]
+    W = hat_batch(w)
+    small = theta < 1e-8
+    safe = np.where(small, 1.0, theta)
+    b = np.where(small, 0.5 - theta**2 / 24.0, (1.0 - np.cos(safe)) / safe**2)
+    c = np.where(small, 1.0 / 6.0 - theta**2 / 120.0, (safe - np.sin(safe)) / safe**3)
+    V = np.eye(3) + b * W + c * (W @ W)
+    T = np.zeros(xi.shape[:-1] + (4, 4))
+    T[..., :3, :3] = exp_SO3(w)
+    T[..., :3, 3] = np.einsum('...ij,...j->...i', V, rho)
+    T[..., 3, 3] = 1.0
+    return T
+
+
+def left_jacobian_inv_SO3(phi):
+    """Обратный левый якобиан SO(3) для массива (N, 3) -> (N, 3, 3)"""
+    phi = np.asarray(phi, dtype=np.float64)
+    theta = np.linalg.norm(phi, axis=-1)[..., None, None]
+    P = hat_batch(phi)
+    small = theta < 1e-6
+    safe = np.where(small, 1.0, theta)
+    c = np.where(small, 1.0 / 12.0,
+                 1.0 / safe**2 - (1.0 + np.cos(safe)) / (2.0 * safe * np.sin(safe)))
+    return np.eye(3) - 0.5 * P + c * (P @ P)
+
+
+def invert_T_batch(Ts):
+    Ts = np.asarray(Ts, dtype=np.float64)
+    Rt = Ts[:, :3, :3].transpose(0, 2, 1)
+    Ti = np.tile(np.eye(4), (len(Ts), 1, 1))
+    Ti[:, :3, :3] = Rt
+    Ti[:, :3, 3] = -np.einsum('nij,nj->ni', Rt, Ts[:, :3, 3])
+    return Ti
+
+
+def relative_motions(Ts, stride=1):
+    """Относительные движения поз T_i^-1 T_{i+stride}, массив (N-stride, 4, 4)"""
+    Ts = np.asarray(Ts, dtype=np.float64)
+    return invert_T_batch(Ts[:-stride]) @ Ts[stride:]
+
+
+def select_informative_pairs(a_vecs, max_pairs, reg=1e-6):
+    """
+    Жадный выбор max_pairs движений с хорошо обусловленным разбросом осей вращения
+    a_vecs - векторы вращения движений (N, 3)
+    На каждом шаге берётся движение с наибольшим приростом log det(S + reg I),
+    S = sum a a^T: это растит наименьшее собственное значение разброса и
+    отбрасывает почти одинаковые движения. Прирост для всех кандидатов
+    a^T (S + reg I)^-1 a считается одной свёрткой, обратная матрица обновляется
+    по Шерману-Моррисону, поэтому стоимость O(max_pairs * N)
+    Возвращает отсортированные индексы выбранных движений
+    """
+    a_vecs = np.asarray(a_vecs, dtype=np.float64)
+    n = len(a_vecs)
+    if n <= max_pairs:
+        return np.arange(n)
+    # масштаб регуляризации привязан к типичной величине вращения
+    M = np.eye(3) / (reg * max(float(np.mean(np.einsum('ni,ni->n', a_vecs, a_vecs))), 1e-12))
+    available = np.ones(n, dtype=bool)
+    chosen = []
+    for _ in range(max_pairs):
+        gain = np.einsum('ni,ij,nj->n', a_vecs, M, a_vecs)
+        gain[~available] = -np.inf
+        k = int(np.argmax(gain))
+        chosen.append(k)
+        available[k] = False
+        Ma = M @ a_vecs[k]
+        M -= np.outer(Ma, Ma) / (1.0 + a_vecs[k] @ Ma)
+    return np.sort(np.array(chosen))
+
+
+def motion_strides(n, max_pairs=None):
+    """Шаги относительных движений: 1, а при max_pairs ещё 2, 4, ... (меньше n)"""
+    strides = [1]
+    if max_pairs is not None:
+        while 2 * strides[-1] < n:
+            strides.append(2 * strides[-1])
+    return strides
+
+
+def motion_side(Ts, max_pairs=None):
+    """
+    Относительные движения одной последовательности и их векторы вращения
+    Для неизменной стороны (например, As в серии испытаний с шумом только на B)
+    результат можно посчитать один раз и передавать в motion_pairs через a_side
+    """
+    rel = np.concatenate([relative_motions(Ts, s) for s in motion_strides(len(Ts), max_pairs)])
+    return rel, log_SO3_batch(rel[:, :3, :3])
+
+
+def motion_pairs(As, Bs, thr=np.deg2rad(2.0), max_pairs=None, a_side=None,
+                 return_indices=False):
+    """
+    Пары относительных движений (A_rel, B_rel) с вращением не меньше thr
+    max_pairs - оставить не больше max_pairs наиболее информативных пар
+    (см. select_informative_pairs), чтобы время решателей не росло с длиной лога.
+    В этом режиме кандидатами служат движения с шагами 1, 2, 4, ... поз
+    (O(N log N) кандидатов): на плотных логах соседние движения малы и шумны,
+    а движения через несколько поз дают лучше обусловленную систему
+    a_side - готовый результат motion_side(As, max_pairs)
+    return_indices - дополнительно вернуть номера поз (i, j) каждой пары: A_rel = A_i^-1 A_j
+    """
+    Arel, a_vecs = a_side if a_side is not None else motion_side(As, max_pairs)
+    Brel, b_vecs = motion_side(Bs, max_pairs)
+
+    keep = (np.linalg.norm(a_vecs, axis=1) >= thr) & (np.linalg.norm(b_vecs, axis=1) >= thr)
+    idx = np.flatnonzero(keep)
+    if len(idx) == 0:
+        idx = np.arange(len(Arel))
+    if max_pairs is not None:
+        idx = idx[select_informative_pairs(a_vecs[idx], max_pairs)]
+    pairs = list(zip(Arel[idx], Brel[idx]))
+    if return_indices:
+        strides = motion_strides(len(As), max_pairs)
+        first = np.concatenate([np.arange(len(As) - s) for s in strides])
+        step = np.concatenate([np.full(len(As) - s, s) for s in strides])
+        return pairs, (first[idx], first[idx] + step[idx])
+    return pairs
+
+
+def pair_arrays(pairs):
+    """Список пар (A_rel, B_rel) -> два массива (N, 4, 4) для векторизованной сборки систем"""
+    if len(pairs) == 0:
+        return np.empty((0, 4, 4)), np.empty((0, 4, 4))
+    Ar = np.array([p[0] for p in pairs], dtype=np.float64)
+    Br = np.array([p[1] for p in pairs], dtype=np.float64)
+    return Ar, Br
+
+
+def load_poses_csv(path, chunksize=None):
+    """chunksize - вернуть итератор DataFrame по chunksize строк вместо одного DataFrame"""
     df = pd.read_csv(
         path,
         sep=r'(?:,\s+|\s+)',
         usecols=range(7),
         header=None,
         engine="python",
-        names=["id", "X", "Y", "Z", "RZ", "RY", "RX"]
+        names=["id", "X", "Y", "Z", "RZ", "RY", "RX"],
+        chunksize=chunksize
     )
     return df
 
 
+def read_pose_lines(path, chunk_size=100_000):
+    """
+    Построчное чтение файла поз порциями для генераторов шума
+    Выдаёт (номера строк, номера кадров, массив (n, 6) значений X, Y, Z и трёх углов);
+    некорректные строки пропускаются с сообщением, как раньше делали генераторы
+    """
+    line_nums, ids, rows = [], [], []
+    with open(path, 'r') as f:
+        for line_num, line in enumerate(f):
+            parts = line.strip().split()
+            if len(parts) < 7:
+                print(f"Пропуск некорректной строки {line_num+1}")
+                continue
+            try:
+                rows.append([float(p) for p in parts[1:7]])
+            except ValueError as e:
+                print(f"Ошибка в строке {line_num+1}: {e}")
+                continue
+            line_nums.append(line_num)
+            ids.append(parts[0])
+            if len(rows) >= chunk_size:
+                yield np.array(line_nums), ids, np.array(rows)
+                line_nums, ids, rows = [], [], []
+    if rows:
+        yield np.array(line_nums), ids, np.array(rows)
+
+
+def format_pose_lines(ids, values):
+    """Строки файла поз в формате генераторов шума (6 знаков после запятой)"""
+    for frame_id, (x, y, z, a1, a2, a3) in zip(ids, values.tolist()):
+        yield f"{frame_id} {x:.6f} {y:.6f} {z:.6f} " \
+              f"{a1:.6f} {a2:.6f} {a3:.6f}"
+
+
 def df_to_Ts(df):
     Ts = []
     for _, r in df.iterrows():
@@ -77,30 +315,102 @@ def df_to_Ts(df):
     return np.array(Ts)
 
 
-def summarize_errors(As, Bs, X, Y):
-    t_errs = []
-    r_errs = []
+def pose_residuals_batch(As, Bs, Xs, Ys):
+    """
+    Ошибки по позам сразу для H гипотез (Xs, Ys формы (H, 4, 4)), результат формы (H, N)
+    Определение то же, что у summarize_errors: Delta = (A X)^-1 (Y B),
+    норма трансляции и угол поворота в градусах
+    """
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
+    Xs = np.asarray(Xs, dtype=np.float64)
+    Ys = np.asarray(Ys, dtype=np.float64)
+    n, h = len(As), len(Xs)
+    RA = As[:, :3, :3]
+    RX = Xs[:, :3, :3]
+    RY = Ys[:, :3, :3]
+
+    # trace(R_ax^T R_yb) = <RA, RY RB RX^T>, а построчная развёртка RY RB RX^T
+    # равна kron(RY, RX) vec(RB): все гипотезы считаются одним умножением матриц
+    K = np.einsum('hij,hkl->hikjl', RY, RX).reshape(h, 9, 9)
+    W = Bs[:, :3, :3].reshape(n, 9) @ K.transpose(2, 0, 1).reshape(9, h * 9)
+    trace = np.einsum('nha,na->hn', W.reshape(n, h, 9), RA.reshape(n, 9))
+    r_errs = np.degrees(np.arccos(np.clip((trace - 1) / 2.0, -1.0, 1.0)))
+
+    # |t_yb - t_ax| не меняется от поворота R_ax^T
+    d = (Bs[:, :3, 3] @ RY.transpose(2, 0, 1).reshape(3, h * 3)).reshape(n, h, 3)
+    d += Ys[None, :, :3, 3] - As[:, None, :3, 3]
+    d -= (RA.reshape(n * 3, 3) @ Xs[:, :3, 3].T).reshape(n, 3, h).transpose(0, 2, 1)
+    t_errs = np.sqrt(np.einsum('nhi,nhi->hn', d, d))
+    return t_errs, r_errs
+
+
+def pose_residuals(As, Bs, X, Y):
+    """
+    Ошибки по каждой позе для Delta = (A X)^-1 (Y B):
+    норма трансляции и угол поворота в градусах (непрерывные массивы float64)
+    """
+    t_errs, r_errs = pose_residuals_batch(As, Bs, np.asarray(X)[None], np.asarray(Y)[None])
+    return np.ascontiguousarray(t_errs[0]), np.ascontiguousarray(r_errs[0])
+
+
+def error_stats(x):
+    return {
+        "mean": float(np.mean(x)),
+        "median": float(np.median(x)),
+        "rmse": float(np.sqrt(np.mean(x**2))),
+        "p95": float(np.percentile(x, 95)),
+        "max": float(np.max(x))
+    }
+
+
+def error_stats_batch(x):
+    """error_stats по строкам матрицы (B, n): словарь массивов длины B"""
+    x = np.asarray(x, dtype=np.float64)
+    return {
+        "mean": np.mean(x, axis=1),
+        "median": np.median(x, axis=1),
+        "rmse": np.sqrt(np.mean(x**2, axis=1)),
+        "p95": np.percentile(x, 95, axis=1),
+        "max": np.max(x, axis=1)
+    }
 
-    for A, B in zip(As, Bs):
-        Delta = invert_T(A @ X) @ (Y @ B)
 
-        t_errs.append(np.linalg.norm(Delta[:3, 3]))
-        angle = np.linalg.norm(log_SO3(Delta[:3, :3])) * 180.0 / np.pi
-        r_errs.append(angle)
+def summarize_error_chunks(chunks, X, Y, relative_accuracy=0.01):
+    """
+    Метрики ошибок по итератору порций (As, Bs) с постоянной памятью
+    median и p95 приближённые (см. streaming_stats.QuantileSketch)
+    Возвращает накопители StreamingStats, чтобы их можно было слить с другими
+    """
+    t_acc = StreamingStats(relative_accuracy)
+    r_acc = StreamingStats(relative_accuracy)
+    for As, Bs in chunks:
+        t_errs, r_errs = pose_residuals(As, Bs, X, Y)
+        t_acc.update(t_errs)
+        r_acc.update(r_errs)
+    return t_acc, r_acc
 
-    t_errs = np.array(t_errs)
-    r_errs = np.array(r_errs)
 
-    def stats(x):
-        return {
-            "mean": float(np.mean(x)),
-            "median": float(np.median(x)),
-            "rmse": float(np.sqrt(np.mean(x**2))),
-            "p95": float(np.percentile(x, 95)),
-            "max": float(np.max(x))
-        }
+def summarize_errors(As, Bs, X, Y, return_residuals=False, chunk_size=None):
+    """
+    Метрики ошибок трансляции и вращения
+    return_residuals - дополнительно вернуть массивы ошибок по позам
+    (по умолчанию они не возвращаются и освобождаются сразу после подсчёта)
+    chunk_size - считать порциями через StreamingStats без полного массива ошибок
+    (median и p95 тогда приближённые, return_residuals недоступен)
+    """
+    if chunk_size is not None:
+        if return_residuals:
+            raise ValueError("return_residuals несовместим с chunk_size")
+        chunks = ((As[i:i + chunk_size], Bs[i:i + chunk_size])
+                  for i in range(0, len(As), chunk_size))
+        t_acc, r_acc = summarize_error_chunks(chunks, X, Y)
+        return t_acc.result(), r_acc.result()
 
-    return stats(t_errs), stats(r_errs)
+    t_errs, r_errs = pose_residuals(As, Bs, X, Y)
+    if return_residuals:
+        return error_stats(t_errs), error_stats(r_errs), t_errs, r_errs
+    return error_stats(t_errs), error_stats(r_errs)
 
 
 def print_T(name, T):
@@ -111,29 +421,23 @@ def print_T(name, T):
 
 
 def calculate_Z(As, Bs, X):
+    As = np.asarray(As, dtype=np.float64)
+    Bs = np.asarray(Bs, dtype=np.float64)
     RX = X[:3, :3]
     tX = X[:3, 3]
+    Ra = As[:, :3, :3]
 
-    M = np.zeros((3, 3))
-    for A, B in zip(As, Bs):
-        Ra = A[:3, :3]
-        Rb = B[:3, :3]
-        M += Ra @ RX @ Rb.T
+    # сумма Ra RX Rb^T по всем позам одной свёрткой
+    M = np.einsum('nij,jk,nlk->il', Ra, RX, Bs[:, :3, :3])
     U, _, Vt = np.linalg.svd(M)
     RZ = U @ Vt
     if np.linalg.det(RZ) < 0:
         U[:, -1] *= -1
         RZ = U @ Vt
 
-    C = np.zeros((3 * len(As), 3))
-    d = np.zeros(3 * len(As))
-    for i, (A, B) in enumerate(zip(As, Bs)):
-        Ra = A[:3, :3]
-        ta = A[:3, 3]
-        tb = B[:3, 3]
-        C[3*i:3*i+3, :] = np.eye(3)
-        d[3*i:3*i+3] = ta + Ra @ tX - RZ @ tb
-    tZ, _, _, _ = np.linalg.lstsq(C, d, rcond=None)
+    # МНК для системы из единичных блоков - это среднее правых частей
+    d = As[:, :3, 3] + Ra @ tX - Bs[:, :3, 3] @ RZ.T
+    tZ = d.mean(axis=0)
 
     Z = compose(RZ, tZ)
     return Z
@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows: ограничение памяти недоступно
+    resource = None
+
+from results import STATUS_OK, STATUS_ERROR, STATUS_TIMEOUT, STATUS_MEMORY, STATUS_CANCELLED
+
+
+# cancel - threading.Event отмены; остальные ключи - числовые лимиты
+BUDGET_KEYS = ("timeout", "memory_mb", "cancel")
+_LIMITS = ("timeout", "memory_mb")
+
+# период проверки события отмены во время ожидания процесса, с
+CANCEL_POLL = 0.1
+
+
+class WorkerFailure(Exception):
+    """Метод не завершился в отдельном процессе: status - статус строки результатов"""
+
+    def __init__(self, status, message, elapsed):
+        super().__init__(message)
+        self.status = status
+        self.elapsed = elapsed
+
+
+def check_budget(budget):
+    """
+    Проверяет словарь бюджета {"timeout": секунды, "memory_mb": мегабайты, "cancel": событие}
+    Событие отмены работает только в текущем процессе: бюджет с ним не передаётся
+    в пулы процессов серий и перекрёстной проверки
+    """
+    unknown = set(budget) - set(BUDGET_KEYS)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры бюджета: {sorted(unknown)}")
+    for key in _LIMITS:
+        value = budget.get(key)
+        if value is not None and value <= 0:
+            raise ValueError(f"Бюджет {key} должен быть положительным: {value}")
+    return budget
+
+
+def describe_exception(e):
+    """Тип, текст и место исключения (файл:строка функция самого глубокого кадра)"""
+    text = f"{type(e).__name__}: {e}"
+    frames = traceback.extract_tb(e.__traceback__)
+    if frames:
+        frame = frames[-1]
+        text += f" [{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}]"
+    return text
+
+
+def _address_space():
+    """Текущий объём адресного пространства процесса в байтах (0, если неизвестен)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _child(conn, func, args, kwargs, memory_mb):
+    if memory_mb is not None and resource is not None:
+        # лимит адресного пространства сверх уже занятого интерпретатором и библиотеками
+        limit = _address_space() + int(memory_mb * 2 ** 20)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        result = (STATUS_OK, func(*args, **kwargs))
+    except MemoryError as e:
+        result = (STATUS_MEMORY, describe_exception(e))
+    except BaseException as e:
+        result = (STATUS_ERROR, describe_exception(e))
+    conn.send(result)
+    conn.close()
+
+
+def _context():
+    # на Linux fork не копирует данные по каналу; на других системах (spawn)
+    # func и аргументы должны сериализоваться
+    if not sys.platform.startswith("linux"):
+        return multiprocessing.get_context()
+    # fork из рабочего потока (окно программы считает в фоне) копирует блокировки,
+    # захваченные другими потоками (Tk, BLAS), и дочерний процесс может зависнуть;
+    # forkserver порождает процессы из отдельного однопоточного сервера
+    if threading.current_thread() is not threading.main_thread():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("fork")
+
+
+def cancelled(budget):
+    """Установлено ли событие отмены бюджета (None - бюджета нет)"""
+    cancel = budget.get("cancel") if budget is not None else None
+    return cancel is not None and cancel.is_set()
+
+
+def _wait(recv, timeout, cancel, start):
+    """Ждёт ответа процесса; False - истёк timeout или установлено событие cancel"""
+    if cancel is None:
+        return recv.poll(timeout)
+    while not cancel.is_set():
+        left = None if timeout is None else timeout - (time.perf_counter() - start)
+        if left is not None and left <= 0:
+            return False
+        if recv.poll(CANCEL_POLL if left is None else min(CANCEL_POLL, left)):
+            return True
+    return False
+
+
+def run_with_budget(func, *args, timeout=None, memory_mb=None, cancel=None, **kwargs):
+    """
+    Выполняет func(*args, **kwargs) в отдельном процессе и возвращает результат
+    timeout - лимит времени в секундах: по истечении процесс убивается
+    memory_mb - сколько памяти процесс может занять сверх начальной (RLIMIT_AS, только Unix)
+    cancel - threading.Event: когда его устанавливают (например, из окна программы),
+    процесс убивается, не дожидаясь timeout
+    Неудача - WorkerFailure со статусом STATUS_TIMEOUT, STATUS_MEMORY, STATUS_CANCELLED
+    или STATUS_ERROR и временем от запуска процесса
+    """
+    ctx = _context()
+    recv, send = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(send, func, args, kwargs, memory_mb),
+                          daemon=True)
+    start = time.perf_counter()
+    process.start()
+    send.close()
+    try:
+        if not _wait(recv, timeout, cancel, start):
+            process.kill()
+            if cancel is not None and cancel.is_set():
+                raise WorkerFailure(STATUS_CANCELLED, "Расчёт отменён",
+                                    time.perf_counter() - start)
+            raise WorkerFailure(STATUS_TIMEOUT, f"Превышен лимит времени {timeout:g} с",
+                                time.perf_counter() - start)
+        try:
+            status, payload = recv.recv()
+        except EOFError:
+            process.join()
+            status = STATUS_MEMORY if memory_mb is not None else STATUS_ERROR
+            payload = f"Процесс метода аварийно завершился (код {process.exitcode})"
+    finally:
+        recv.close()
+        process.join()
+    if status != STATUS_OK:
+        raise WorkerFailure(status, payload, time.perf_counter() - start)
+    return payload
@@ -12,6 +12,31 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from utils import compose, euler_ZYX_to_R, invert_T
+from noise_pipeline import NoisePipeline
+
+# истинные X, Y синтетических наборов AX = YB
+TRUE_X = compose(euler_ZYX_to_R(0.3, 0.1, -0.2), np.array([5.0, 10.0, -3.0]))
+TRUE_Y = compose(euler_ZYX_to_R(-0.1, 0.2, 0.4), np.array([50.0, 0.0, 20.0]))
+
+
+def synthetic_pairs(n, seed=0, rotations=None, noise=None):
+    """
+    Random poses A and consistent poses B = TRUE_Y^-1 A TRUE_X
+    seed - seed or an existing np.random.Generator (to draw several sets from one stream)
+    rotations - optional function (rng, n) -> n rotation matrices; by default every pose
+    gets random ZYX angles in [-1, 1] rad, translations are uniform in [-100, 100]
+    noise - optional parameters of a gaussian NoisePipeline stage applied to B
+    """
+    rng = np.random.default_rng(seed)
+    if rotations is None:
+        As = np.array([compose(euler_ZYX_to_R(*rng.uniform(-1, 1, 3)), rng.uniform(-100, 100, 3))
+                       for _ in range(n)])
+    else:
+        As = np.array([compose(R, rng.uniform(-100, 100, 3)) for R in rotations(rng, n)])
+    Bs = np.array([invert_T(TRUE_Y) @ A @ TRUE_X for A in As])
+    if noise is not None:
+        _, Bs = NoisePipeline([dict(noise, type="gaussian")]).apply_pairs(As, Bs)
+    return As, Bs
 
 
 @pytest.fixture
@@ -0,0 +1,105 @@
+"""
+Tests for bootstrap confidence intervals of error metrics
+"""
+import time
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from bootstrap import (
+    bootstrap_indices, bootstrap_stats, bootstrap_errors, bootstrap_solve, percentile_interval
+)
+from registry import get_method
+from utils import error_stats, error_stats_batch, pose_residuals
+from results import METRICS
+from tests.conftest import synthetic_pairs
+
+
+@pytest.fixture
+def noisy_data():
+    return synthetic_pairs(20, noise={"pos_std": 2.0, "rot_std": 0.1})
+
+
+class TestBootstrapStats:
+    """Tests for metric-only bootstrap"""
+
+    def test_batch_stats_match_scalar(self):
+        """Test that row-wise statistics equal error_stats on every row"""
+        x = np.random.default_rng(1).exponential(1.0, (7, 13))
+        batch = error_stats_batch(x)
+        for i, row in enumerate(x):
+            for m, value in error_stats(row).items():
+                assert batch[m][i] == pytest.approx(value, rel=1e-14)
+
+    def test_indices(self):
+        """Test index matrix shape, range and reproducibility"""
+        idx = bootstrap_indices(10, 500, seed=3)
+        assert idx.shape == (500, 10) and idx.min() >= 0 and idx.max() < 10
+        np.testing.assert_array_equal(idx, bootstrap_indices(10, 500, seed=3))
+        assert not np.array_equal(idx, bootstrap_indices(10, 500, seed=4))
+
+    def test_chunking(self, monkeypatch):
+        """Test that chunked reductions give the same distributions"""
+        import bootstrap
+        errs = np.random.default_rng(2).exponential(1.0, 25)
+        full = bootstrap_stats(errs, 300, seed=1)
+        monkeypatch.setattr(bootstrap, "MAX_ELEMENTS", 100)
+        chunked = bootstrap_stats(errs, 300, seed=1)
+        for m in METRICS:
+            np.testing.assert_array_equal(full[m], chunked[m])
+
+    def test_mean_interval_coverage(self):
+        """Test that the mean interval matches the normal-theory width"""
+        errs = np.random.default_rng(5).normal(10.0, 2.0, 400)
+        samples = bootstrap_stats(errs, 4000, seed=0)
+        lo, hi = percentile_interval(samples["mean"])
+        half = 1.96 * errs.std(ddof=1) / np.sqrt(len(errs))
+        assert lo < errs.mean() < hi
+        assert (hi - lo) / 2 == pytest.approx(half, rel=0.1)
+
+    def test_errors_intervals(self, noisy_data):
+        """Test intervals around summarize_errors metrics at fixed X, Y"""
+        As, Bs = noisy_data
+        X, Y = get_method("shah").solve(As, Bs)
+        t_ci, r_ci = bootstrap_errors(As, Bs, X, Y, n_boot=2000)
+        t_errs, _ = pose_residuals(As, Bs, X, Y)
+        for m in METRICS:
+            assert t_ci[m]["value"] == pytest.approx(error_stats(t_errs)[m])
+            assert t_ci[m]["low"] <= t_ci[m]["high"]
+            assert r_ci[m]["low"] <= r_ci[m]["high"]
+        assert t_ci["mean"]["low"] < t_ci["mean"]["value"] < t_ci["mean"]["high"]
+        assert t_ci["max"]["high"] == pytest.approx(t_errs.max())
+
+    def test_speed(self, noisy_data):
+        """Test that 10,000 metric-only replicates on a small dataset take well under a second"""
+        As, Bs = noisy_data
+        X, Y = get_method("shah").solve(As, Bs)
+        start = time.perf_counter()
+        bootstrap_errors(As, Bs, X, Y, n_boot=10_000)
+        assert time.perf_counter() - start < 1.0
+
+
+class TestBootstrapSolve:
+    """Tests for bootstrap with re-solving"""
+
+    @pytest.mark.parametrize("method", ["shah", "park-martin"])
+    def test_replicates(self, noisy_data, method):
+        """Test replicate solutions and interval consistency"""
+        As, Bs = noisy_data
+        t_ci, r_ci, Xs, Ys = bootstrap_solve(method, As, Bs, n_boot=50, seed=1)
+        assert Xs.shape[1:] == (4, 4) and len(Xs) == len(Ys) > 40
+        X, _ = get_method(method).solve(As, Bs)
+        # решения реплик разбросаны вокруг решения по всем позам
+        spread = np.linalg.norm(Xs[:, :3, 3] - X[:3, 3], axis=1)
+        assert 0 < np.median(spread) < 5.0
+        for m in METRICS:
+            assert t_ci[m]["low"] <= t_ci[m]["high"]
+
+    def test_unknown_method(self, noisy_data):
+        """Test that unknown methods are rejected"""
+        with pytest.raises(ValueError, match="Неизвестный метод"):
+            bootstrap_solve("magic", *noisy_data, n_boot=5)
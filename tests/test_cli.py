@@ -0,0 +1,142 @@
+"""
+Tests for the headless batch command-line interface
+"""
+import csv
+import json
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from cli import find_pairs, make_jobs, iter_results, main
+from tests.conftest import synthetic_pairs
+
+
+def _write_poses(path, Ts):
+    from scipy.spatial.transform import Rotation
+    lines = []
+    for i, T in enumerate(Ts):
+        z, y, x = Rotation.from_matrix(T[:3, :3]).as_euler("ZYX", degrees=True)
+        t = T[:3, 3]
+        lines.append(f"{i} {t[0]:.6f} {t[1]:.6f} {t[2]:.6f} {z:.6f} {y:.6f} {x:.6f}")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    """Directory with two consistent A/B pairs and an unpaired file"""
+    rng = np.random.default_rng(0)
+    for name in ("first", "second"):
+        As, Bs = synthetic_pairs(12, rng)
+        _write_poses(tmp_path / f"{name}_A_0.1mm.txt", As)
+        _write_poses(tmp_path / f"{name}_B_0.1mm.txt", Bs)
+    (tmp_path / "lonely_A.txt").write_text("0 0 0 0 0 0 0\n")
+    return tmp_path
+
+
+class TestFindPairs:
+    """Tests for A/B file pair discovery"""
+
+    def test_directory(self, dataset_dir):
+        """Test that pairs differ only by the A/B marker and unpaired files are skipped"""
+        pairs = find_pairs([str(dataset_dir)])
+        assert [(Path(a).name, Path(b).name) for a, b in pairs] == [
+            ("first_A_0.1mm.txt", "first_B_0.1mm.txt"),
+            ("second_A_0.1mm.txt", "second_B_0.1mm.txt"),
+        ]
+
+    def test_glob(self, dataset_dir):
+        """Test that glob patterns select a subset of pairs"""
+        pairs = find_pairs([str(dataset_dir / "second_*")])
+        assert len(pairs) == 1
+
+    def test_marker_inside_word_ignored(self, tmp_path):
+        """Test that letters A/B inside words are not treated as markers"""
+        (tmp_path / "BaseA.txt").write_text("")
+        (tmp_path / "BaseB.txt").write_text("")
+        assert find_pairs([str(tmp_path)]) == []
+
+
+class TestBatchRun:
+    """Tests for job execution and streaming output"""
+
+    def test_jobs_grid(self, dataset_dir):
+        """Test that jobs cover pairs x noise levels x trials"""
+        jobs = make_jobs(find_pairs([str(dataset_dir)]), ["shah"], "gaussian", [0.1, 0.2], trials=3)
+        assert len(jobs) == 2 * 2 * 3
+
+    def test_parallel_matches_sequential(self, dataset_dir):
+        """Test that the process pool gives the same records as a sequential run"""
+        jobs = make_jobs(find_pairs([str(dataset_dir)]), ["shah", "park-martin"])
+        key = lambda r: (r["dataset"], r["method"])
+        seq = sorted((r for rs in iter_results(jobs, workers=1) for r in rs), key=key)
+        par = sorted((r for rs in iter_results(jobs, workers=2) for r in rs), key=key)
+        assert [key(r) for r in seq] == [key(r) for r in par]
+        for a, b in zip(seq, par):
+            assert a["t_rmse"] == pytest.approx(b["t_rmse"])
+
+    def test_jsonl_output(self, dataset_dir, tmp_path):
+        """Test JSON lines output with transforms"""
+        out = tmp_path / "out.jsonl"
+        code = main([str(dataset_dir), "-m", "shah", "-j", "1", "-f", "jsonl",
+                     "--transforms", "-o", str(out)])
+        assert code == 0
+        records = [json.loads(line) for line in out.read_text().splitlines()]
+        assert len(records) == 2
+        assert all(r["status"] == "ok" for r in records)
+        assert all(r["t_max"] < 1e-3 for r in records)
+        assert np.array(records[0]["X"]).shape == (4, 4)
+
+    def test_csv_output_with_noise(self, dataset_dir, tmp_path):
+        """Test CSV output for several noise levels"""
+        out = tmp_path / "out.csv"
+        code = main([str(dataset_dir / "first_*"), "-m", "shah", "tsai-lenz", "-j", "1",
+                     "--noise", "gaussian", "--noise-levels", "0.0", "0.5", "-o", str(out)])
+        assert code == 0
+        with open(out, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 4
+        by_level = {float(r["noise_level"]): float(r["t_rmse"]) for r in rows if r["method"] == "shah"}
+        assert by_level[0.5] > by_level[0.0]
+
+    def test_manifold_noise(self, dataset_dir, tmp_path):
+        """Test that --manifold perturbs pose matrices instead of the file"""
+        out = tmp_path / "out.jsonl"
+        code = main([str(dataset_dir / "first_*"), "-m", "shah", "-j", "1", "-f", "jsonl",
+                     "--noise", "perlin", "--noise-levels", "0.5", "--manifold", "-o", str(out)])
+        assert code == 0
+        record = json.loads(out.read_text().splitlines()[0])
+        assert record["status"] == "ok"
+        assert record["t_rmse"] > 0.1
+
+    def test_pipeline_config(self, dataset_dir, tmp_path):
+        """Test that --pipeline runs a declarative noise pipeline per trial"""
+        config = tmp_path / "noise.json"
+        config.write_text(json.dumps({"stages": [
+            {"type": "gaussian", "pos_std": 1.0, "rot_std": 0.1},
+            {"type": "dropout", "rate": 0.1},
+        ]}))
+        out = tmp_path / "out.jsonl"
+        code = main([str(dataset_dir / "first_*"), "-m", "shah", "-j", "1", "-f", "jsonl",
+                     "--pipeline", str(config), "--trials", "2", "-o", str(out)])
+        assert code == 0
+        records = [json.loads(line) for line in out.read_text().splitlines()]
+        assert [r["noise_type"] for r in records] == ["pipeline", "pipeline"]
+        assert all(r["status"] == "ok" and r["noise_level"] == 1.0 for r in records)
+        assert records[0]["t_rmse"] != records[1]["t_rmse"]
+
+    def test_bad_input_reported_per_method(self, tmp_path):
+        """Test that an unreadable pair gives error rows instead of aborting"""
+        (tmp_path / "bad_A.txt").write_text("not a pose file\n")
+        (tmp_path / "bad_B.txt").write_text("not a pose file\n")
+        jobs = make_jobs(find_pairs([str(tmp_path)]), ["shah", "park-martin"])
+        records = next(iter_results(jobs, workers=1))
+        assert [r["status"] for r in records] == ["error", "error"]
+
+    def test_errors(self, dataset_dir, tmp_path, capsys):
+        """Test exit codes for unknown methods and missing pairs"""
+        assert main([str(dataset_dir), "-m", "unknown"]) == 2
+        assert main([str(tmp_path / "nothing_here")]) == 1
+        assert "Не найдено" in capsys.readouterr().err
@@ -0,0 +1,172 @@
+"""
+Tests for K-fold and hold-out cross-validation
+"""
+import json
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from cross_validation import (
+    kfold_indices, holdout_indices, fold_statistics, cross_validate, get_cv_error_data
+)
+from cli import main
+from functions_call import solve_method
+from registry import get_method
+from results import STATUS_OK, STATUS_ERROR
+from utils import summarize_errors
+from tests.conftest import synthetic_pairs
+
+
+def _dataset(n=30, seed=0, noise=True):
+    return synthetic_pairs(n, seed, noise={"pos_std": 1.0, "rot_std": 0.1} if noise else None)
+
+
+class TestFolds:
+    """Tests for fold construction"""
+
+    @pytest.mark.parametrize("shuffle", [False, True])
+    def test_partition(self, shuffle):
+        """Test that folds partition the poses into nearly equal parts"""
+        folds = kfold_indices(23, 5, shuffle=shuffle, seed=1)
+        assert sorted(np.concatenate(folds)) == list(range(23))
+        assert sorted(len(f) for f in folds) == [4, 4, 5, 5, 5]
+        if not shuffle:
+            assert all(np.all(np.diff(f) == 1) for f in folds)
+
+    def test_holdout(self):
+        """Test the size and reproducibility of a hold-out split"""
+        (test,) = holdout_indices(50, 0.2, seed=3)
+        assert len(test) == 10 and len(set(test)) == 10
+        np.testing.assert_array_equal(test, holdout_indices(50, 0.2, seed=3)[0])
+        np.testing.assert_array_equal(holdout_indices(10, 0.3, shuffle=False)[0], [7, 8, 9])
+
+    def test_invalid(self):
+        """Test validation of fold counts and hold-out fractions"""
+        with pytest.raises(ValueError, match="Число блоков"):
+            kfold_indices(5, 6)
+        with pytest.raises(ValueError, match="Доля тестовых поз"):
+            holdout_indices(10, 1.0)
+
+
+class TestStatistics:
+    """Tests for solving from subtracted sufficient statistics"""
+
+    @pytest.mark.parametrize("method", ["shah", "li-wang-wu"])
+    def test_subtraction_matches_refit(self, method):
+        """Test that total minus fold statistics reproduce a refit on the other poses"""
+        As, Bs = _dataset()
+        folds = kfold_indices(len(As), 3)
+        stats = fold_statistics([method, "park-martin"], As, Bs, folds)
+        assert list(stats) == [method]
+        parts, total = stats[method]
+        solve = get_method(method).statistics[1]
+        for k, fold in enumerate(folds):
+            train = np.setdiff1d(np.arange(len(As)), fold)
+            X, Y = solve({key: total[key] - parts[k][key] for key in total})
+            X_ref, Y_ref = solve_method(method, As[train], Bs[train])
+            np.testing.assert_allclose(X, X_ref, atol=1e-9)
+            np.testing.assert_allclose(Y, Y_ref, atol=1e-9)
+
+
+class TestCrossValidate:
+    """Tests for cross_validate"""
+
+    def test_held_out_error_exceeds_training_error(self):
+        """Test that held-out errors are not smaller than in-sample errors"""
+        As, Bs = _dataset(40)
+        methods = ["shah", "li-wang-wu", "park-martin", "tsai-lenz"]
+        folds, pooled = cross_validate(methods, As, Bs, k=5, workers=1)
+        assert len(folds) == 5 * len(methods)
+        assert sorted(set(folds.column("trial"))) == [0, 1, 2, 3, 4]
+        assert list(pooled.column("method")) == methods
+        assert np.all(pooled.column("status") == STATUS_OK)
+        for i, name in enumerate(methods):
+            X, Y = solve_method(name, As, Bs)
+            t_fit, _ = summarize_errors(As, Bs, X, Y)
+            assert pooled.row(i)["t_rmse"] > t_fit["rmse"]
+
+    def test_pooled_metrics(self):
+        """Test that pooled metrics cover every held-out pose once"""
+        As, Bs = _dataset(20)
+        folds = kfold_indices(20, 4)
+        table, pooled = cross_validate(["shah"], As, Bs, folds=folds, workers=1)
+        errs = []
+        for k, fold in enumerate(folds):
+            X = table.row(k)["X"]
+            Y = table.row(k)["Y"]
+            _, _, t_errs, _ = summarize_errors(As[fold], Bs[fold], X, Y, return_residuals=True)
+            errs.append(t_errs)
+        errs = np.concatenate(errs)
+        assert pooled.row(0)["t_max"] == pytest.approx(errs.max())
+        assert pooled.row(0)["t_rmse"] == pytest.approx(np.sqrt(np.mean(errs ** 2)))
+
+    def test_statistics_match_refit(self):
+        """Test that the subtraction path gives the same table as plain refits"""
+        As, Bs = _dataset()
+        _, fast = cross_validate(["shah", "li-wang-wu"], As, Bs, k=4, workers=1)
+        _, slow = cross_validate(["shah", "li-wang-wu"], As, Bs, k=4, workers=1,
+                                 use_statistics=False)
+        np.testing.assert_allclose(fast.column("t_rmse"), slow.column("t_rmse"), rtol=1e-8)
+
+    def test_parallel_matches_serial(self):
+        """Test that folds evaluated in worker processes give the same results"""
+        As, Bs = _dataset()
+        serial, _ = cross_validate(["shah", "park-martin"], As, Bs, k=3, workers=1)
+        pooled, _ = cross_validate(["shah", "park-martin"], As, Bs, k=3, workers=2)
+        np.testing.assert_array_equal(serial.column("t_rmse"), pooled.column("t_rmse"))
+        np.testing.assert_array_equal(serial.column("trial"), pooled.column("trial"))
+
+    def test_holdout_and_failure(self):
+        """Test a hold-out split and error rows for methods that cannot be fitted"""
+        As, Bs = _dataset(6, noise=False)
+        folds = kfold_indices(6, 3)
+        table, pooled = cross_validate(["shah", "daniilidis"], As, Bs, folds=folds[:1] + [
+            np.arange(1, 6)], workers=1)
+        row = pooled.to_array()[pooled.column("method") == "shah"][0]
+        assert row["status"] == STATUS_ERROR and row["error"].startswith("блок 1:")
+        (test,) = holdout_indices(30, 0.25, seed=1)
+        As, Bs = _dataset()
+        table, pooled = cross_validate(["shah"], As, Bs, folds=[test], workers=1)
+        assert len(table) == 1 and pooled.row(0)["status"] == STATUS_OK
+
+
+class TestEntryPoints:
+    """Tests for file-level and command-line cross-validation"""
+
+    def test_get_cv_error_data(self):
+        """Test the get_error_data-compatible output on a test data pair"""
+        data = Path(__file__).parent / "data"
+        t_rows, r_rows = get_cv_error_data(
+            ["shah", "park-martin"], str(data / "circular_trajectory_A_1.0mm.txt"),
+            str(data / "circular_trajectory_B_1.0mm.txt"), k=3, workers=1)
+        assert set(t_rows) == {"shah", "park-martin"}
+        assert all(np.isfinite(t_rows[m]["rmse"]) for m in t_rows)
+
+    def test_cli(self, tmp_path):
+        """Test that --cv reports held-out metrics per method"""
+        data = Path(__file__).parent / "data"
+        out = tmp_path / "out.jsonl"
+        code = main([str(data / "circular_trajectory_*_1.0mm.txt"), "-m", "shah", "-j", "1",
+                     "-f", "jsonl", "--cv", "3", "-o", str(out)])
+        assert code == 0
+        (record,) = [json.loads(line) for line in out.read_text().splitlines()]
+        assert record["status"] == "ok"
+        assert main([str(data), "--cv", "1"]) == 2
+
+    def test_cli_more_folds_than_poses(self, tmp_path):
+        """Test that a dataset too small for K folds gets error rows instead of a crash"""
+        data = Path(__file__).parent / "data"
+        out = tmp_path / "out.jsonl"
+        code = main([str(data / "known_transform_*_1.0mm.txt"),
+                     str(data / "circular_trajectory_*_1.0mm.txt"), "-m", "shah", "park-martin",
+                     "-j", "1", "-f", "jsonl", "--cv", "9", "-o", str(out)])
+        assert code == 0
+        records = [json.loads(line) for line in out.read_text().splitlines()]
+        rows = {(r["dataset"][:5], r["method"]): r for r in records}
+        for method in ("shah", "park-martin"):
+            assert rows[("circu", method)]["status"] == "error"
+            assert "Число блоков" in rows[("circu", method)]["error"]
+        assert rows[("known", "shah")]["status"] == "ok"
@@ -0,0 +1,132 @@
+"""
+Tests for the degeneracy pre-check of motion excitation
+"""
+import csv
+import io
+import sys
+import pytest
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from degeneracy import (
+    assess_methods, motion_excitation, CONDITION_DTYPE,
+    CONDITION_OK, CONDITION_WEAK, CONDITION_DEGENERATE,
+)
+from cli import main
+from functions_call import evaluate_methods, load_inputs
+from registry import register_method, AX_XB, available_methods
+from results import STATUS_OK, STATUS_DEGENERATE
+from utils import euler_ZYX_to_R, exp_SO3
+from tests.conftest import synthetic_pairs
+
+DATA = Path(__file__).parent / "data"
+
+
+def _dataset(rotations, n=30, seed=0):
+    return synthetic_pairs(n, seed, rotations)
+
+
+def _general(rng, n):
+    return [euler_ZYX_to_R(*rng.uniform(-1, 1, 3)) for _ in range(n)]
+
+
+def _single_axis(rng, n):
+    return [exp_SO3(np.array([0.0, 0.0, 0.3 * i])) for i in range(n)]
+
+
+def _planar_axes(rng, n):
+    # каждое следующее вращение - поворот вокруг случайной оси в плоскости xy,
+    # поэтому оси всех относительных движений лежат в одной плоскости
+    Rs = [np.eye(3)]
+    for angle in rng.uniform(0, 2 * np.pi, n - 1):
+        Rs.append(Rs[-1] @ exp_SO3(0.4 * np.array([np.cos(angle), np.sin(angle), 0.0])))
+    return Rs
+
+
+class TestExcitation:
+    """Tests for motion_excitation and assess_methods"""
+
+    def test_general_motion(self):
+        """Test that well-excited motion passes for every method"""
+        conditions = assess_methods(available_methods(), *_dataset(_general))
+        assert conditions.dtype == CONDITION_DTYPE
+        assert list(conditions["method"]) == available_methods()
+        assert np.all(conditions["status"] == CONDITION_OK)
+        assert np.all(conditions["rotation"] > 0.1) and np.all(conditions["translation"] > 0.1)
+
+    def test_single_axis(self):
+        """Test that rotation about one axis is degenerate for both problem types"""
+        conditions = assess_methods(available_methods(), *_dataset(_single_axis))
+        assert np.all(conditions["status"] == CONDITION_DEGENERATE)
+        assert all("разброс осей" in reason for reason in conditions["reason"])
+
+    def test_planar_axes(self):
+        """Test that axes in one plane only rule out methods that need three axes"""
+        conditions = assess_methods(["tsai-lenz", "park-martin"], *_dataset(_planar_axes))
+        status = dict(zip(conditions["method"], conditions["status"]))
+        assert status["park-martin"] == CONDITION_DEGENERATE
+        assert status["tsai-lenz"] != CONDITION_DEGENERATE
+
+    def test_small_motions_weak(self):
+        """Test the warning when no motion pair reaches the rotation threshold"""
+        As, Bs = _dataset(lambda rng, n: [exp_SO3(rng.normal(0, 0.003, 3)) for _ in range(n)])
+        ex = motion_excitation(As, Bs)
+        assert ex[AX_XB]["moving"] == 0 and ex[AX_XB]["pairs"] == len(As) - 1
+        conditions = assess_methods(["tsai-lenz"], As, Bs, excitation=ex)
+        assert conditions["status"][0] == CONDITION_WEAK
+        assert "меньше 2°" in conditions["reason"][0]
+
+    def test_shared_pairs_reused(self):
+        """Test that the pre-check fills and reuses the shared preprocessing"""
+        As, Bs = _dataset(_general)
+        shared = {}
+        motion_excitation(As, Bs, shared)
+        pairs = shared["pairs"]
+        motion_excitation(As, Bs, shared)
+        assert shared["pairs"] is pairs
+
+    def test_test_data(self):
+        """Test the conditions of the bundled single-axis and planar-axis datasets"""
+        circular = assess_methods(available_methods(),
+                                  *load_inputs(str(DATA / "circular_trajectory_A_1.0mm.txt"),
+                                               str(DATA / "circular_trajectory_B_1.0mm.txt")))
+        assert np.all(circular["status"] == CONDITION_DEGENERATE)
+        known = assess_methods(["park-martin", "tsai-lenz"],
+                               *load_inputs(str(DATA / "known_transform_A_0.1mm.txt"),
+                                            str(DATA / "known_transform_B_0.1mm.txt")))
+        assert list(known["status"]) == [CONDITION_DEGENERATE, CONDITION_OK]
+
+    def test_rotation_rank_validation(self):
+        """Test that the registry rejects impossible axis counts"""
+        with pytest.raises(ValueError, match="осей вращения"):
+            register_method("bad", lambda As, Bs: None, AX_XB, rotation_rank=4)
+
+
+class TestPrecheck:
+    """Tests for skipping degenerate methods before solving"""
+
+    def test_evaluate_methods(self):
+        """Test that flagged methods get a degenerate row and are not solved"""
+        As, Bs = _dataset(_planar_axes)
+        table = evaluate_methods(["shah", "park-martin", "tsai-lenz"], As, Bs, precheck=True)
+        rows = {str(r["method"]): r for r in table.to_array()}
+        assert rows["park-martin"]["status"] == STATUS_DEGENERATE
+        assert "разброс осей" in rows["park-martin"]["error"]
+        assert np.isnan(rows["park-martin"]["t_rmse"])
+        assert np.isnan(rows["park-martin"]["solve_time"])
+        assert rows["tsai-lenz"]["status"] == STATUS_OK
+
+    def test_off_by_default(self):
+        """Test that without the pre-check every method is solved"""
+        table = evaluate_methods(["park-martin"], *_dataset(_single_axis))
+        assert table.column("status")[0] != STATUS_DEGENERATE
+
+    def test_cli(self, capsys):
+        """Test the --precheck option of the batch CLI"""
+        code = main([str(DATA / "circular_trajectory_?_1.0mm.txt"), "-m", "shah",
+                     "--precheck"])
+        assert code == 0
+        rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+        assert [row["status"] for row in rows] == [STATUS_DEGENERATE]
@@ -10,7 +10,10 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from functions_call import run_method, load_inputs, get_error_data
+from functions_call import (
+    run_method, load_inputs, get_error_data, get_error_table, evaluate_methods
+)
+from results import DATASET_NAME_LEN, METHOD_NAME_LEN, TRUNCATED
 from utils import compose, euler_ZYX_to_R
 
 
@@ -162,9 +165,10 @@ class TestGetErrorData:
         # Valid method should work
         assert "tsai-lenz" in t_rows
         
-        # Invalid method should have ERR values
-        if "invalid" in t_rows:
-            assert t_rows["invalid"]["mean"] == "ERR"
+        # Invalid method should have NaN values
+        assert "invalid" in t_rows
+        assert np.isnan(t_rows["invalid"]["mean"])
+        assert np.isnan(r_rows["invalid"]["mean"])
     
     def test_get_error_data_all_methods(self, sample_csv_file):
         """Test getting error data for all available methods"""
@@ -177,8 +181,70 @@ class TestGetErrorData:
         for method in methods:
             assert method in t_rows
             assert method in r_rows
-            # Check that values are either numbers or "ERR"
+            # Check that values are numbers (NaN for failed methods)
             for key in ["mean", "median", "rmse", "p95", "max"]:
                 value = t_rows[method][key]
-                assert isinstance(value, (int, float)) or value == "ERR"
+                assert isinstance(value, (int, float))
 
+
+
+class TestGetErrorTable:
+    """Tests for get_error_table function"""
+
+    def test_rows_follow_requested_order(self, sample_csv_file):
+        """Test that rows are returned in the requested method order"""
+        methods = ["shah", "tsai-lenz"]
+        table = get_error_table(methods, sample_csv_file, sample_csv_file)
+        assert list(table.column("method")) == methods
+        assert table.column("X").shape == (2, 4, 4)
+        assert np.all(table.column("solve_time") >= 0)
+
+    def test_error_is_recorded(self, sample_csv_file):
+        """Test that a failing method keeps its exception message"""
+        table = get_error_table(["tsai-lenz", "invalid"], sample_csv_file, sample_csv_file)
+        status = table.column("status")
+        assert list(status) == ["ok", "error"]
+        assert "Неизвестный метод" in table.column("error")[1]
+        assert np.isnan(table.column("t_mean")[1])
+        assert np.all(np.isnan(table.column("X")[1]))
+
+    def test_residuals_collected(self, sample_csv_file):
+        """Test that evaluate_methods exposes per-pose residuals on request"""
+        As, Bs = load_inputs(sample_csv_file, sample_csv_file)
+        residuals = {}
+        table = evaluate_methods(["tsai-lenz"], As, Bs, residuals=residuals)
+        t_errs, r_errs = residuals["tsai-lenz"]
+        assert t_errs.shape == (len(As),)
+        assert table.column("t_max")[0] == pytest.approx(t_errs.max())
+        assert table.column("r_mean")[0] == pytest.approx(r_errs.mean())
+
+    def test_long_names(self, sample_csv_file):
+        """Test that a too long method name is an error row and a too long dataset is rejected"""
+        long_name = "m" * (METHOD_NAME_LEN + 8)
+        table = get_error_table(["shah", long_name], sample_csv_file, sample_csv_file)
+        assert list(table.column("status")) == ["ok", "error"]
+        assert table.column("method")[1].endswith(TRUNCATED)
+        assert "Имя метода длиннее" in table.column("error")[1]
+        dataset = "d" * 80
+        table = get_error_table(["shah"], sample_csv_file, sample_csv_file, dataset=dataset)
+        assert table.column("dataset")[0] == dataset
+        with pytest.raises(ValueError, match="Имя набора длиннее"):
+            get_error_table(["shah"], sample_csv_file, sample_csv_file,
+                            dataset="d" * (DATASET_NAME_LEN + 1))
+
+    def test_progress_reported(self, sample_csv_file):
+        """Test that progress is reported once per method, including cached ones"""
+        from result_cache import ResultCache
+        cache = ResultCache()
+        calls = []
+        get_error_table(["shah"], sample_csv_file, sample_csv_file, cache=cache)
+        get_error_table(["shah", "invalid", "tsai-lenz"], sample_csv_file, sample_csv_file,
+                        cache=cache, progress=lambda name, status: calls.append((name, status)))
+        assert sorted(calls) == [("invalid", "error"), ("shah", "ok"), ("tsai-lenz", "ok")]
+
+    def test_run_method_returns_residuals(self, sample_poses):
+        """Test run_method with return_residuals"""
+        X, Y, t_stats, r_stats, t_errs, r_errs = run_method(
+            "tsai-lenz", sample_poses, sample_poses, return_residuals=True)
+        assert len(t_errs) == len(sample_poses)
+        assert t_stats["mean"] == pytest.approx(t_errs.mean())
@@ -0,0 +1,135 @@
+"""
+Tests for learning curves (accuracy vs. number of poses)
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from learning_curve import (
+    curve_sizes, learning_curve, poses_needed, pose_statistics, CURVE_DTYPE
+)
+from registry import AX_YB, get_method, register_method, unregister_method
+from tests.conftest import synthetic_pairs
+
+
+def _dataset(n=60, seed=0):
+    return synthetic_pairs(n, seed, noise={"pos_std": 1.0, "rot_std": 0.1})
+
+
+class TestSizes:
+    """Tests for subset sizes and validation"""
+
+    def test_curve_sizes(self):
+        """Test full and geometric size grids"""
+        np.testing.assert_array_equal(curve_sizes(8), np.arange(3, 9))
+        sizes = curve_sizes(1000, num=20)
+        assert sizes[0] == 3 and sizes[-1] == 1000 and np.all(np.diff(sizes) > 0)
+        with pytest.raises(ValueError, match="обучающих поз"):
+            curve_sizes(2)
+
+    def test_invalid(self):
+        """Test rejection of unknown modes and oversized subsets"""
+        As, Bs = _dataset(10)
+        with pytest.raises(ValueError, match="Неизвестный режим"):
+            learning_curve(["shah"], As, Bs, mode="bootstrap")
+        with pytest.raises(ValueError, match="Размеры подвыборок"):
+            learning_curve(["shah"], As, Bs, sizes=[3, 10])
+
+
+class TestLearningCurve:
+    """Tests for learning_curve"""
+
+    def test_pose_statistics_add_up(self):
+        """Test that per-pose statistics sum to the statistics of the whole set"""
+        As, Bs = _dataset(10)
+        accumulate = get_method("li-wang-wu").statistics[0]
+        per_pose = pose_statistics(accumulate, As, Bs)
+        total = accumulate(As, Bs)
+        for key, value in total.items():
+            np.testing.assert_allclose(per_pose[key].sum(axis=0), value, atol=1e-6)
+
+    @pytest.mark.parametrize("mode", ["random", "prefix", "ordered"])
+    def test_statistics_match_refit(self, mode):
+        """Test that summed statistics give the same curves as refitting every subset"""
+        As, Bs = _dataset()
+        kwargs = dict(sizes=[4, 10, 30], mode=mode, repeats=5, seed=2)
+        fast = learning_curve(["shah", "li-wang-wu"], As, Bs, **kwargs)
+        slow = learning_curve(["shah", "li-wang-wu"], As, Bs, use_statistics=False, **kwargs)
+        np.testing.assert_array_equal(fast["count"], slow["count"])
+        np.testing.assert_allclose(fast["mean"], slow["mean"], rtol=1e-6)
+
+    def test_error_decreases_with_poses(self):
+        """Test that held-out error and its spread shrink as poses are added"""
+        As, Bs = _dataset()
+        curves = learning_curve(["shah", "park-martin"], As, Bs, sizes=[4, 8, 40], repeats=15)
+        assert curves.dtype == CURVE_DTYPE
+        assert len(curves) == 2 * 3 * 2
+        for name in ("shah", "park-martin"):
+            rows = curves[(curves["method"] == name) & (curves["column"] == "t_rmse")]
+            assert list(rows["n"]) == [4, 8, 40]
+            assert rows["mean"][-1] < rows["mean"][0]
+            assert rows["high"][-1] - rows["low"][-1] < rows["high"][0] - rows["low"][0]
+            assert np.all(rows["ci_low"] <= rows["mean"]) and np.all(rows["mean"] <= rows["ci_high"])
+            assert np.all(rows["low"] <= rows["high"])
+
+    def test_ordered_single_curve(self):
+        """Test that the recording-order mode gives one replicate per size"""
+        As, Bs = _dataset(20)
+        curves = learning_curve(["shah"], As, Bs, mode="ordered", test_fraction=None,
+                                columns=("r_p95",))
+        assert list(curves["n"]) == list(range(3, 21))
+        assert np.all(curves["count"] == 1) and np.all(np.isnan(curves["std"]))
+
+    def test_failed_subsets_counted(self):
+        """Test that unsolvable subsets are counted per size and real bugs propagate"""
+        As, Bs = _dataset(30)
+        curves = learning_curve(["daniilidis", "shah"], As, Bs, sizes=[2, 6], repeats=4,
+                                columns=("t_rmse",))
+        assert np.all(curves["count"] + curves["failed"] == 4)
+        small = curves[curves["n"] == 2]
+        assert np.all(small["failed"] == 4) and np.all(np.isnan(small["mean"]))
+        assert np.all(curves["failed"][curves["n"] == 6] == 0)
+
+        def singular(As, Bs):
+            raise np.linalg.LinAlgError("Singular matrix")
+
+        def broken(As, Bs):
+            raise TypeError("bug in solver")
+
+        register_method("singular", singular, AX_YB)
+        register_method("broken", broken, AX_YB)
+        try:
+            curves = learning_curve(["singular"], As, Bs, sizes=[6], repeats=3)
+            assert np.all(curves["failed"] == 3) and np.all(curves["count"] == 0)
+            with pytest.raises(TypeError, match="bug in solver"):
+                learning_curve(["broken"], As, Bs, sizes=[6], repeats=3)
+        finally:
+            unregister_method("singular")
+            unregister_method("broken")
+
+    def test_reproducible(self):
+        """Test that curves depend only on the seed"""
+        As, Bs = _dataset(30)
+        a = learning_curve(["shah"], As, Bs, sizes=[5, 10], repeats=4, seed=7)
+        b = learning_curve(["shah"], As, Bs, sizes=[5, 10], repeats=4, seed=7)
+        c = learning_curve(["shah"], As, Bs, sizes=[5, 10], repeats=4, seed=8)
+        np.testing.assert_array_equal(a["mean"], b["mean"])
+        assert not np.array_equal(a["mean"], c["mean"])
+
+
+class TestPosesNeeded:
+    """Tests for poses_needed"""
+
+    def test_threshold(self):
+        """Test the smallest size from which the curve stays under the target"""
+        curves = np.zeros(4, dtype=CURVE_DTYPE)
+        curves["method"] = "m"
+        curves["column"] = "t_rmse"
+        curves["n"] = [3, 5, 10, 20]
+        curves["ci_high"] = [4.0, 0.9, 1.1, 0.5]
+        assert poses_needed(curves, target=1.0) == {"m": 20}
+        assert poses_needed(curves, target=5.0) == {"m": 3}
+        assert poses_needed(curves, target=0.1) == {"m": None}
@@ -11,13 +11,23 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 try:
-    from perlin_noise import process_perlin_file, PerlinNoise
+    from perlin_noise import (
+        process_perlin_file, PerlinNoise, pnoise3_array, perlin_trajectory_noise, OFFSET_BASES
+    )
     HAS_PERLIN = True
 except ImportError:
     HAS_PERLIN = False
 
 try:
-    from gause_noise import process_gaussian_file
+    from noise import pnoise3
+    HAS_C_NOISE = True
+except ImportError:
+    HAS_C_NOISE = False
+
+try:
+    from gause_noise import (
+        process_gaussian_file, gaussian_noise, add_gaussian_noise, noise_factor
+    )
     HAS_GAUSSIAN = True
 except ImportError:
     HAS_GAUSSIAN = False
@@ -130,6 +140,88 @@ class TestPerlinNoise:
                 os.unlink(output_file)
 
 
+@pytest.mark.skipif(not HAS_PERLIN, reason="Perlin noise module not available")
+class TestVectorizedPerlin:
+    """Tests for the NumPy Perlin noise implementation"""
+
+    @pytest.mark.skipif(not HAS_C_NOISE, reason="noise library not installed")
+    @pytest.mark.parametrize("base", [0, 1])
+    @pytest.mark.parametrize("repeat", [1024, 0, 16])
+    def test_matches_c_pnoise3(self, base, repeat):
+        """Test that pnoise3_array reproduces noise.pnoise3 where the C code stays in its table"""
+        pts = np.random.default_rng(base).uniform(-600, 600, (2000, 3))
+        expected = [pnoise3(*p, repeatx=repeat, repeaty=repeat, base=base) for p in pts]
+        result = pnoise3_array(pts[:, 0], pts[:, 1], pts[:, 2], repeat, repeat, 1024, base)
+        np.testing.assert_allclose(result, expected, rtol=0, atol=1e-6)
+
+    @pytest.mark.skipif(not HAS_C_NOISE, reason="noise library not installed")
+    def test_trajectory_matches_scalar_fbm(self):
+        """Test that trajectory noise equals per-line fBm with C pnoise3"""
+        def fbm(x, y, octaves=4, persistence=0.5, scale=1.0, seed=1):
+            total, amplitude, max_amp, freq = 0.0, 1.0, 0.0, 1.0
+            for _ in range(octaves):
+                total += pnoise3(x * freq, y * freq, 0, octaves=1, repeatx=False, base=seed) * amplitude
+                max_amp += amplitude
+                amplitude *= persistence
+                freq *= 2
+            return (total / max_amp - 0.5) * 2 * scale
+
+        lines = np.arange(300)
+        result = perlin_trajectory_noise(lines, pos_scale=20.0, rot_scale=0.5, seed=1)
+        expected = [[fbm(i * 0.1, off, scale=20.0 if c < 3 else 0.5)
+                     for c, off in enumerate([0, 100, 200, 300, 400, 500])] for i in lines]
+        np.testing.assert_allclose(result, expected, rtol=0, atol=1e-6)
+
+    def test_fbm_scalar_matches_array(self):
+        """Test that the scalar fbm wrapper agrees with fbm_array"""
+        noise = PerlinNoise(seed=3)
+        xs = np.linspace(0, 5, 11)
+        values = noise.fbm_array(xs, 100.0, 0.0, scale=2.0)
+        assert values.shape == xs.shape
+        assert [noise.fbm(x, 100.0, 0.0, scale=2.0) for x in xs] == pytest.approx(values.tolist())
+
+    def test_offset_base_shifts_lattice(self):
+        """Test that a small base is the base-0 field shifted along the lattice"""
+        # дробные части с точным представлением во float32, чтобы сдвиг их не менял
+        pts = np.random.default_rng(0).integers(0, 200 * 64, (500, 3)) / 64
+        for base in (42, OFFSET_BASES - 1):
+            np.testing.assert_array_equal(pnoise3_array(*pts.T, base=base),
+                                          pnoise3_array(*(pts + base).T, base=0))
+
+    def test_large_bases_distinct(self):
+        """Test that large bases get their own permutations and never alias each other"""
+        pts = np.linspace(0.1, 40.0, 50)
+        fields = [pnoise3_array(pts, 0.3, 0.7, base=b)
+                  for b in (OFFSET_BASES, OFFSET_BASES + 1, 514, 10_000, 2 ** 40)]
+        for a in range(len(fields)):
+            assert np.all(np.isfinite(fields[a]))
+            for b in range(a):
+                assert not np.allclose(fields[a], fields[b])
+        np.testing.assert_array_equal(pnoise3_array(pts, 0.3, 0.7, base=514), fields[2])
+        assert not np.allclose(PerlinNoise(seed=514).fbm_array(pts, 100.0),
+                               PerlinNoise(seed=0).fbm_array(pts, 100.0))
+
+    def test_invalid_base(self):
+        """Test that negative and fractional bases are rejected"""
+        for base in (-1, 2.5):
+            with pytest.raises(ValueError, match="base"):
+                pnoise3_array(0.5, 0.5, 0.5, base=base)
+
+    def test_chunked_file_matches_whole(self, sample_data_file):
+        """Test that chunked processing keeps the line-based time axis"""
+        out1 = sample_data_file + "_c1.txt"
+        out2 = sample_data_file + "_c2.txt"
+        try:
+            process_perlin_file(sample_data_file, out1, 5.0, 0.1, chunk_size=1)
+            process_perlin_file(sample_data_file, out2, 5.0, 0.1)
+            with open(out1) as f1, open(out2) as f2:
+                assert f1.read() == f2.read()
+        finally:
+            for f in [out1, out2]:
+                if os.path.exists(f):
+                    os.unlink(f)
+
+
 @pytest.mark.skipif(not HAS_GAUSSIAN, reason="Gaussian noise module not available")
 class TestGaussianNoise:
     """Tests for Gaussian noise generation"""
@@ -237,3 +329,62 @@ class TestGaussianNoise:
                 if os.path.exists(f):
                     os.unlink(f)
 
+    def test_zero_std_keeps_values(self, sample_data_file):
+        """Test that zero noise reproduces the input, including the last angle"""
+        output_file = sample_data_file + "_output.txt"
+        try:
+            process_gaussian_file(sample_data_file, output_file, pos_std=0.0, rot_std=0.0)
+            original = np.loadtxt(sample_data_file)
+            processed = np.loadtxt(output_file)
+            np.testing.assert_allclose(processed, original)
+        finally:
+            if os.path.exists(output_file):
+                os.unlink(output_file)
+
+    def test_chunked_matches_whole(self, sample_data_file):
+        """Test that streaming by chunks gives the same output as one chunk"""
+        out1 = sample_data_file + "_c1.txt"
+        out2 = sample_data_file + "_c2.txt"
+        try:
+            process_gaussian_file(sample_data_file, out1, 3.0, 0.3, seed=7, chunk_size=1)
+            process_gaussian_file(sample_data_file, out2, 3.0, 0.3, seed=7)
+            with open(out1) as f1, open(out2) as f2:
+                assert f1.read() == f2.read()
+        finally:
+            for f in [out1, out2]:
+                if os.path.exists(f):
+                    os.unlink(f)
+
+    def test_sample_covariance(self):
+        """Test that samples follow the requested covariance"""
+        samples = gaussian_noise(200_000, pos_std=2.0, rot_std=0.1, correlation=0.3,
+                                 rng=np.random.default_rng(0))
+        F = noise_factor(2.0, 0.1, 0.3)
+        expected = F @ F.T
+        assert expected[0, 0] == pytest.approx(4.0)
+        assert expected[0, 1] == pytest.approx(4.0 * 0.3)
+        assert np.all(expected[:3, 3:] == 0)
+        np.testing.assert_allclose(np.cov(samples.T), expected, atol=0.03)
+
+    def test_full_correlation(self):
+        """Test that correlation=1 gives identical noise on all axes"""
+        samples = gaussian_noise(10, 1.0, 1.0, correlation=1.0, rng=np.random.default_rng(0))
+        np.testing.assert_allclose(samples[:, 0], samples[:, 1])
+        np.testing.assert_allclose(samples[:, 3], samples[:, 5])
+
+    def test_invalid_correlation(self):
+        """Test that correlations giving a non-PSD matrix are rejected, not clipped"""
+        with pytest.raises(ValueError, match="полуопределена"):
+            noise_factor(1.0, 1.0, correlation=-0.6)
+        with pytest.raises(ValueError, match="полуопределена"):
+            noise_factor(1.0, 1.0, correlation=1.5)
+        F = noise_factor(1.0, 1.0, correlation=-0.5)
+        np.testing.assert_allclose((F @ F.T)[0, 1], -0.5, atol=1e-12)
+
+    def test_add_gaussian_noise_array(self):
+        """Test array mode: shape, reproducibility and unbiased last angle"""
+        values = np.tile([1.0, 2.0, 3.0, 10.0, 20.0, 30.0], (50_000, 1))
+        noisy = add_gaussian_noise(values, 1.0, 0.1, seed=1)
+        assert noisy.shape == values.shape
+        np.testing.assert_array_equal(noisy, add_gaussian_noise(values, 1.0, 0.1, seed=1))
+        np.testing.assert_allclose(noisy.mean(axis=0), values[0], atol=0.05)
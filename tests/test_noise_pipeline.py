@@ -0,0 +1,149 @@
+"""
+Tests for the composable noise pipeline
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from noise_pipeline import NoisePipeline, STAGES
+from rng import BLOCK_SIZE
+from utils import (
+    exp_SE3, invert_T_batch, log_SO3_batch, euler_ZYX_to_R, euler_ZYX_to_R_batch,
+    R_to_euler_ZYX_batch
+)
+
+ALL_STAGES = [
+    {"type": "gaussian", "pos_std": 1.0, "rot_std": 0.1},
+    {"type": "perlin", "pos_scale": 2.0, "rot_scale": 0.1},
+    {"type": "drift", "pos_step": 0.05, "rot_step": 0.005},
+    {"type": "outliers", "rate": 0.01, "pos_std": 50.0, "rot_std": 5.0},
+    {"type": "dropout", "rate": 0.01, "burst": 3},
+    {"type": "quantize", "pos_resolution": 0.01, "rot_resolution": 0.001},
+]
+
+
+@pytest.fixture
+def poses():
+    """Random trajectory spanning several rng blocks"""
+    rng = np.random.default_rng(0)
+    n = 2 * BLOCK_SIZE + 500
+    return exp_SE3(np.hstack([rng.uniform(-500, 500, (n, 3)), rng.uniform(-2, 2, (n, 3))]))
+
+
+def _translation_shift(Ts, noisy):
+    return np.linalg.norm(noisy[:, :3, 3] - Ts[:, :3, 3], axis=1)
+
+
+class TestEulerBatch:
+    """Tests for batched Euler conversions used by quantization"""
+
+    def test_roundtrip(self):
+        """Test batch conversion against the scalar function and its inverse"""
+        angles = np.random.default_rng(0).uniform(-1.5, 1.5, (50, 3))
+        R = euler_ZYX_to_R_batch(angles)
+        np.testing.assert_allclose(R, [euler_ZYX_to_R(*a) for a in angles], atol=1e-15)
+        np.testing.assert_allclose(R_to_euler_ZYX_batch(R), angles, atol=1e-12)
+
+
+class TestPipeline:
+    """Tests for NoisePipeline"""
+
+    def test_unknown_stage(self):
+        """Test that unknown stage types are rejected"""
+        with pytest.raises(ValueError, match="Неизвестный этап шума"):
+            NoisePipeline([{"type": "pink"}])
+
+    @pytest.mark.parametrize("stage, match", [
+        ({"type": "gaussian", "pos_sdt": 1.0}, "Неизвестные параметры этапа gaussian"),
+        ({"type": "gaussian", "pos_std": -1.0}, "pos_std этапа gaussian должен быть неотрицательным"),
+        ({"type": "gaussian", "correlation": 2.0}, "correlation"),
+        ({"type": "perlin", "octaves": 2.5}, "octaves"),
+        ({"type": "dropout", "rate": 1.5}, "rate"),
+        ({"type": "drift", "side": "middle"}, "side"),
+        ({"type": "quantize", "pos_resolution": "1"}, "числом"),
+    ])
+    def test_invalid_parameters(self, stage, match):
+        """Test that stage parameters are checked when the config is parsed"""
+        with pytest.raises(ValueError, match=match):
+            NoisePipeline.from_config({"stages": [stage]})
+
+    def test_config_roundtrip(self):
+        """Test declarative configuration"""
+        pipeline = NoisePipeline.from_config({"seed": 5, "stages": ALL_STAGES})
+        assert pipeline.to_config() == {"seed": 5, "stages": ALL_STAGES}
+        assert set(s["type"] for s in ALL_STAGES) == set(STAGES)
+
+    def test_reproducible_and_trial_dependent(self, poses):
+        """Test that one seed reproduces the output and trials differ"""
+        pipeline = NoisePipeline(ALL_STAGES, seed=3)
+        a, ka = pipeline.apply(poses)
+        b, kb = NoisePipeline(ALL_STAGES, seed=3).apply(poses)
+        np.testing.assert_array_equal(a, b)
+        np.testing.assert_array_equal(ka, kb)
+        c, _ = pipeline.apply(poses, trial=1)
+        assert not np.allclose(a, c)
+
+    def test_chunks_match_whole(self, poses):
+        """Test lazy chunked evaluation and random access to a pose range"""
+        pipeline = NoisePipeline(ALL_STAGES, seed=7)
+        whole, keep = pipeline.apply(poses)
+        parts = list(pipeline.iter_chunks(poses, chunk_size=1001))
+        np.testing.assert_array_equal(np.concatenate([p for p, _ in parts]), whole)
+        np.testing.assert_array_equal(np.concatenate([k for _, k in parts]), keep)
+        start = BLOCK_SIZE + 10
+        middle, kmid = pipeline.apply(poses[start:start + 300], start=start)
+        np.testing.assert_array_equal(middle, whole[start:start + 300])
+        np.testing.assert_array_equal(kmid, keep[start:start + 300])
+
+    def test_drift_grows(self, poses):
+        """Test that random-walk drift variance grows along the trajectory"""
+        stages = [{"type": "drift", "pos_step": 0.1, "rot_step": 0.0}]
+        shifts = np.array([_translation_shift(poses, NoisePipeline(stages, seed=s).apply(poses)[0])
+                           for s in range(20)])
+        early, late = shifts[:, :100].mean(), shifts[:, -100:].mean()
+        assert late > 5 * early
+
+    def test_outlier_rate(self, poses):
+        """Test that outliers hit roughly the requested fraction of poses"""
+        noisy, keep = NoisePipeline([{"type": "outliers", "rate": 0.05}]).apply(poses)
+        hit = _translation_shift(poses, noisy) > 0
+        assert keep.all()
+        assert hit.mean() == pytest.approx(0.05, abs=0.01)
+
+    def test_dropout_bursts(self, poses):
+        """Test that dropouts remove runs of frames and apply_pairs drops them from A and B"""
+        pipeline = NoisePipeline([{"type": "dropout", "rate": 0.02, "burst": 4}])
+        _, keep = pipeline.apply(poses)
+        dropped = np.flatnonzero(~keep)
+        assert 0 < len(dropped) < len(poses)
+        runs = np.split(dropped, np.flatnonzero(np.diff(dropped) > 1) + 1)
+        assert min(len(r) for r in runs if r[-1] < len(poses) - 1) >= 4
+        As, Bs = pipeline.apply_pairs(poses, poses)
+        assert len(As) == len(Bs) == keep.sum()
+
+    def test_quantize(self, poses):
+        """Test that translations and ZYX angles snap to the resolution grid"""
+        noisy, _ = NoisePipeline([{"type": "quantize", "pos_resolution": 0.5,
+                                   "rot_resolution": 0.1}]).apply(poses)
+        t = noisy[:, :3, 3] / 0.5
+        np.testing.assert_allclose(t, np.round(t), atol=1e-9)
+        angles = np.rad2deg(R_to_euler_ZYX_batch(noisy[:, :3, :3])) / 0.1
+        np.testing.assert_allclose(angles, np.round(angles), atol=1e-6)
+
+    def test_scaled(self, poses):
+        """Test that scaling multiplies amplitudes but keeps rates"""
+        pipeline = NoisePipeline(ALL_STAGES).scaled(0.5)
+        assert pipeline.stages[0]["pos_std"] == 0.5
+        assert pipeline.stages[3]["rate"] == 0.01
+        zero, _ = NoisePipeline([{"type": "gaussian", "pos_std": 2.0, "rot_std": 1.0}]).scaled(0.0).apply(poses)
+        np.testing.assert_allclose(zero, poses, atol=1e-12)
+
+    def test_result_is_rigid(self, poses):
+        """Test that the full pipeline keeps valid rigid transforms"""
+        noisy, _ = NoisePipeline(ALL_STAGES).apply(poses)
+        R = noisy[:, :3, :3]
+        np.testing.assert_allclose(R @ R.transpose(0, 2, 1), np.broadcast_to(np.eye(3), R.shape),
+                                   atol=1e-12)
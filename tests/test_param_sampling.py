@@ -0,0 +1,123 @@
+"""
+Tests for quasi-Monte Carlo sampling of noise parameters
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+from scipy.stats import qmc
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from param_sampling import ParameterSampler, parse_space, DEFAULT_SPACE
+from noise_pipeline import NoisePipeline
+from sweep import run_param_sweep, iter_param_sweep
+from functions_call import solve_method
+from tests.conftest import synthetic_pairs
+
+
+def _dataset(seed, n=15):
+    return synthetic_pairs(n, seed)
+
+
+class TestParameterSampler:
+    """Tests for ParameterSampler"""
+
+    def test_bounds_and_integers(self):
+        """Test that samples respect bounds and integer parameters take every value"""
+        sampler = ParameterSampler(method="sobol", seed=1)
+        values = sampler.draw(256)
+        for j, (lo, hi) in enumerate(DEFAULT_SPACE.values()):
+            assert np.all(values[:, j] >= lo) and np.all(values[:, j] <= hi)
+        octaves = values[:, sampler.names.index("perlin.octaves")]
+        assert set(octaves) == {1, 2, 3, 4, 5, 6}
+
+    def test_lhs_stratification(self):
+        """Test that Latin hypercube samples hit every stratum exactly once"""
+        u = ParameterSampler(method="lhs", seed=2).unit(50)
+        for j in range(u.shape[1]):
+            assert sorted(np.floor(u[:, j] * 50).astype(int)) == list(range(50))
+
+    @pytest.mark.parametrize("method", ["sobol", "lhs"])
+    def test_lower_discrepancy_than_random(self, method):
+        """Test that QMC points fill the cube more evenly than pseudo-random ones"""
+        u = ParameterSampler(method=method, seed=3).unit(128)
+        r = ParameterSampler(method="random", seed=3).unit(128)
+        assert qmc.discrepancy(u) < qmc.discrepancy(r)
+
+    def test_batches_continue_sequence(self):
+        """Test that batched draws continue one Sobol sequence"""
+        a = ParameterSampler(seed=4)
+        b = ParameterSampler(seed=4)
+        np.testing.assert_array_equal(np.vstack([a.unit(8), a.unit(8)]), b.unit(16))
+        assert a.count == 16
+
+    def test_mean_converges_faster(self):
+        """Test the error of a smooth response estimate against pseudo-random sampling"""
+        space = {"gaussian.pos_std": (0.0, 1.0), "gaussian.rot_std": (0.0, 1.0),
+                 "gaussian.correlation": (0.0, 1.0)}
+
+        def response(v):
+            return np.exp(v[:, 0]) * np.sin(1 + v[:, 1]) + v[:, 2] ** 2
+
+        grid = np.linspace(0, 1, 201)
+        g = np.stack(np.meshgrid(grid, grid, grid), -1).reshape(-1, 3)
+        exact = response(g).mean()
+        errors = {}
+        for method in ("sobol", "random"):
+            estimates = [response(ParameterSampler(space, method, s).draw(256)).mean()
+                         for s in range(10)]
+            errors[method] = np.mean(np.abs(np.array(estimates) - exact))
+        assert errors["sobol"] < errors["random"] / 5
+
+    def test_configs(self):
+        """Test mapping of sampled values onto pipeline stages"""
+        sampler = ParameterSampler({"gaussian.pos_std": (1.0, 2.0), "drift.pos_step": (0.0, 1.0)})
+        base = {"seed": 9, "stages": [{"type": "gaussian", "rot_std": 0.1}]}
+        config = sampler.configs([[1.5, 0.25]], base)[0]
+        assert config["seed"] == 9
+        assert config["stages"] == [{"type": "gaussian", "rot_std": 0.1, "pos_std": 1.5},
+                                    {"type": "drift", "pos_step": 0.25}]
+        NoisePipeline.from_config(config)
+
+    def test_invalid_space(self):
+        """Test validation of parameter names, ranges and methods"""
+        with pytest.raises(ValueError, match="Неизвестный параметр"):
+            parse_space({"pink.level": (0, 1)})
+        with pytest.raises(ValueError, match="Пустой диапазон"):
+            parse_space({"gaussian.pos_std": (2.0, 1.0)})
+        with pytest.raises(ValueError, match="Неизвестный способ"):
+            ParameterSampler(method="halton")
+
+
+class TestParamSweep:
+    """Tests for sweeps over sampled noise parameters"""
+
+    def test_rows_match_samples(self):
+        """Test that trial i of the table was solved with sample i"""
+        datasets = {"first": _dataset(0)}
+        table, values = run_param_sweep(datasets, 12, methods=["shah"], batch_size=8,
+                                        workers=1)
+        assert values.shape == (12, len(DEFAULT_SPACE))
+        assert sorted(table.column("trial")) == list(range(12))
+        sampler = ParameterSampler()
+        config = sampler.configs(values[5:6])[0]
+        As, Bs = datasets["first"]
+        noisy, _ = NoisePipeline.from_config(config).apply(Bs, trial=5)
+        X, _ = solve_method("shah", As, noisy)
+        row = table.to_array()[table.column("trial") == 5][0]
+        np.testing.assert_allclose(row["X"], X, atol=1e-12)
+
+    def test_batches_and_pool(self):
+        """Test batch streaming and independence from the process pool"""
+        datasets = {"first": _dataset(0), "second": _dataset(1)}
+        batches = list(iter_param_sweep(datasets, 10, method="lhs", batch_size=4,
+                                        methods=["park-martin"], workers=1))
+        assert [(start, len(v), len(rows)) for start, v, rows in batches] == [
+            (0, 4, 8), (4, 4, 8), (8, 2, 4)]
+        serial, v1 = run_param_sweep(datasets, 8, methods=["park-martin"], workers=1)
+        pooled, v2 = run_param_sweep(datasets, 8, methods=["park-martin"], workers=2)
+        np.testing.assert_array_equal(v1, v2)
+        order = ["dataset", "trial"]
+        np.testing.assert_array_equal(np.sort(serial.to_array(), order=order)["t_rmse"],
+                                      np.sort(pooled.to_array(), order=order)["t_rmse"])
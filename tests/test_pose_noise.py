@@ -0,0 +1,94 @@
+"""
+Tests for SE(3) manifold noise on pose matrices
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pose_noise import gaussian_twists, perlin_twists, perturb_poses, add_pose_noise
+from utils import compose, euler_ZYX_to_R, invert_T_batch, log_SO3_batch
+
+
+@pytest.fixture
+def poses():
+    """Poses including gimbal-lock orientations (pitch = +-90 degrees)"""
+    rng = np.random.default_rng(1)
+    Ts = [compose(euler_ZYX_to_R(*rng.uniform(-np.pi, np.pi, 3)), rng.uniform(-100, 100, 3))
+          for _ in range(2000)]
+    Ts += [compose(euler_ZYX_to_R(0.3, s * np.pi / 2, 0.7), np.zeros(3))
+           for s in (1, -1) for _ in range(1000)]
+    return np.array(Ts)
+
+
+def _rotation_angles_deg(Ts, noisy):
+    rel = invert_T_batch(Ts) @ noisy
+    return np.rad2deg(np.linalg.norm(log_SO3_batch(rel[:, :3, :3]), axis=1))
+
+
+class TestTwists:
+    """Tests for twist samplers"""
+
+    def test_gaussian_twists_units(self):
+        """Test that rotation std is given in degrees and returned in radians"""
+        xi = gaussian_twists(50_000, pos_std=2.0, rot_std=1.0, correlation=0.0, seed=0)
+        assert xi.shape == (50_000, 6)
+        np.testing.assert_allclose(xi[:, :3].std(axis=0), 2.0, rtol=0.03)
+        np.testing.assert_allclose(xi[:, 3:].std(axis=0), np.deg2rad(1.0), rtol=0.03)
+
+    def test_ranges_reproducible(self):
+        """Test that a sub-range of poses gets the same twists as in the full run"""
+        for sampler in (gaussian_twists, perlin_twists):
+            full = sampler(500, seed=4)
+            np.testing.assert_array_equal(sampler(100, seed=4, start=200), full[200:300])
+
+    def test_perlin_twists_smooth(self):
+        """Test that Perlin twists change slowly between neighbouring poses"""
+        xi = perlin_twists(1000, pos_scale=5.0, rot_scale=1.0)
+        assert np.abs(np.diff(xi[:, 0])).max() < 0.2 * np.abs(xi[:, 0]).max()
+
+
+class TestPerturbPoses:
+    """Tests for applying noise on SE(3)"""
+
+    def test_result_is_rigid(self, poses):
+        """Test that perturbed poses remain valid rigid transforms"""
+        noisy = add_pose_noise(poses, "gaussian", pos_std=1.0, rot_std=2.0)
+        R = noisy[:, :3, :3]
+        np.testing.assert_allclose(R @ R.transpose(0, 2, 1), np.broadcast_to(np.eye(3), R.shape),
+                                   atol=1e-12)
+        np.testing.assert_allclose(np.linalg.det(R), 1.0)
+
+    def test_magnitude_independent_of_pose(self, poses):
+        """Test that the rotation error does not depend on the orientation (incl. gimbal lock)"""
+        noisy = add_pose_noise(poses, "gaussian", pos_std=0.0, rot_std=1.0, correlation=0.0)
+        angles = _rotation_angles_deg(poses, noisy)
+        generic, locked = angles[:2000], angles[2000:]
+        # |theta| for an isotropic 3D Gaussian with sigma = 1 deg has mean 2 * sqrt(2 / pi)
+        expected = 2.0 * np.sqrt(2.0 / np.pi)
+        assert generic.mean() == pytest.approx(expected, rel=0.05)
+        assert locked.mean() == pytest.approx(expected, rel=0.05)
+
+    def test_zero_noise_identity(self, poses):
+        """Test that zero noise leaves the poses unchanged"""
+        np.testing.assert_allclose(add_pose_noise(poses, "perlin", pos_scale=0.0, rot_scale=0.0),
+                                   poses, atol=1e-12)
+
+    def test_left_and_right(self, poses):
+        """Test that right noise is in the body frame and left noise in the world frame"""
+        xi = np.zeros((len(poses), 6))
+        xi[:, 0] = 1.0
+        right = perturb_poses(poses, xi, side="right")
+        left = perturb_poses(poses, xi, side="left")
+        np.testing.assert_allclose(left[:, :3, 3] - poses[:, :3, 3], np.tile([1.0, 0, 0], (len(poses), 1)),
+                                   atol=1e-12)
+        np.testing.assert_allclose(right[:, :3, 3] - poses[:, :3, 3], poses[:, :3, 0], atol=1e-12)
+        with pytest.raises(ValueError):
+            perturb_poses(poses, xi, side="middle")
+
+    def test_unknown_model(self, poses):
+        """Test that an unknown noise model raises ValueError"""
+        with pytest.raises(ValueError, match="Неизвестная модель шума"):
+            add_pose_noise(poses, "pink")
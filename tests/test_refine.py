@@ -0,0 +1,92 @@
+"""
+Tests for Levenberg-Marquardt refinement on SE(3)
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import refine
+from refine import refine_xy
+from functions_call import evaluate_methods
+from utils import (
+    compose, euler_ZYX_to_R, exp_SO3, exp_SE3, log_SO3, log_SO3_batch,
+    invert_T, invert_T_batch, summarize_errors
+)
+
+
+@pytest.fixture
+def noisy_poses():
+    """Poses related by known X, Y with small measurement noise"""
+    rng = np.random.default_rng(5)
+    X = compose(euler_ZYX_to_R(0.4, -0.3, 0.2), np.array([10.0, -5.0, 20.0]))
+    Y = compose(euler_ZYX_to_R(-0.2, 0.1, 0.5), np.array([100.0, 50.0, -30.0]))
+    n = 200
+    As = exp_SE3(np.hstack([rng.uniform(-500, 500, (n, 3)), rng.uniform(-2, 2, (n, 3))]))
+    Bs = invert_T(Y) @ As @ X
+    Bs = Bs @ exp_SE3(np.hstack([rng.normal(0, 0.5, (n, 3)), rng.normal(0, 0.002, (n, 3))]))
+    return As, Bs, X, Y
+
+
+class TestLieGroupHelpers:
+    """Tests for exp/log helpers used by refinement"""
+
+    def test_exp_log_roundtrip(self):
+        """Test that exp_SO3 inverts log_SO3"""
+        w = np.array([[0.1, -0.2, 0.3], [1e-10, 0, 0], [2.0, 1.0, -0.5]])
+        np.testing.assert_allclose(log_SO3_batch(exp_SO3(w)), w, atol=1e-9)
+        np.testing.assert_allclose(log_SO3(exp_SO3(w[0])), w[0], atol=1e-12)
+
+    def test_exp_se3_translation_only(self):
+        """Test that a pure translation twist gives a translation"""
+        T = exp_SE3(np.array([1.0, 2.0, 3.0, 0.0, 0.0, 0.0]))
+        np.testing.assert_allclose(T, compose(np.eye(3), np.array([1.0, 2.0, 3.0])))
+
+
+class TestRefine:
+    """Tests for refine_xy"""
+
+    def test_analytic_jacobian(self, noisy_poses):
+        """Test analytic Jacobians against finite differences"""
+        As, Bs, X, Y = noisy_poses
+        As, Bs = As[:5], Bs[:5]
+        As_inv = invert_T_batch(As)
+        w = 10.0
+        r, G, Delta, phi = refine._residuals(As_inv, Bs, X, Y, w)
+        J = refine._jacobians(G, Delta, phi, w)
+        eps = 1e-6
+        for k in range(12):
+            d = np.zeros(12)
+            d[k] = eps
+            r2 = refine._residuals(As_inv, Bs, X @ exp_SE3(d[:6]), exp_SE3(d[6:]) @ Y, w)[0]
+            np.testing.assert_allclose((r2 - r) / eps, J[:, :, k], atol=1e-3 * max(1, np.abs(J[:, :, k]).max()))
+
+    def test_converges_from_perturbed_start(self, noisy_poses):
+        """Test convergence to the true transforms in a few iterations"""
+        As, Bs, X, Y = noisy_poses
+        X0 = X @ exp_SE3(np.array([5.0, -3.0, 2.0, 0.05, 0.02, -0.03]))
+        Y0 = exp_SE3(np.array([-4.0, 1.0, 6.0, -0.02, 0.04, 0.01])) @ Y
+        Xr, Yr, info = refine_xy(As, Bs, X0, Y0, return_info=True)
+        assert info["iterations"] <= 10
+        assert np.all(np.diff(info["cost"]) <= 0)
+        np.testing.assert_allclose(Xr, X, atol=0.2)
+        np.testing.assert_allclose(Yr, Y, atol=0.2)
+
+    def test_improves_closed_form_estimate(self, noisy_poses):
+        """Test that refinement does not increase the error of any method"""
+        As, Bs, _, _ = noisy_poses
+        plain = evaluate_methods(["tsai-lenz", "li-wang-wu"], As, Bs)
+        refined = evaluate_methods(["tsai-lenz", "li-wang-wu"], As, Bs, refine=True)
+        assert np.all(refined.column("t_rmse") <= plain.column("t_rmse") + 1e-9)
+        # from any start the refined solutions agree
+        assert refined.column("t_rmse")[0] == pytest.approx(refined.column("t_rmse")[1], rel=1e-6)
+
+    def test_result_is_rigid(self, noisy_poses):
+        """Test that refined transforms stay in SE(3)"""
+        As, Bs, X, Y = noisy_poses
+        Xr, Yr = refine_xy(As, Bs, np.eye(4), np.eye(4))
+        for T in (Xr, Yr):
+            np.testing.assert_allclose(T[:3, :3] @ T[:3, :3].T, np.eye(3), atol=1e-10)
+            np.testing.assert_allclose(T[3], [0, 0, 0, 1])
@@ -0,0 +1,126 @@
+"""
+Tests for the method registry
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from registry import (
+    AX_XB, AX_YB, available_methods, get_method, register_method,
+    unregister_method, schedule, prepare, SHARED_LIMIT
+)
+from functions_call import run_method, get_error_data
+from utils import compose, euler_ZYX_to_R
+from tsai_lenz import tsai_lenz
+
+
+@pytest.fixture
+def sample_poses():
+    """Generate a list of sample pose transformation matrices"""
+    poses = []
+    for i in range(6):
+        R = euler_ZYX_to_R(i * np.pi / 8, i * np.pi / 16, 0)
+        t = np.array([i * 0.5, i * 0.3, i * 0.1])
+        poses.append(compose(R, t))
+    return np.array(poses)
+
+
+class TestRegistry:
+    """Tests for registered method metadata"""
+
+    def test_builtin_methods_in_order(self):
+        """Test that the five built-in methods are registered in GUI order"""
+        assert available_methods()[:5] == [
+            "tsai-lenz", "park-martin", "daniilidis", "li-wang-wu", "shah"
+        ]
+
+    def test_problem_types(self):
+        """Test problem type of built-in methods"""
+        for name in ["tsai-lenz", "park-martin", "daniilidis"]:
+            assert get_method(name).problem == AX_XB
+            assert "relative_motions" in get_method(name).preprocessing
+        for name in ["li-wang-wu", "shah"]:
+            assert get_method(name).problem == AX_YB
+        assert "dual_quaternions" in get_method("daniilidis").preprocessing
+
+    def test_unknown_method(self):
+        """Test that unknown method raises ValueError"""
+        with pytest.raises(ValueError, match="Неизвестный метод"):
+            get_method("unknown-method")
+
+    def test_unknown_problem(self):
+        """Test that invalid problem type is rejected"""
+        with pytest.raises(ValueError):
+            register_method("bad", tsai_lenz, "AX=B")
+
+    def test_long_name(self):
+        """Test that names that would not fit the result table are rejected"""
+        with pytest.raises(ValueError, match="Имя метода длиннее"):
+            register_method("x" * 33, tsai_lenz, AX_XB)
+        assert "x" * 33 not in available_methods()
+
+    def test_schedule_by_cost(self):
+        """Test that scheduling orders methods by estimated cost"""
+        order = schedule(["li-wang-wu", "unknown", "park-martin", "shah"], 100)
+        assert order == ["park-martin", "shah", "li-wang-wu", "unknown"]
+
+
+class TestPrepare:
+    """Tests for shared preprocessing"""
+
+    def test_prepare_shares_pairs(self, sample_poses):
+        """Test that relative motions are computed once for all AX=XB methods"""
+        specs = [get_method("tsai-lenz"), get_method("daniilidis")]
+        shared = prepare(specs, sample_poses, sample_poses)
+        assert set(shared) == {"pairs", "quats", SHARED_LIMIT}
+        assert len(shared["quats"]) == len(shared["pairs"])
+
+    def test_solve_with_shared_matches_plain(self, sample_poses):
+        """Test that shared preprocessing does not change results"""
+        shared = {}
+        for name in ["tsai-lenz", "park-martin", "daniilidis"]:
+            X1, Y1 = get_method(name).solve(sample_poses, sample_poses, shared)
+            X2, Y2 = get_method(name).func(sample_poses, sample_poses)
+            np.testing.assert_allclose(X1, X2)
+            np.testing.assert_allclose(Y1, Y2)
+
+    def test_max_pairs_limits_shared_pairs(self, sample_poses):
+        """Test that max_pairs is applied to the shared relative motions"""
+        shared = prepare([get_method("park-martin")], sample_poses, sample_poses, max_pairs=2)
+        assert len(shared["pairs"]) == 2
+        X, Y = get_method("park-martin").solve(sample_poses, sample_poses, max_pairs=2)
+        assert X.shape == (4, 4)
+
+    def test_shared_bound_to_max_pairs(self, sample_poses):
+        """Test that pairs selected for one max_pairs are not reused for another"""
+        shared = prepare([get_method("park-martin")], sample_poses, sample_poses, max_pairs=2)
+        with pytest.raises(ValueError, match="max_pairs=2"):
+            get_method("daniilidis").solve(sample_poses, sample_poses, shared)
+        assert "quats" not in shared
+        prepare([get_method("daniilidis")], sample_poses, sample_poses, shared, max_pairs=2)
+        assert len(shared["quats"]) == 2
+
+
+class TestPluggableMethod:
+    """Tests for plugging in a new solver"""
+
+    def test_register_new_method(self, sample_poses, sample_csv_file):
+        """Test that a registered solver is usable without other changes"""
+        def identity_solver(As, Bs):
+            return np.eye(4), np.eye(4)
+
+        register_method("identity", identity_solver, AX_YB, cost_per_pose=0.0)
+        try:
+            assert "identity" in available_methods()
+            X, Y, t_stats, _ = run_method("identity", sample_poses, sample_poses)
+            np.testing.assert_array_equal(X, np.eye(4))
+            assert t_stats["max"] < 1e-10
+
+            t_rows, _ = get_error_data(["shah", "identity"], sample_csv_file, sample_csv_file)
+            assert list(t_rows) == ["shah", "identity"]
+        finally:
+            unregister_method("identity")
+        assert "identity" not in available_methods()
@@ -0,0 +1,154 @@
+"""
+Tests for the result cache used by get_error_data
+"""
+import pytest
+import numpy as np
+import shutil
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from result_cache import CACHE_VERSION, ResultCache, file_hash, make_key
+from registry import AX_YB, register_method, unregister_method
+from functions_call import get_error_data
+
+
+@pytest.fixture
+def counting_method():
+    """Register a solver that counts how many times it was called"""
+    calls = []
+
+    def solver(As, Bs):
+        calls.append(len(As))
+        return np.eye(4), np.eye(4)
+
+    register_method("counting", solver, AX_YB)
+    yield calls
+    unregister_method("counting")
+
+
+class TestResultCache:
+    """Tests for ResultCache"""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = ResultCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_hit_miss_counters(self):
+        """Test hit and miss statistics"""
+        cache = ResultCache(maxsize=4)
+        cache.get("missing")
+        cache.put("k", 1)
+        cache.get("k")
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_concurrent_access(self, tmp_path):
+        """Test that threads sharing one cache keep it consistent"""
+        import threading
+        cache = ResultCache(maxsize=8, path=str(tmp_path))
+        errors = []
+
+        def worker(offset):
+            try:
+                for i in range(200):
+                    key = make_key("ha", "hb", f"m{(i + offset) % 20}")
+                    cache.put(key, {"i": i})
+                    assert cache.get(key) is not None
+                    assert key in cache and len(cache) <= 8
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == []
+        assert cache.hits + cache.misses == 4 * 200 and len(cache) == 8
+
+    def test_invalid_maxsize(self):
+        """Test that non-positive maxsize is rejected"""
+        with pytest.raises(ValueError):
+            ResultCache(maxsize=0)
+
+    def test_disk_tier(self, tmp_path):
+        """Test that entries survive in the persistent tier"""
+        key = make_key("ha", "hb", "shah", {"type": "Gaussian Noise", "level": 0.5, "seed": 42})
+        cache = ResultCache(maxsize=1, path=str(tmp_path))
+        cache.put(key, {"mean": 1.0})
+        cache.put("other", 2)
+
+        fresh = ResultCache(maxsize=1, path=str(tmp_path))
+        assert key in fresh
+        assert fresh.get(key) == {"mean": 1.0}
+
+        fresh.clear(disk=True)
+        assert fresh.get(key) is None
+
+    def test_stale_entries_are_misses(self, tmp_path):
+        """Test that unreadable or old-format disk entries are treated as misses"""
+        import pickle
+        cache = ResultCache(path=str(tmp_path))
+        key = make_key("ha", "hb", "shah")
+        assert key[0] == CACHE_VERSION
+        # запись старого формата без версии в ключе
+        old_key = key[1:]
+        with open(cache._disk_path(old_key), "wb") as f:
+            pickle.dump((old_key, ({"mean": 1.0}, {"mean": 2.0})), f)
+        assert cache.get(key) is None
+        for payload in (b"not a pickle", pickle.dumps(1), b"\x80\x04csys\nmissing_name\n."):
+            with open(cache._disk_path(key), "wb") as f:
+                f.write(payload)
+            assert cache.get(key) is None
+        assert cache.misses == 4
+
+    def test_key_depends_on_noise(self):
+        """Test that noise parameters are part of the key"""
+        clean = make_key("ha", "hb", "shah")
+        noisy = make_key("ha", "hb", "shah", {"level": 0.5, "type": "Perlin Noise"})
+        same = make_key("ha", "hb", "shah", {"type": "Perlin Noise", "level": 0.5})
+        assert clean != noisy
+        assert noisy == same
+
+
+class TestCachedErrorData:
+    """Tests for get_error_data with a cache"""
+
+    def test_file_hash_uses_content(self, sample_csv_file, tmp_path):
+        """Test that copies of a file share a hash"""
+        copy = tmp_path / "copy.txt"
+        shutil.copy(sample_csv_file, copy)
+        assert file_hash(sample_csv_file) == file_hash(str(copy))
+
+    def test_repeat_run_uses_cache(self, sample_csv_file, counting_method):
+        """Test that a repeated run does not call the solver again"""
+        cache = ResultCache()
+        first = get_error_data(["counting", "shah"], sample_csv_file, sample_csv_file, cache=cache)
+        second = get_error_data(["counting", "shah"], sample_csv_file, sample_csv_file, cache=cache)
+        assert len(counting_method) == 1
+        assert first == second
+
+    def test_only_changed_combinations_recomputed(self, sample_csv_file, counting_method):
+        """Test that a different noise setting triggers recomputation"""
+        cache = ResultCache()
+        get_error_data(["counting"], sample_csv_file, sample_csv_file, cache=cache)
+        get_error_data(["counting"], sample_csv_file, sample_csv_file, cache=cache,
+                       noise={"type": "Gaussian Noise", "level": 0.1, "seed": 42})
+        get_error_data(["counting"], sample_csv_file, sample_csv_file, cache=cache)
+        assert len(counting_method) == 2
+
+    def test_errors_are_not_cached(self, sample_csv_file):
+        """Test that failed methods are retried on the next run"""
+        cache = ResultCache()
+        get_error_data(["invalid"], sample_csv_file, sample_csv_file, cache=cache)
+        assert len(cache) == 0
@@ -0,0 +1,117 @@
+"""
+Tests for the columnar result table
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from results import (
+    ResultTable, RESULT_DTYPE, METRICS, stats_fields, ERROR_LEN, METHOD_NAME_LEN,
+    DATASET_NAME_LEN, TRUNCATED
+)
+
+
+def make_table(n, methods=("a", "b")):
+    table = ResultTable(capacity=1)
+    for i in range(n):
+        table.append(method=methods[i % len(methods)], trial=i, t_mean=float(i), r_mean=1.0)
+    return table
+
+
+class TestResultTable:
+    """Tests for ResultTable"""
+
+    def test_append_grows(self):
+        """Test that appending beyond capacity keeps all rows"""
+        table = make_table(100)
+        assert len(table) == 100
+        np.testing.assert_array_equal(table.column("trial"), np.arange(100))
+
+    def test_defaults(self):
+        """Test default values of missing fields"""
+        table = ResultTable()
+        table.append(method="a")
+        row = table.row(0)
+        assert row["status"] == "ok"
+        assert row["noise_level"] == 0.0
+        assert np.isnan(row["t_p95"])
+        assert np.all(np.isnan(row["X"]))
+
+    def test_unknown_field(self):
+        """Test that unknown fields are rejected"""
+        with pytest.raises(ValueError):
+            ResultTable().append(method="a", colour="red")
+
+    def test_long_text_fields(self):
+        """Test that long errors are marked as truncated and long names rejected"""
+        table = ResultTable()
+        table.append(method="a", status="error", error="x" * (ERROR_LEN + 10))
+        error = table.column("error")[0]
+        assert len(error) == ERROR_LEN and error.endswith(TRUNCATED)
+        table.append(method="b", status="error", error="short")
+        assert table.column("error")[1] == "short"
+        with pytest.raises(ValueError, match="Имя метода длиннее"):
+            table.append(method="m" * (METHOD_NAME_LEN + 1))
+        with pytest.raises(ValueError, match="Имя набора длиннее"):
+            table.append(method="c", dataset="d" * (DATASET_NAME_LEN + 1))
+        assert len(table) == 2
+
+    def test_extend(self):
+        """Test concatenating tables"""
+        table = make_table(3)
+        table.extend(make_table(5))
+        assert len(table) == 8
+        assert table.to_array().dtype == RESULT_DTYPE
+
+    def test_aggregate(self):
+        """Test grouped reductions"""
+        table = make_table(10)
+        table.append(method="a", t_mean=1000.0, status="error")
+        groups, mean = table.aggregate("t_mean")
+        assert list(groups) == ["a", "b"]
+        np.testing.assert_allclose(mean, [4.0, 5.0])
+        _, count = table.aggregate("t_mean", func="count", ok_only=False)
+        np.testing.assert_array_equal(count, [6, 5])
+        _, mx = table.aggregate("t_mean", func="max")
+        np.testing.assert_allclose(mx, [8.0, 9.0])
+        _, std = table.aggregate("t_mean", func="std")
+        np.testing.assert_allclose(std, [np.std([0, 2, 4, 6, 8], ddof=1)] * 2)
+
+    def test_aggregate_by_two_columns(self):
+        """Test grouping by several columns"""
+        table = make_table(8)
+        groups, count = table.aggregate("t_mean", by=("method", "trial"), func="count")
+        assert len(groups) == 8
+        assert np.all(count == 1)
+
+    def test_aggregate_large(self):
+        """Test that aggregation handles 1e5 rows"""
+        table = ResultTable()
+        rows = np.zeros(100_000, dtype=RESULT_DTYPE)
+        rows["method"] = np.where(np.arange(100_000) % 2, "a", "b")
+        rows["t_rmse"] = 1.0
+        rows["status"] = "ok"
+        table.extend(rows)
+        _, mean = table.aggregate("t_rmse")
+        np.testing.assert_allclose(mean, [1.0, 1.0])
+
+    def test_to_stats_dicts(self):
+        """Test conversion to the get_error_data format"""
+        t_stats = {m: 1.0 for m in METRICS}
+        r_stats = {m: 2.0 for m in METRICS}
+        table = ResultTable()
+        table.append(method="shah", **stats_fields(t_stats, r_stats))
+        t_rows, r_rows = table.to_stats_dicts()
+        assert t_rows == {"shah": t_stats}
+        assert r_rows == {"shah": r_stats}
+
+    def test_to_dataframe(self):
+        """Test conversion to a pandas DataFrame"""
+        table = make_table(4)
+        df = table.to_dataframe(include_transforms=True)
+        assert len(df) == 4
+        assert "X00" in df.columns and "Y33" in df.columns
+        assert "X" not in df.columns
@@ -0,0 +1,95 @@
+"""
+Tests for the RANSAC robust wrapper
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from robust import ransac, score_hypotheses, required_iterations
+from functions_call import evaluate_methods
+from registry import AX_XB, get_method, register_method, unregister_method
+from utils import compose, euler_ZYX_to_R, invert_T, pose_residuals
+
+
+@pytest.fixture
+def outlier_poses():
+    """Poses related by known X, Y with a few gross outliers in B"""
+    rng = np.random.default_rng(3)
+    X = compose(euler_ZYX_to_R(0.4, -0.3, 0.2), np.array([10.0, -5.0, 20.0]))
+    Y = compose(euler_ZYX_to_R(-0.2, 0.1, 0.5), np.array([100.0, 50.0, -30.0]))
+    As, Bs = [], []
+    for _ in range(40):
+        A = compose(euler_ZYX_to_R(*rng.uniform(-np.pi, np.pi, 3)), rng.uniform(-500, 500, 3))
+        As.append(A)
+        Bs.append(invert_T(Y) @ A @ X)
+    Bs = np.array(Bs)
+    outliers = [3, 11, 17, 25, 33]
+    for i in outliers:
+        Bs[i] = Bs[i] @ compose(euler_ZYX_to_R(0.5, 0.3, -0.4), np.array([80.0, -60.0, 40.0]))
+    return np.array(As), Bs, X, Y, outliers
+
+
+class TestRansac:
+    """Tests for ransac"""
+
+    @pytest.mark.parametrize("name", ["tsai-lenz", "park-martin", "li-wang-wu", "shah"])
+    def test_recovers_transform_with_outliers(self, outlier_poses, name):
+        """Test that outliers are rejected and X, Y recovered"""
+        As, Bs, X_true, Y_true, outliers = outlier_poses
+        X, Y, inliers = ransac(name, As, Bs, t_thresh=1.0, r_thresh=0.1, seed=1)
+        assert not inliers[outliers].any()
+        assert inliers.sum() == len(As) - len(outliers)
+        t_errs, r_errs = pose_residuals(As[inliers], Bs[inliers], X, Y)
+        assert t_errs.max() < 1e-3
+        assert r_errs.max() < 1e-3
+
+    def test_early_termination(self):
+        """Test the adaptive iteration bound"""
+        assert required_iterations(1.0, 3, 0.99) == 0
+        assert required_iterations(0.5, 3, 0.99) == 35
+        assert required_iterations(0.0, 3, 0.99) == np.inf
+
+    def test_batched_scoring_matches_single(self, outlier_poses):
+        """Test that batched scoring agrees with per-hypothesis residuals"""
+        As, Bs, X, Y, _ = outlier_poses
+        Xs = np.array([X, np.eye(4)])
+        Ys = np.array([Y, np.eye(4)])
+        masks = score_hypotheses(As, Bs, Xs, Ys, 1.0, 0.1)
+        for h in range(2):
+            t_errs, r_errs = pose_residuals(As, Bs, Xs[h], Ys[h])
+            np.testing.assert_array_equal(masks[h], (t_errs <= 1.0) & (r_errs <= 0.1))
+
+    def test_too_few_poses(self, outlier_poses):
+        """Test that RANSAC needs at least a minimal sample"""
+        As, Bs, _, _, _ = outlier_poses
+        with pytest.raises(ValueError):
+            ransac("shah", As[:2], Bs[:2])
+
+    def test_robust_mode_in_evaluation(self, outlier_poses):
+        """Test that evaluate_methods can run methods in robust mode"""
+        As, Bs, _, _, _ = outlier_poses
+        plain = evaluate_methods(["shah"], As, Bs)
+        robust = evaluate_methods(["shah"], As, Bs, robust={"t_thresh": 1.0, "r_thresh": 0.1})
+        assert robust.column("t_median")[0] < 1e-3
+        assert robust.column("t_median")[0] < plain.column("t_median")[0]
+
+    def test_max_pairs_in_robust_mode(self, outlier_poses):
+        """Test that max_pairs reaches the solver in robust mode"""
+        As, Bs, _, _, _ = outlier_poses
+        seen = []
+
+        def spy(As, Bs, pairs):
+            seen.append(len(pairs))
+            return get_method("tsai-lenz").func(As, Bs, pairs=pairs)
+
+        register_method("spy", spy, AX_XB, preprocessing=("relative_motions",))
+        try:
+            table = evaluate_methods(["spy"], As, Bs, max_pairs=4,
+                                     robust={"t_thresh": 1.0, "r_thresh": 0.1})
+        finally:
+            unregister_method("spy")
+        assert table.column("status")[0] == "ok"
+        assert seen and max(seen) <= 4
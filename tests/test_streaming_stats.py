@@ -0,0 +1,143 @@
+"""
+Tests for constant-memory streaming statistics
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from streaming_stats import QuantileSketch, StreamingStats, RunningMoments
+from utils import summarize_errors, summarize_error_chunks, compose, euler_ZYX_to_R
+from functions_call import iter_pose_chunks, load_inputs
+
+
+class TestQuantileSketch:
+    """Tests for QuantileSketch"""
+
+    @pytest.mark.parametrize("q", [0.0, 0.1, 0.5, 0.95, 0.99, 1.0])
+    def test_relative_error_bound(self, q):
+        """Test the documented relative accuracy guarantee"""
+        rng = np.random.default_rng(0)
+        x = rng.lognormal(mean=0.0, sigma=2.0, size=20_000)
+        sketch = QuantileSketch(relative_accuracy=0.01).update(x)
+        exact = np.quantile(x, q, method="lower")
+        assert abs(sketch.quantile(q) - exact) <= 0.0101 * exact
+
+    def test_merge_equals_single_pass(self):
+        """Test that merged sketches equal a sketch over all data"""
+        rng = np.random.default_rng(1)
+        x = rng.exponential(size=5000)
+        whole = QuantileSketch().update(x)
+        parts = [QuantileSketch().update(chunk) for chunk in np.array_split(x, 7)]
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        assert merged.count == whole.count
+        for q in (0.5, 0.95):
+            assert merged.quantile(q) == whole.quantile(q)
+
+    def test_zeros(self):
+        """Test that exact zeros are kept in a separate bucket"""
+        sketch = QuantileSketch().update(np.zeros(10))
+        assert sketch.quantile(0.5) == 0.0
+
+    def test_rejects_negative(self):
+        """Test that negative values are rejected"""
+        with pytest.raises(ValueError):
+            QuantileSketch().update([-1.0])
+
+    def test_merge_requires_same_accuracy(self):
+        """Test that incompatible sketches cannot be merged"""
+        with pytest.raises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+class TestStreamingStats:
+    """Tests for StreamingStats"""
+
+    def test_exact_moments(self):
+        """Test that mean, rmse and max are exact"""
+        rng = np.random.default_rng(2)
+        x = rng.gamma(2.0, size=10_000)
+        acc = StreamingStats()
+        for chunk in np.array_split(x, 13):
+            acc.update(chunk)
+        stats = acc.result()
+        assert stats["mean"] == pytest.approx(np.mean(x))
+        assert stats["rmse"] == pytest.approx(np.sqrt(np.mean(x ** 2)))
+        assert stats["max"] == np.max(x)
+        assert stats["p95"] == pytest.approx(np.percentile(x, 95), rel=0.02)
+        assert stats["median"] == pytest.approx(np.median(x), rel=0.02)
+
+    def test_merge_workers(self):
+        """Test merging accumulators from parallel workers"""
+        x = np.linspace(0.1, 10, 1000)
+        a = StreamingStats().update(x[:300])
+        b = StreamingStats().update(x[300:])
+        merged = a.merge(b).result()
+        assert merged["mean"] == pytest.approx(np.mean(x))
+        assert merged["max"] == 10
+
+    def test_empty(self):
+        """Test that an empty accumulator has no result"""
+        with pytest.raises(ValueError):
+            StreamingStats().result()
+
+
+class TestChunkedSummary:
+    """Tests for chunked error summaries"""
+
+    def test_chunk_size_matches_full(self, sample_poses):
+        """Test that chunked summary agrees with the in-memory one"""
+        X = compose(euler_ZYX_to_R(0.2, 0.1, 0), np.array([1.0, 2.0, 0.0]))
+        full_t, full_r = summarize_errors(sample_poses, sample_poses, X, np.eye(4))
+        t_stats, r_stats = summarize_errors(sample_poses, sample_poses, X, np.eye(4), chunk_size=2)
+        for key in ("mean", "rmse", "max"):
+            assert t_stats[key] == pytest.approx(full_t[key])
+            assert r_stats[key] == pytest.approx(full_r[key])
+        assert t_stats["median"] == pytest.approx(full_t["median"], rel=0.1)
+
+    def test_chunked_file_reader(self, sample_csv_file):
+        """Test evaluating files chunk by chunk"""
+        As, Bs = load_inputs(sample_csv_file, sample_csv_file)
+        X = compose(np.eye(3), np.array([1.0, 0.0, 0.0]))
+        t_acc, _ = summarize_error_chunks(iter_pose_chunks(sample_csv_file, sample_csv_file, 2),
+                                          X, np.eye(4))
+        assert t_acc.count == len(As)
+        full_t, _ = summarize_errors(As, Bs, X, np.eye(4))
+        assert t_acc.result()["mean"] == pytest.approx(full_t["mean"])
+
+
+class TestRunningMoments:
+    """Tests for Welford running mean / variance"""
+
+    def test_matches_numpy(self):
+        """Test batched updates against a direct computation"""
+        x = np.random.default_rng(0).normal(1e6, 3.0, 1000)
+        moments = RunningMoments()
+        for chunk in np.array_split(x, 7):
+            moments.update(chunk)
+        assert moments.count == 1000
+        assert moments.mean == pytest.approx(x.mean(), rel=1e-14)
+        assert moments.variance == pytest.approx(x.var(ddof=1), rel=1e-9)
+
+    def test_scalar_updates_and_merge(self):
+        """Test one-value updates and merging of partial accumulators"""
+        x = np.random.default_rng(1).exponential(2.0, 200)
+        left, right = RunningMoments(), RunningMoments()
+        for v in x[:50]:
+            left.update(v)
+        right.update(x[50:])
+        left.merge(right)
+        assert left.mean == pytest.approx(x.mean())
+        assert left.std == pytest.approx(x.std(ddof=1))
+        assert left.half_width(2.0) == pytest.approx(2.0 * x.std(ddof=1) / np.sqrt(200))
+
+    def test_nan_and_empty(self):
+        """Test that NaN values are skipped and small samples have infinite intervals"""
+        moments = RunningMoments().update([np.nan, 1.0])
+        assert moments.count == 1
+        assert np.isnan(moments.variance)
+        assert moments.half_width() == np.inf
@@ -0,0 +1,261 @@
+"""
+Tests for the Monte Carlo noise-sweep engine
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from sweep import (
+    run_sweep, iter_sweep, prepare_dataset, make_tasks, paired_differences, DEFAULT_NOISE,
+    run_adaptive_sweep, AdaptiveState
+)
+from noise_pipeline import NoisePipeline
+from functions_call import solve_method
+from results import STATUS_OK
+from utils import motion_pairs, motion_side
+from tests.conftest import synthetic_pairs
+
+
+def _dataset(seed, n=15):
+    return synthetic_pairs(n, seed)
+
+
+@pytest.fixture
+def datasets():
+    return {"first": _dataset(0), "second": _dataset(1)}
+
+
+def _sorted(table):
+    return np.sort(table.to_array(), order=["dataset", "noise_level", "trial", "method"])
+
+
+class TestSweep:
+    """Tests for run_sweep / iter_sweep"""
+
+    def test_shape_and_columns(self, datasets):
+        """Test that every dataset x level x trial x method cell gets one row"""
+        table = run_sweep(datasets, methods=["park-martin", "shah"], levels=[0.0, 0.5],
+                          trials=3, workers=1)
+        assert len(table) == 2 * 2 * 3 * 2
+        assert set(table.column("dataset")) == {"first", "second"}
+        assert set(table.column("trial")) == {0, 1, 2}
+        assert np.all(table.column("status") == STATUS_OK)
+
+    def test_zero_level_is_exact(self, datasets):
+        """Test that a zero noise level reproduces the noise-free solution"""
+        table = run_sweep(datasets, methods=["tsai-lenz"], levels=[0.0], trials=2, workers=1)
+        assert np.all(table.column("t_max") < 1e-6)
+
+    def test_error_grows_with_level(self, datasets):
+        """Test that larger noise levels give larger errors"""
+        table = run_sweep(datasets, methods=["shah"], levels=[0.1, 1.0], trials=4, workers=1)
+        levels, mean = table.aggregate("t_rmse", by=("noise_level",))
+        assert list(levels) == [0.1, 1.0]
+        assert mean[1] > mean[0]
+
+    def test_independent_of_workers_and_chunks(self, datasets):
+        """Test that results do not depend on the process pool or task size"""
+        kwargs = dict(methods=["park-martin", "li-wang-wu"], levels=[0.3, 0.7], trials=4)
+        serial = run_sweep(datasets, workers=1, chunk_trials=4, **kwargs)
+        pooled = run_sweep(datasets, workers=2, chunk_trials=1, **kwargs)
+        a, b = _sorted(serial), _sorted(pooled)
+        np.testing.assert_array_equal(a["t_rmse"], b["t_rmse"])
+        np.testing.assert_array_equal(a["X"], b["X"])
+
+    def test_matches_pipeline(self, datasets):
+        """Test that a trial uses the pipeline noise of that trial"""
+        noise = NoisePipeline([{"type": "gaussian", "pos_std": 2.0, "rot_std": 0.1}], seed=7)
+        table = run_sweep({"first": datasets["first"]}, methods=["shah"], levels=[0.5],
+                          trials=3, noise=noise, workers=1)
+        As, Bs = datasets["first"]
+        _, noisy = noise.scaled(0.5).apply_pairs(As, Bs, trial=2)
+        X, _ = solve_method("shah", As, noisy)
+        row = _sorted(table)[2]
+        assert row["trial"] == 2
+        np.testing.assert_allclose(row["X"], X, atol=1e-12)
+
+    def test_dropout_config(self, datasets):
+        """Test pipelines that drop frames (no shared A-side preprocessing)"""
+        config = {"seed": 3, "stages": [{"type": "dropout", "rate": 0.2, "burst": 2}]}
+        table = run_sweep(datasets, methods=["park-martin"], levels=[1.0], trials=3,
+                          noise=config, workers=1)
+        assert np.all(table.column("t_max") < 1e-6)
+
+    def test_progress_and_streaming(self, datasets):
+        """Test progress callback and per-task streaming"""
+        calls = []
+        run_sweep(datasets, methods=["shah"], levels=[0.5], trials=4, workers=1,
+                  chunk_trials=2, progress=lambda done, total: calls.append((done, total)))
+        assert calls == [(2, 8), (4, 8), (6, 8), (8, 8)]
+        chunks = list(iter_sweep(datasets, methods=["shah"], levels=[0.5, 1.0], trials=4,
+                                 workers=1, chunk_trials=3))
+        assert [len(c) for c in chunks] == [6, 2, 6, 2]
+
+    def test_unknown_stage(self, datasets):
+        """Test that an invalid noise configuration fails before any work starts"""
+        with pytest.raises(ValueError, match="Неизвестный этап шума"):
+            next(iter_sweep(datasets, noise={"stages": [{"type": "pink"}]}, workers=1))
+
+    def test_tasks(self):
+        """Test task splitting into trial ranges"""
+        tasks = make_tasks({"a": None, "b": None}, ["shah"], [0.0, 1], 5, {}, 2)
+        assert [(t[0], t[2], t[3]) for t in tasks] == [
+            ("a", 0, 2), ("a", 2, 4), ("a", 4, 5), ("b", 0, 2), ("b", 2, 4), ("b", 4, 5)]
+        assert all(t[1] == [0.0, 1.0] for t in tasks)
+
+
+class TestCommonRandomNumbers:
+    """Tests for shared noise realizations and paired statistics"""
+
+    def test_levels_share_realization(self, datasets):
+        """Test that levels of one trial see the same noise, scaled"""
+        As, Bs = datasets["first"]
+        noise = NoisePipeline([{"type": "gaussian", "pos_std": 2.0, "rot_std": 0.1,
+                                "correlation": 0.0}], seed=5)
+        out = {level: noisy for level, noisy, _ in noise.apply_levels(Bs, [0.5, 1.0], trial=3)}
+        shift = {level: out[level][:, :3, 3] - Bs[:, :3, 3] for level in out}
+        # при одинаковом направлении повороты малы, поэтому смещения почти пропорциональны
+        np.testing.assert_allclose(shift[1.0], 2 * shift[0.5], rtol=0.05, atol=0.05)
+        np.testing.assert_array_equal(out[1.0], noise.apply(Bs, trial=3)[0])
+
+    def test_methods_share_realization(self, datasets):
+        """Test that all methods of a trial are solved on the same noisy poses"""
+        table = run_sweep({"first": datasets["first"]}, methods=["tsai-lenz", "park-martin"],
+                          levels=[0.5], trials=2, workers=1)
+        As, Bs = datasets["first"]
+        _, noisy = NoisePipeline.from_config(DEFAULT_NOISE).scaled(0.5).apply_pairs(As, Bs, trial=1)
+        for row in _sorted(table)[2:]:
+            X, _ = solve_method(str(row["method"]), As, noisy)
+            np.testing.assert_allclose(row["X"], X, atol=1e-12)
+
+    def test_paired_differences(self, datasets):
+        """Test paired statistics against a direct computation"""
+        table = run_sweep(datasets, methods=["shah", "li-wang-wu"], levels=[0.2, 0.8],
+                          trials=6, workers=1)
+        paired = paired_differences(table, "t_rmse")
+        assert len(paired) == 4
+        data = _sorted(table)
+        for row in paired:
+            cell = data[(data["dataset"] == row["dataset"])
+                        & (data["noise_level"] == row["noise_level"])]
+            a = cell["t_rmse"][cell["method"] == row["method_a"]]
+            b = cell["t_rmse"][cell["method"] == row["method_b"]]
+            d = a - b
+            assert row["n"] == 6
+            assert row["mean_diff"] == pytest.approx(d.mean())
+            assert row["std_diff"] == pytest.approx(d.std(ddof=1))
+            assert row["ci_low"] < row["mean_diff"] < row["ci_high"]
+            assert row["win_rate"] == pytest.approx(np.mean(d < 0))
+
+    def test_paired_narrower_than_unpaired(self, datasets):
+        """Test that common random numbers shrink the variance of method differences"""
+        table = run_sweep({"first": datasets["first"]}, methods=["tsai-lenz", "shah"],
+                          levels=[1.0], trials=30, workers=1)
+        paired = paired_differences(table, "t_rmse")[0]
+        data = table.to_array()
+        var_a = np.var(data["t_rmse"][data["method"] == paired["method_a"]], ddof=1)
+        var_b = np.var(data["t_rmse"][data["method"] == paired["method_b"]], ddof=1)
+        assert paired["std_diff"] ** 2 < var_a + var_b
+
+
+class TestAdaptiveSweep:
+    """Tests for adaptive stopping with sequential confidence intervals"""
+
+    def test_noise_free_cells_stop_at_min_trials(self, datasets):
+        """Test that zero-variance cells converge after min_trials"""
+        table, summary = run_adaptive_sweep(datasets, methods=["shah"], levels=[0.0],
+                                            tol=0.01, min_trials=4, batch_trials=2, workers=1)
+        assert len(table) == 2 * 4
+        assert np.all(summary["converged"]) and np.all(summary["n"] == 4)
+
+    def test_tolerance_controls_trials(self, datasets):
+        """Test that tighter tolerances need more trials and meet the interval"""
+        kwargs = dict(methods=["shah", "park-martin"], levels=[1.0], min_trials=4,
+                      max_trials=400, batch_trials=4, workers=1)
+        _, loose = run_adaptive_sweep({"first": datasets["first"]}, tol=2.0, **kwargs)
+        _, tight = run_adaptive_sweep({"first": datasets["first"]}, tol=0.5, **kwargs)
+        assert np.all(loose["converged"]) and np.all(tight["converged"])
+        assert np.all(tight["half_width"] <= 0.5)
+        assert tight["n"].sum() > loose["n"].sum()
+
+    def test_summary_matches_table(self, datasets):
+        """Test that Welford statistics agree with the collected rows"""
+        table, summary = run_adaptive_sweep(datasets, methods=["shah", "li-wang-wu"],
+                                            levels=[0.5], tol=1.0, min_trials=4,
+                                            max_trials=40, workers=1)
+        data = table.to_array()
+        for cell in summary:
+            rows = data[(data["dataset"] == cell["dataset"]) & (data["method"] == cell["method"])]
+            assert cell["n"] == len(rows)
+            assert cell["mean"] == pytest.approx(rows["t_rmse"].mean())
+            assert cell["std"] == pytest.approx(rows["t_rmse"].std(ddof=1))
+
+    def test_resolved_methods_leave_tasks(self, datasets):
+        """Test that converged methods stop receiving trials while others continue"""
+        table, summary = run_adaptive_sweep({"first": datasets["first"]},
+                                            methods=["shah", "li-wang-wu"], levels=[1.0],
+                                            column="t_rmse", tol=0.3, min_trials=4,
+                                            max_trials=12, batch_trials=4, workers=1)
+        counts = dict(zip(summary["method"], summary["n"]))
+        stopped = [m for m in counts if counts[m] < 12]
+        assert all(summary["converged"][summary["method"] == m][0] for m in stopped)
+        assert len(table) == sum(counts.values())
+        # испытания каждого метода идут подряд с нуля (общие случайные числа)
+        data = table.to_array()
+        for m in counts:
+            assert sorted(data["trial"][data["method"] == m]) == list(range(counts[m]))
+
+    def test_max_trials_caps_unconverged(self, datasets):
+        """Test that unreachable tolerances stop at max_trials without converging"""
+        _, summary = run_adaptive_sweep({"first": datasets["first"]}, methods=["shah"],
+                                        levels=[1.0], tol=1e-9, min_trials=2, max_trials=6,
+                                        workers=1)
+        assert summary["n"][0] == 6 and not summary["converged"][0]
+
+    def test_pool(self, datasets):
+        """Test the scheduler with a process pool"""
+        _, summary = run_adaptive_sweep(datasets, methods=["shah"], levels=[0.0, 1.0],
+                                        tol=1.0, min_trials=4, max_trials=400, batch_trials=2,
+                                        workers=2)
+        assert np.all(summary["converged"])
+        assert np.all(summary["half_width"] <= 1.0)
+
+    def test_long_dataset_name(self, datasets):
+        """Test that cells are keyed by the caller's dataset name, not the stored one"""
+        name = "d" * 80
+        table, summary = run_adaptive_sweep({name: datasets["first"]}, methods=["shah"],
+                                            levels=[0.0], tol=0.01, min_trials=2, workers=1)
+        assert list(summary["dataset"]) == [name] and summary["n"][0] == 2
+        assert np.all(table.column("dataset") == name)
+        with pytest.raises(ValueError, match="Имя набора длиннее"):
+            AdaptiveState({"d" * 300: datasets["first"]}, ["shah"], [0.0], "t_rmse", tol=0.1)
+
+    def test_requires_tolerance(self, datasets):
+        """Test that a zero tolerance is rejected"""
+        with pytest.raises(ValueError, match="tol"):
+            AdaptiveState(datasets, ["shah"], [0.0], "t_rmse", tol=0.0)
+
+
+class TestPreparedSide:
+    """Tests for reusing the noise-independent A-side preprocessing"""
+
+    @pytest.mark.parametrize("max_pairs", [None, 5])
+    def test_motion_pairs_with_prepared_side(self, datasets, max_pairs):
+        """Test that a precomputed A side gives the same motion pairs"""
+        As, Bs = datasets["first"]
+        _, _, a_side = prepare_dataset(As, Bs, max_pairs)
+        expected = motion_pairs(As, Bs, max_pairs=max_pairs)
+        actual = motion_pairs(As, Bs, max_pairs=max_pairs, a_side=a_side)
+        assert len(actual) == len(expected)
+        for (a1, b1), (a2, b2) in zip(expected, actual):
+            np.testing.assert_array_equal(a1, a2)
+            np.testing.assert_array_equal(b1, b2)
+
+    def test_motion_side_strides(self, datasets):
+        """Test that max_pairs adds power-of-two strides"""
+        As, _ = datasets["first"]
+        assert len(motion_side(As)[0]) == len(As) - 1
+        assert len(motion_side(As, max_pairs=5)[0]) == sum(len(As) - s for s in (1, 2, 4, 8))
@@ -0,0 +1,140 @@
+"""
+Tests for first-order covariance propagation of solver outputs
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from uncertainty import noise_covariance, polar_tangent_map, pose_std
+from noise_pipeline import NoisePipeline
+from registry import get_method, register_method, unregister_method, AX_YB
+from utils import compose, euler_ZYX_to_R, invert_T, log_SO3, exp_SO3
+from tests.conftest import synthetic_pairs
+
+
+def _dataset(n=25, seed=0):
+    return synthetic_pairs(n, seed)
+
+
+def _params(X, Y, X_ref, Y_ref):
+    return np.concatenate([X[:3, 3], log_SO3(X_ref[:3, :3].T @ X[:3, :3]),
+                           Y[:3, 3], log_SO3(Y_ref[:3, :3].T @ Y[:3, :3])])
+
+
+class TestHelpers:
+    """Tests for building blocks of the propagation"""
+
+    def test_polar_tangent_map(self):
+        """Test that the map recovers a small right perturbation of a rotation"""
+        R = euler_ZYX_to_R(0.4, -0.3, 0.2)
+        theta = np.array([1e-6, -2e-6, 3e-6])
+        dM = (R @ exp_SO3(theta) - R).reshape(-1)
+        np.testing.assert_allclose(polar_tangent_map(R) @ dM, theta, rtol=1e-4)
+
+    def test_noise_covariance(self):
+        """Test that residual twists recover the injected noise level"""
+        As, Bs = _dataset(200)
+        X, Y = get_method("shah").solve(As, Bs)
+        noise = NoisePipeline([{"type": "gaussian", "pos_std": 0.5, "rot_std": 0.05}])
+        _, noisy = noise.apply_pairs(As, Bs)
+        sigma = noise_covariance(As, noisy, X, Y)
+        assert sigma.shape == (6, 6)
+        np.testing.assert_allclose(sigma, sigma.T)
+        assert np.trace(sigma[:3, :3]) > 0 and np.trace(sigma[3:, 3:]) > 0
+        # без шума невязки нулевые
+        assert np.abs(noise_covariance(As, Bs, X, Y)).max() < 1e-12
+
+    def test_pose_std(self):
+        """Test extraction of per-axis and total-angle deviations"""
+        cov = np.diag([1.0, 4.0, 9.0, 1e-4, 1e-4, 2e-4, 0.25, 0.25, 0.25, 0.0, 0.0, 1e-4])
+        std = pose_std(cov)
+        np.testing.assert_allclose(std["X_t"], [1.0, 2.0, 3.0])
+        assert std["X_r"] == pytest.approx(np.degrees(0.02))
+        np.testing.assert_allclose(std["Y_t"], [0.5, 0.5, 0.5])
+        assert std["Y_r"] == pytest.approx(np.degrees(0.01))
+
+
+class TestCovariance:
+    """Tests for analytic covariances against Monte Carlo scatter"""
+
+    @pytest.mark.parametrize("method", ["shah", "li-wang-wu", "park-martin", "tsai-lenz"])
+    def test_matches_monte_carlo(self, method):
+        """Test that predicted deviations match the scatter of re-solved noisy trials"""
+        As, Bs = _dataset()
+        spec = get_method(method)
+        noise = NoisePipeline([{"type": "gaussian", "pos_std": 0.5, "rot_std": 0.05}])
+        X_ref, Y_ref = spec.solve(As, Bs)
+        params, covs = [], []
+        for trial in range(150):
+            _, noisy = noise.apply_pairs(As, Bs, trial=trial)
+            X, Y, cov = spec.solve(As, noisy, covariance=True)
+            params.append(_params(X, Y, X_ref, Y_ref))
+            covs.append(cov)
+        mc = np.std(params, axis=0)
+        analytic = np.sqrt(np.diag(np.mean(covs, axis=0)))
+        ratio = analytic / mc
+        assert np.all(ratio > 0.6) and np.all(ratio < 1.6), ratio
+
+    @pytest.mark.parametrize("method", ["shah", "li-wang-wu", "park-martin", "tsai-lenz"])
+    def test_symmetric_psd(self, method):
+        """Test that covariances are symmetric positive semi-definite"""
+        As, Bs = _dataset(12, seed=3)
+        noise = NoisePipeline([{"type": "gaussian", "pos_std": 1.0, "rot_std": 0.1}])
+        _, noisy = noise.apply_pairs(As, Bs)
+        _, _, cov = get_method(method).solve(As, noisy, max_pairs=20, covariance=True)
+        assert cov.shape == (12, 12)
+        np.testing.assert_allclose(cov, cov.T, atol=1e-12 * np.abs(cov).max())
+        assert np.linalg.eigvalsh(cov).min() > -1e-9 * np.abs(cov).max()
+
+    def test_scales_with_noise(self):
+        """Test that covariance grows quadratically with the noise level"""
+        As, Bs = _dataset()
+        spec = get_method("shah")
+        _, noisy = NoisePipeline([{"type": "gaussian", "pos_std": 0.2,
+                                   "rot_std": 0.02}]).apply_pairs(As, Bs)
+        X, Y = spec.solve(As, Bs)
+        base = spec.covariance(As, noisy, X, Y)
+        # та же реализация шума, увеличенная вдвое относительно точных поз
+        scaled = Bs.copy()
+        for i in range(len(Bs)):
+            delta = invert_T(Bs[i]) @ noisy[i]
+            w = log_SO3(delta[:3, :3])
+            scaled[i] = Bs[i] @ compose(exp_SO3(2 * w), 2 * delta[:3, 3])
+        double = spec.covariance(As, scaled, X, Y)
+        np.testing.assert_allclose(np.diag(double), 4 * np.diag(base), rtol=0.05)
+
+
+class TestRegistryHook:
+    """Tests for the covariance option of registered methods"""
+
+    def test_plain_solve_unchanged(self):
+        """Test that solve without covariance still returns a pair"""
+        As, Bs = _dataset(10)
+        result = get_method("park-martin").solve(As, Bs)
+        assert len(result) == 2
+
+    def test_missing_hook(self):
+        """Test that methods without a covariance hook reject the request"""
+        As, Bs = _dataset(10)
+        with pytest.raises(ValueError, match="не оценивает ковариацию"):
+            get_method("daniilidis").solve(As, Bs, covariance=True)
+
+    def test_custom_hook(self):
+        """Test that a registered hook receives the solution and max_pairs"""
+        calls = []
+
+        def hook(As, Bs, X, Y, max_pairs=None):
+            calls.append(max_pairs)
+            return np.eye(12)
+
+        register_method("custom", get_method("shah").func, AX_YB, covariance=hook)
+        try:
+            As, Bs = _dataset(10)
+            _, _, cov = get_method("custom").solve(As, Bs, max_pairs=7, covariance=True)
+        finally:
+            unregister_method("custom")
+        assert calls == [7]
+        np.testing.assert_array_equal(cov, np.eye(12))
@@ -5,7 +5,8 @@ import pytest
 import numpy as np
 from utils import (
     invert_T, compose, euler_ZYX_to_R, log_SO3, hat,
-    load_poses_csv, df_to_Ts, summarize_errors, calculate_Z
+    load_poses_csv, df_to_Ts, summarize_errors, calculate_Z, pose_residuals,
+    log_SO3_batch, relative_motions, select_informative_pairs, motion_pairs
 )
 
 
@@ -96,6 +97,48 @@ class TestLogSO3:
         assert np.linalg.norm(w) < 0.1
 
 
+class TestLogSO3Batch:
+    """Tests for log_SO3_batch function"""
+
+    def test_matches_single(self):
+        """Test batched logarithm against log_SO3"""
+        Rs = np.array([euler_ZYX_to_R(0.3 * i, -0.1 * i, 0.2) for i in range(5)] + [np.eye(3)])
+        expected = np.array([log_SO3(R) for R in Rs])
+        np.testing.assert_allclose(log_SO3_batch(Rs), expected, atol=1e-12)
+
+
+class TestMotionPairs:
+    """Tests for relative motions and pair selection"""
+
+    def test_relative_motions(self, sample_poses):
+        """Test that relative motions match T_i^-1 T_{i+1}"""
+        rel = relative_motions(sample_poses)
+        assert rel.shape == (len(sample_poses) - 1, 4, 4)
+        np.testing.assert_allclose(rel[1], invert_T(sample_poses[1]) @ sample_poses[2], atol=1e-12)
+
+    def test_select_prefers_diverse_axes(self):
+        """Test that near-duplicate motions are skipped"""
+        z_axis = np.tile([0.0, 0.0, 0.1], (50, 1)) + 1e-4 * np.arange(50)[:, None]
+        a_vecs = np.vstack([z_axis, [[0.1, 0.0, 0.0], [0.0, 0.1, 0.0]]])
+        chosen = select_informative_pairs(a_vecs, 3)
+        assert 50 in chosen and 51 in chosen
+        assert len(chosen) == 3
+
+    def test_select_keeps_all_when_few(self):
+        """Test that short inputs are returned unchanged"""
+        np.testing.assert_array_equal(select_informative_pairs(np.ones((4, 3)), 10), np.arange(4))
+
+    def test_max_pairs_bounds_output(self):
+        """Test that max_pairs bounds the number of pairs on a dense log"""
+        poses = np.array([compose(euler_ZYX_to_R(0.05 * i, 0.03 * i, 0.02 * i), np.array([i, 0, 0]))
+                          for i in range(200)])
+        assert len(motion_pairs(poses, poses)) == 199
+        pairs = motion_pairs(poses, poses, max_pairs=20)
+        assert len(pairs) == 20
+        for Ar, Br in pairs:
+            assert np.linalg.norm(log_SO3(Ar[:3, :3])) >= np.deg2rad(2.0)
+
+
 class TestHat:
     """Tests for hat function"""
     
@@ -167,6 +210,37 @@ class TestSummarizeErrors:
             assert isinstance(r_stats[metric], (int, float))
 
 
+class TestPoseResiduals:
+    """Tests for per-pose residual arrays"""
+
+    def test_matches_loop_definition(self, sample_poses):
+        """Test vectorized residuals against the per-pose definition"""
+        X = compose(euler_ZYX_to_R(0.3, -0.2, 0.1), np.array([1.0, -2.0, 0.5]))
+        Y = compose(euler_ZYX_to_R(-0.1, 0.4, 0.2), np.array([0.0, 3.0, -1.0]))
+        t_errs, r_errs = pose_residuals(sample_poses, sample_poses, X, Y)
+        for i, (A, B) in enumerate(zip(sample_poses, sample_poses)):
+            Delta = invert_T(A @ X) @ (Y @ B)
+            assert t_errs[i] == pytest.approx(np.linalg.norm(Delta[:3, 3]))
+            angle = np.degrees(np.linalg.norm(log_SO3(Delta[:3, :3])))
+            assert r_errs[i] == pytest.approx(angle)
+
+    def test_contiguous_float64(self, sample_poses):
+        """Test that residuals are contiguous float64 buffers"""
+        t_errs, r_errs = pose_residuals(sample_poses, sample_poses, np.eye(4), np.eye(4))
+        for arr in (t_errs, r_errs):
+            assert arr.dtype == np.float64
+            assert arr.flags["C_CONTIGUOUS"]
+            assert arr.shape == (len(sample_poses),)
+
+    def test_summarize_returns_residuals(self, sample_poses):
+        """Test that summarize_errors can return the residuals it used"""
+        X = compose(euler_ZYX_to_R(0.2, 0, 0), np.array([1.0, 0, 0]))
+        t_stats, r_stats, t_errs, r_errs = summarize_errors(
+            sample_poses, sample_poses, X, np.eye(4), return_residuals=True)
+        assert t_stats["max"] == pytest.approx(t_errs.max())
+        assert r_stats["median"] == pytest.approx(np.median(r_errs))
+
+
 class TestCalculateZ:
     """Tests for calculate_Z function"""
     
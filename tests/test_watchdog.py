@@ -0,0 +1,201 @@
+"""
+Tests for per-method watchdog budgets and failure isolation
+"""
+import os
+import sys
+import threading
+import time
+import pytest
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from watchdog import run_with_budget, WorkerFailure, check_budget, describe_exception
+from functions_call import evaluate_methods, get_error_table
+from registry import register_method, unregister_method, get_method, AX_YB, PREPROCESSORS
+from results import (
+    STATUS_OK, STATUS_ERROR, STATUS_TIMEOUT, STATUS_MEMORY, STATUS_CANCELLED
+)
+from sweep import run_sweep
+from tests.conftest import synthetic_pairs
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                reason="методы-заглушки передаются в процесс через fork")
+
+
+def _dataset(n=10):
+    return synthetic_pairs(n)
+
+
+def _hang(As, Bs):
+    time.sleep(30)
+
+
+def _hog(As, Bs):
+    return np.ones((1 << 30,)), None
+
+
+def _crash(As, Bs):
+    os._exit(3)
+
+
+@pytest.fixture
+def bad_methods():
+    """Register solvers that hang, exhaust memory or kill their process"""
+    for name, func in (("hang", _hang), ("hog", _hog), ("crash", _crash)):
+        register_method(name, func, AX_YB)
+    yield
+    for name in ("hang", "hog", "crash"):
+        unregister_method(name)
+
+
+class TestRunWithBudget:
+    """Tests for running a function in a budgeted process"""
+
+    def test_result(self):
+        """Test that results come back from the worker process"""
+        X, Y = run_with_budget(get_method("shah").solve, *_dataset(), timeout=30)
+        np.testing.assert_allclose(X, get_method("shah").solve(*_dataset())[0])
+
+    def test_timeout(self):
+        """Test that a hanging call is killed at the time limit"""
+        start = time.perf_counter()
+        with pytest.raises(WorkerFailure) as info:
+            run_with_budget(_hang, None, None, timeout=0.3)
+        assert info.value.status == STATUS_TIMEOUT
+        assert 0.3 <= info.value.elapsed < 5.0
+        assert time.perf_counter() - start < 5.0
+
+    def test_memory(self):
+        """Test that allocations beyond the budget are reported as memory failures"""
+        with pytest.raises(WorkerFailure) as info:
+            run_with_budget(_hog, None, None, memory_mb=256)
+        assert info.value.status == STATUS_MEMORY
+        assert "MemoryError" in str(info.value)
+
+    def test_error_location(self):
+        """Test that exceptions report their type, message and source location"""
+        with pytest.raises(WorkerFailure) as info:
+            run_with_budget(get_method("shah").solve, np.zeros((0, 4, 4)), np.zeros((1, 4, 4)))
+        assert info.value.status == STATUS_ERROR
+        assert ".py:" in str(info.value)
+
+    def test_crash(self):
+        """Test that a process dying without a result is reported"""
+        with pytest.raises(WorkerFailure) as info:
+            run_with_budget(_crash, None, None, timeout=10)
+        assert info.value.status == STATUS_ERROR and "код 3" in str(info.value)
+
+    def test_cancel(self):
+        """Test that setting the cancel event kills the process before the time limit"""
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        start = time.perf_counter()
+        with pytest.raises(WorkerFailure) as info:
+            run_with_budget(_hang, None, None, timeout=20, cancel=cancel)
+        assert info.value.status == STATUS_CANCELLED
+        assert time.perf_counter() - start < 5.0
+
+    def test_check_budget(self):
+        """Test validation of budget dictionaries"""
+        assert check_budget({"timeout": 1.0}) == {"timeout": 1.0}
+        assert check_budget({"cancel": threading.Event()})
+        with pytest.raises(ValueError, match="Неизвестные параметры"):
+            check_budget({"seconds": 1})
+        with pytest.raises(ValueError, match="положительным"):
+            check_budget({"memory_mb": 0})
+
+    def test_describe_exception(self):
+        """Test the innermost frame in exception descriptions"""
+        try:
+            get_method("magic")
+        except ValueError as e:
+            text = describe_exception(e)
+        assert text.startswith("ValueError: Неизвестный метод") and "registry.py:" in text
+
+
+class TestIsolation:
+    """Tests for failure isolation in evaluation and sweeps"""
+
+    def test_statuses_and_elapsed(self, bad_methods):
+        """Test that each bad method gets its own status and the others still run"""
+        As, Bs = _dataset()
+        table = evaluate_methods(["shah", "hang", "hog", "crash", "park-martin"], As, Bs,
+                                 budget={"timeout": 0.5, "memory_mb": 256})
+        rows = {str(r["method"]): r for r in table.to_array()}
+        assert rows["shah"]["status"] == STATUS_OK and rows["park-martin"]["status"] == STATUS_OK
+        assert rows["hang"]["status"] == STATUS_TIMEOUT
+        assert 0.5 <= rows["hang"]["solve_time"] < 5.0
+        assert rows["hog"]["status"] == STATUS_MEMORY
+        assert rows["crash"]["status"] in (STATUS_ERROR, STATUS_MEMORY)
+        assert rows["shah"]["t_max"] < 1e-6
+
+    def test_cancel_skips_remaining(self, bad_methods):
+        """Test that cancelling stops the running method and skips the rest"""
+        cancel = threading.Event()
+        seen = []
+
+        def progress(name, status):
+            seen.append(name)
+            if name == "hang":
+                assert status == STATUS_CANCELLED
+
+        threading.Timer(0.3, cancel.set).start()
+        table = evaluate_methods(["hang", "shah"], *_dataset(),
+                                 budget={"timeout": 20, "cancel": cancel}, progress=progress)
+        assert list(table.column("status")) == [STATUS_CANCELLED, STATUS_CANCELLED]
+        assert seen == ["hang", "shah"]
+
+    def test_shared_prepared_before_fork(self):
+        """Test that the shared preprocessing is computed once in the parent process"""
+        shared = {}
+        table = evaluate_methods(["tsai-lenz", "daniilidis"], *_dataset(),
+                                 shared=shared, budget={"timeout": 30})
+        assert list(table.column("status")) == [STATUS_OK, STATUS_OK]
+        assert "pairs" in shared and "quats" in shared
+
+    def test_shared_failure_reported(self, monkeypatch):
+        """Test that a failed parent-side preprocessing lands in the rows that need it"""
+        def broken(As, Bs, shared, max_pairs):
+            raise RuntimeError("сломанная предобработка")
+
+        monkeypatch.setitem(PREPROCESSORS, "relative_motions", ("pairs", broken))
+        table = evaluate_methods(["shah", "tsai-lenz"], *_dataset(), budget={"timeout": 30})
+        rows = {str(r["method"]): r for r in table.to_array()}
+        assert rows["shah"]["status"] == STATUS_OK
+        assert rows["tsai-lenz"]["status"] == STATUS_ERROR
+        assert rows["tsai-lenz"]["error"].startswith("Общая предобработка: RuntimeError")
+        assert np.isnan(rows["tsai-lenz"]["solve_time"])
+
+    def test_worker_thread(self):
+        """Test budgeted solving from a non-main thread (as in the GUI)"""
+        tables = []
+        worker = threading.Thread(target=lambda: tables.append(
+            evaluate_methods(["shah", "park-martin"], *_dataset(), budget={"timeout": 60})))
+        worker.start()
+        worker.join(120)
+        assert list(tables[0].column("status")) == [STATUS_OK, STATUS_OK]
+
+    def test_in_process_error_location(self):
+        """Test that in-process failures also record where they happened"""
+        table = evaluate_methods(["magic"], *_dataset())
+        assert "registry.py:" in table.column("error")[0]
+
+    def test_get_error_table(self, bad_methods, tmp_path):
+        """Test that a hanging method cannot block get_error_table"""
+        data = Path(__file__).parent / "data"
+        table = get_error_table(["hang", "shah"], str(data / "circular_trajectory_A_1.0mm.txt"),
+                                str(data / "circular_trajectory_B_1.0mm.txt"),
+                                budget={"timeout": 0.5})
+        assert list(table.column("status")) == [STATUS_TIMEOUT, STATUS_OK]
+
+    def test_sweep_not_stalled(self, bad_methods):
+        """Test that a sweep finishes with timeout rows for a hanging method"""
+        start = time.perf_counter()
+        table = run_sweep({"d": _dataset()}, ["hang", "shah"], levels=[0.1], trials=2,
+                          workers=1, budget={"timeout": 0.3})
+        assert time.perf_counter() - start < 10.0
+        data = table.to_array()
+        assert np.all(data["status"][data["method"] == "hang"] == STATUS_TIMEOUT)
+        assert np.all(data["status"][data["method"] == "shah"] == STATUS_OK)